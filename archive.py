@@ -0,0 +1,82 @@
+"""
+压缩文件（.gz / .bz2 / .zip）的读取
+
+订单导出经常以压缩包的形式下发。这里按文件开头的特征字节识别压缩格式
+（不看扩展名，改过名的压缩包同样能识别），把其中的每个成员打开为解压流，
+由 extractor.extract_archive 边解压边提取，解压后的内容不落盘、也不整体放入内存。
+
+    kind()          压缩格式："gz"、"bz2"、"zip"，不是压缩文件时为 None
+    members()       压缩包中要处理的成员 [(名称, 压缩后的大小, 解压后的大小), ...]
+    open_member()   打开一个成员的解压流
+
+.gz 和 .bz2 只有一个成员（多段拼接的 .gz 按一个整体解压）；
+.zip 中的目录项跳过，其余成员按在压缩包中的顺序处理。
+"""
+import bz2
+import gzip
+import os
+import zipfile
+from contextlib import contextmanager
+
+# 文件开头的特征字节（空的 zip 只有目录结束记录）
+_MAGIC = (
+    (b"\x1f\x8b", "gz"),
+    (b"BZh", "bz2"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),
+)
+
+
+def kind(path):
+    """按开头的特征字节识别压缩格式，不是压缩文件（或无法读取）时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4)
+    except OSError:
+        return None
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def is_archive(path):
+    return kind(path) is not None
+
+
+def members(path):
+    """
+    压缩包中要处理的成员
+
+    返回:
+        [(成员名称, 压缩后的字节数, 解压后的字节数), ...]；.gz / .bz2 只有一个成员，
+        名称为 None，解压后的大小事先无法得知，为 None
+    """
+    if kind(path) != "zip":
+        return [(None, os.path.getsize(path), None)]
+    with zipfile.ZipFile(path) as zf:
+        return [(info.filename, info.compress_size, info.file_size) for info in zf.infolist() if not info.is_dir()]
+
+
+@contextmanager
+def open_member(path, member=None):
+    """
+    打开一个成员的解压流
+
+    返回:
+        (stream, position)：stream 为解压后的二进制流（支持 read 和 peek），
+        position() 为当前已从磁盘读取的压缩数据位置，用于显示进度
+    """
+    with open(path, "rb") as raw:
+        name = kind(path)
+        if name == "gz":
+            with gzip.GzipFile(fileobj=raw, mode="rb") as stream:
+                yield stream, raw.tell
+        elif name == "bz2":
+            with bz2.BZ2File(raw) as stream:
+                yield stream, raw.tell
+        elif name == "zip":
+            with zipfile.ZipFile(raw) as zf, zf.open(member) as stream:
+                yield stream, raw.tell
+        else:
+            raise ValueError(f"不是支持的压缩文件: {path}")
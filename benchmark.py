@@ -0,0 +1,229 @@
+"""
+性能基准测试
+
+生成模拟的订单导出文本（SLS单号、订单编号、未知单号与备注等干扰内容混排），
+分别测量提取、过滤和三种格式化的耗时、吞吐量和内存峰值，用于比较不同版本的性能。
+
+    python benchmark.py --sizes 1K,1M,10M --repeat 3
+    python benchmark.py --sizes 100M --json result.json --compare baseline.json
+    python benchmark.py --sizes 50M --dump corpus.txt
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import extractor
+import formatting
+
+SLS_LONG_PREFIXES = ("MX", "CL", "CO")
+SLS_SHORT_PREFIXES = ("BR", "MY", "PH", "SG", "TH", "TW", "VN")
+
+_UPPER_DIGITS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+_DIGITS = "0123456789"
+_REMARKS = ("已发货", "待揽收", "客户要求改地址", "退货中", "仓库缺货", "COD", "ok",
+            "pending review", "Lost in transit", "重复下单", "已签收", "")
+
+# 基准测试的各个阶段
+STAGES = ("extract", "filter") + formatting.FORMATS
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text):
+    """把 "1K"、"10M" 这样的大小转换为字符数"""
+    text = text.strip().upper()
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("G", "M", "K"):
+        if size >= _UNITS[unit]:
+            return f"{size / _UNITS[unit]:g}{unit}"
+    return str(size)
+
+
+def _random_chars(rng, alphabet, n):
+    return "".join(rng.choices(alphabet, k=n))
+
+
+def _sls_number(rng):
+    if rng.random() < 0.4:
+        return rng.choice(SLS_LONG_PREFIXES) + _random_chars(rng, _UPPER_DIGITS, 16)
+    return rng.choice(SLS_SHORT_PREFIXES) + _random_chars(rng, _UPPER_DIGITS, 13)
+
+
+def _order_number(rng):
+    # 6位日期数字 + 8-9位字母数字
+    date = f"{rng.randint(22, 25):02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+    return date + _random_chars(rng, _UPPER_DIGITS, rng.choice((8, 9)))
+
+
+def _unknown_number(rng):
+    if rng.random() < 0.5:
+        return _random_chars(rng, _DIGITS, rng.randint(8, 12))
+    return _random_chars(rng, _UPPER_DIGITS, rng.randint(8, 12)) + rng.choice(_DIGITS)
+
+
+def _noise(rng):
+    return rng.choice((
+        lambda: rng.choice(_REMARKS),
+        lambda: f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00",
+        lambda: f"{rng.randint(1, 9999)}.{rng.randint(0, 99):02d}",
+        lambda: _random_chars(rng, "abcdefghijklmnopqrstuvwxyz", rng.randint(3, 10)),
+    ))()
+
+
+def generate_lines(rng):
+    """无限生成模拟的导出行（制表符分隔，偶尔为自由文本）"""
+    while True:
+        if rng.random() < 0.1:
+            # 聊天记录之类的自由文本，单号夹在句子中
+            yield f"请帮忙查一下 {_sls_number(rng)} 和 {_order_number(rng)} 的状态，{_noise(rng)}"
+            continue
+        cells = []
+        if rng.random() < 0.9:
+            cells.append(_sls_number(rng))
+        if rng.random() < 0.7:
+            cells.append(_order_number(rng))
+        if rng.random() < 0.3:
+            cells.append(_unknown_number(rng))
+        for _ in range(rng.randint(1, 3)):
+            cells.append(_noise(rng))
+        yield "\t".join(cells)
+
+
+def generate_corpus(size, seed=0):
+    """生成约 size 个字符的模拟粘贴文本"""
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    for line in generate_lines(rng):
+        if total >= size:
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def _stage_funcs(text, output_option, parallel):
+    """按顺序返回 (阶段名, 函数)；每个函数的输出作为后续阶段的输入"""
+    extract = extractor.extract_parallel if parallel else extractor.extract_order_numbers
+    state = {}
+
+    def run_extract():
+        state["data"] = extract(text)
+        return state["data"]
+
+    def run_filter():
+        state["filtered"] = formatting.filter_data(state["data"], output_option)
+        return state["filtered"]
+
+    stages = [("extract", run_extract), ("filter", run_filter)]
+    for fmt in formatting.FORMATS:
+        stages.append((fmt, lambda fmt=fmt: formatting.format_result(fmt, state["filtered"])))
+    return stages, state
+
+
+def run_benchmark(text, repeat=3, output_option="auto", parallel=False, memory=True):
+    """
+    测量各阶段耗时和内存峰值
+
+    返回:
+        {阶段名: {"seconds": 最短耗时, "peak_bytes": 内存峰值或 None}, ...} 以及单号总数
+    """
+    results = {stage: {"seconds": None, "peak_bytes": None} for stage in STAGES}
+
+    for _ in range(repeat):
+        stages, state = _stage_funcs(text, output_option, parallel)
+        for name, func in stages:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = results[name]["seconds"]
+            results[name]["seconds"] = elapsed if best is None else min(best, elapsed)
+    id_count = sum(len(state["data"][key]) for key in formatting.CLASSES)
+
+    if memory:
+        # 内存单独跑一轮，避免 tracemalloc 的开销影响计时
+        stages, _ = _stage_funcs(text, output_option, parallel)
+        tracemalloc.start()
+        try:
+            for name, func in stages:
+                tracemalloc.clear_traces()
+                base, _ = tracemalloc.get_traced_memory()
+                func()
+                _, peak = tracemalloc.get_traced_memory()
+                results[name]["peak_bytes"] = max(peak - base, 0)
+        finally:
+            tracemalloc.stop()
+
+    return results, id_count
+
+
+def print_report(size, results, id_count, baseline=None, out=sys.stdout):
+    """输出一组结果，提供 baseline 时附带相对耗时"""
+    mb = size / _UNITS["M"]
+    print(f"\n== {format_size(size)} 字符, {id_count} 个单号 ==", file=out)
+    header = f"{'阶段':<14}{'耗时(s)':>10}{'MB/s':>10}{'单号/s':>12}{'峰值(MB)':>10}"
+    if baseline:
+        header += f"{'对比基准':>10}"
+    print(header, file=out)
+    for stage in STAGES:
+        seconds = results[stage]["seconds"]
+        peak = results[stage]["peak_bytes"]
+        line = (f"{stage:<14}{seconds:>10.3f}{mb / seconds if seconds else 0:>10.1f}"
+                f"{id_count / seconds if seconds else 0:>12.0f}"
+                f"{'-' if peak is None else format(peak / _UNITS['M'], '.1f'):>10}")
+        if baseline:
+            old = baseline.get(stage, {}).get("seconds")
+            line += f"{(seconds / old if old else float('nan')):>9.2f}x"
+        print(line, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="订单处理工具性能基准测试")
+    parser.add_argument("--sizes", default="1K,1M,10M",
+                        help="逗号分隔的语料大小，如 1K,1M,100M (默认: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数，取最短耗时")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--mode", choices=formatting.OUTPUT_OPTIONS, default="auto", help="输出选项")
+    parser.add_argument("--parallel", action="store_true", help="使用多进程并行提取")
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存峰值")
+    parser.add_argument("--json", metavar="FILE", help="把结果保存为JSON")
+    parser.add_argument("--compare", metavar="FILE", help="与之前保存的JSON结果对比")
+    parser.add_argument("--dump", metavar="FILE", help="只生成语料写入文件（取 --sizes 中的第一个大小）")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as f:
+            f.write(generate_corpus(sizes[0], args.seed))
+        return 0
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = {}
+    for size in sizes:
+        text = generate_corpus(size, args.seed)
+        results, id_count = run_benchmark(text, args.repeat, args.mode, args.parallel,
+                                          memory=not args.no_memory)
+        print_report(size, results, id_count, baseline.get(format_size(size)))
+        report[format_size(size)] = dict(results, id_count=id_count)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
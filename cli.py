@@ -0,0 +1,240 @@
+"""
+命令行模式
+
+不打开窗口，流式读取文件或标准输入，按与界面相同的规则提取、过滤并格式化单号，
+结果写到标准输出，统计信息写到标准错误。例如:
+
+    python main.py --input big.txt --mode sls_only --format batch_data
+    type export.txt | python main.py --format organization
+    python main.py --input big.txt --output result.xlsx
+    python main.py --input big.txt --format batch_data --max-ids 1000 --output ids.txt --split
+    python main.py --input today.txt --dedup --seen skip
+    python main.py --serve 8765
+"""
+import argparse
+import io
+import sys
+import tempfile
+
+import archive
+import dedup
+import extractor
+import formatting
+import id_types
+from idlist import IdList
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="订单处理工具命令行模式：提取并格式化SLS单号、订单编号和未知单号",
+    )
+    parser.add_argument("--input", "-i", action="append", metavar="FILE",
+                        help="输入文件（可以是 .gz/.bz2/.zip 压缩文件），可重复指定；省略或为 - 时读取标准输入")
+    parser.add_argument("--mode", "-m", choices=formatting.OUTPUT_OPTIONS, default="auto",
+                        help="输出选项 (默认: auto)")
+    parser.add_argument("--format", "-f", dest="fmt", choices=formatting.FORMATS,
+                        default="organization",
+                        help="输出格式: organization=格式整理, batch_query=批量查订单格式, "
+                             "batch_data=批量跑数据格式 (默认: organization)")
+    parser.add_argument("--output", "-o", metavar="FILE",
+                        help="写入文件而不是标准输出；扩展名为 .csv/.tsv/.xlsx 时每类单号一列")
+    parser.add_argument("--max-ids", type=int, metavar="N",
+                        help="批量格式分段：每段最多 N 个单号，各段之间空一行")
+    parser.add_argument("--max-bytes", type=int, metavar="N",
+                        help="批量格式分段：每段文本最多 N 字节（含引号和逗号）")
+    parser.add_argument("--split", action="store_true",
+                        help="与 --output 一起使用，每段写入一个文件（文件名后加类别和段号）")
+    parser.add_argument("--dedup", action="store_true",
+                        help="去除重复单号，保留第一次出现的位置")
+    parser.add_argument("--seen", choices=("mark", "skip"),
+                        help="检查以前处理过的单号: mark=只统计数量, skip=跳过；同时把本次的单号记入索引")
+    parser.add_argument("--seen-db", metavar="FILE",
+                        help="以前处理过的单号索引文件 (默认: %s)" % dedup.default_db_path().replace("%", "%%"))
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="启动本地HTTP提取服务（默认只监听 127.0.0.1），见 service 模块")
+    parser.add_argument("--encoding", default="utf-8", help="输入文件编码 (默认: utf-8)")
+    parser.add_argument("--chunk-size", type=int, default=extractor.CHUNK_SIZE,
+                        help="每次读取的字符数 (默认: %(default)s)")
+    return parser
+
+
+def run(argv=None):
+    """执行命令行模式，返回退出码"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if id_types.LOAD_ERROR:
+        print(id_types.LOAD_ERROR, file=sys.stderr)
+    if args.serve:
+        import service
+
+        return service.run(args.serve)
+    inputs = args.input or ["-"]
+
+    chunked = args.max_ids is not None or args.max_bytes is not None
+    if chunked and args.fmt == "organization":
+        parser.error("--max-ids/--max-bytes 只适用于批量格式")
+    if any(limit is not None and limit < 1 for limit in (args.max_ids, args.max_bytes)):
+        parser.error("--max-ids/--max-bytes 必须为正整数")
+    if args.split and not (chunked and args.output):
+        parser.error("--split 需要同时指定 --output 和 --max-ids/--max-bytes")
+
+    write = None
+    if args.output:
+        import export
+
+        if args.split:
+            def write(fmt, columns):
+                paths = export.export_chunks(args.output, fmt, columns, args.max_ids, args.max_bytes)
+                print(f"已写入 {len(paths)} 个文件", file=sys.stderr)
+        else:
+            def write(fmt, columns):
+                export.export_columns(args.output, fmt, columns,
+                                      max_items=args.max_ids, max_bytes=args.max_bytes)
+
+    stats = {}
+    index = None
+    try:
+        if args.seen:
+            index = dedup.SeenIndex(args.seen_db)
+        counts = process(inputs, args.mode, args.fmt, sys.stdout,
+                         encoding=args.encoding, chunk_size=args.chunk_size, write=write,
+                         max_items=args.max_ids, max_bytes=args.max_bytes,
+                         dedupe=args.dedup, index=index, skip_seen=args.seen == "skip", stats=stats)
+    except OSError as e:
+        print(f"读写文件时出错: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if index is not None:
+            index.close()
+
+    keys = [key for key in formatting.CLASSES if counts[key]]
+    print(f"SLS单号: {counts['sls']} | 订单编号: {counts['order']} | 未知单号: {counts['unknown']}",
+          file=sys.stderr)
+    print(formatting.STATUS_MESSAGES[args.fmt].format(
+        count=sum(counts.values()), desc=formatting.describe(args.fmt, keys)), file=sys.stderr)
+    if args.dedup:
+        print(f"去除重复 {stats['duplicates']} 个", file=sys.stderr)
+    if args.seen:
+        action = "已跳过" if args.seen == "skip" else "未跳过"
+        print(f"以前处理过的单号 {stats['repeats']} 个（{action}）", file=sys.stderr)
+    return 0
+
+
+def process(inputs, output_option, fmt, out, encoding="utf-8", chunk_size=extractor.CHUNK_SIZE,
+            write=None, max_items=None, max_bytes=None, dedupe=False, index=None, skip_seen=False,
+            stats=None):
+    """
+    流式处理输入并把格式化结果逐段写入 out
+
+    只输出一种单号时边提取边输出；智能检测模式需要等全部输入读完
+    才能确定列布局，期间各类单号暂存在临时文件中，内存占用同样保持平稳。
+    写入 out 的结果以换行结尾（没有输出时什么也不写），便于在终端中显示和交给其他命令处理；
+    提供 write(fmt, columns) 时改由它输出（例如导出为文件），此时忽略 out。
+    max_items、max_bytes 为批量格式的分段上限（见 formatting.iter_chunks），只用于写入 out。
+    dedupe 为真时跨整个输入去除重复单号；提供 index（dedup.SeenIndex）时检查以前处理过的单号，
+    skip_seen 为真时跳过它们。去除的重复数和以前处理过的单号数写入 stats 字典
+    （"duplicates"、"repeats"）。
+
+    返回:
+        实际输出的各类单号数量 {"sls": n, "order": n, "unknown": n}
+    """
+    counts = dict.fromkeys(formatting.CLASSES, 0)
+    chunks = _iter_filtered(inputs, output_option, encoding, chunk_size)
+    if dedupe or index is not None:
+        chunks = _iter_checked(chunks, dedupe, index, skip_seen, {} if stats is None else stats)
+    if write is None:
+        def write(fmt, columns):
+            piece = ""
+            for piece in formatting.iter_format(fmt, columns, max_items, max_bytes):
+                out.write(piece)
+            if piece and not piece.endswith("\n"):
+                out.write("\n")
+
+    if output_option != "auto":
+        key = "sls" if output_option == "sls_only" else "order"
+
+        def items():
+            for filtered in chunks:
+                counts[key] += len(filtered[key])
+                yield from filtered[key]
+
+        write(fmt, [(key, items())])
+        return counts
+
+    spools = {key: _Spool() for key in formatting.CLASSES}
+    try:
+        for filtered in chunks:
+            for key in formatting.CLASSES:
+                spools[key].extend(filtered[key])
+        columns = [(key, spools[key]) for key in formatting.CLASSES if spools[key].count]
+        write(fmt, columns)
+        for key in formatting.CLASSES:
+            counts[key] = spools[key].count
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return counts
+
+
+def _iter_filtered(inputs, output_option, encoding, chunk_size):
+    """依次读取各输入，逐块产出过滤后的提取结果；压缩文件逐个成员边解压边读取"""
+    for path in inputs:
+        if path != "-" and archive.is_archive(path):
+            for member, _, _ in archive.members(path):
+                with archive.open_member(path, member) as (raw, _):
+                    stream = io.TextIOWrapper(raw, encoding=encoding, errors="replace")
+                    for data in extractor.extract_stream(stream, chunk_size):
+                        yield formatting.filter_data(data, output_option)
+            continue
+        if path == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding=encoding, errors="replace")
+        else:
+            stream = open(path, encoding=encoding, errors="replace")
+        try:
+            for data in extractor.extract_stream(stream, chunk_size):
+                yield formatting.filter_data(data, output_option)
+        finally:
+            if path == "-":
+                stream.detach()
+            else:
+                stream.close()
+
+
+def _iter_checked(chunks, dedupe, index, skip_seen, stats):
+    """逐块去除重复单号、检查以前处理过的单号，并累计数量"""
+    stats.update(duplicates=0, repeats=0)
+    seen = {}
+    for filtered in chunks:
+        if dedupe:
+            before = sum(len(filtered[key]) for key in formatting.CLASSES)
+            filtered = dedup.dedupe_data(filtered, seen)
+            stats["duplicates"] += before - sum(len(filtered[key]) for key in formatting.CLASSES)
+        if index is not None:
+            filtered, repeats = index.check(filtered, skip=skip_seen)
+            stats["repeats"] += sum(repeats.values())
+        yield filtered
+
+
+class _Spool:
+    """把单号逐行暂存到临时文件，读回时按原顺序迭代"""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.count = 0
+
+    def extend(self, items):
+        if items:
+            # IdList 的文本本身就是换行符连接的单号
+            self.file.write(items.text if isinstance(items, IdList) else "\n".join(items))
+            self.file.write("\n")
+            self.count += len(items)
+
+    def __iter__(self):
+        self.file.seek(0)
+        for line in self.file:
+            yield line[:-1]
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,126 @@
+"""
+剪贴板监视
+
+打开后定时检查剪贴板，复制了新的单号数据时自动按所选格式处理，
+省去"粘贴、点击格式按钮、复制结果"的往返。
+
+检查尽量廉价，剪贴板没有变化时几乎不占用CPU：
+- Windows 上先比较剪贴板序号（GetClipboardSequenceNumber），没有变化时不读取剪贴板内容
+- 读取后先比较长度和哈希值，与上次看到的相同时不做任何处理；
+  只在内容变化后才检查开头一段是否含有单号（不含单号的普通文字不处理）
+- 剪贴板一段时间没有变化时逐渐拉长检查间隔（MIN_INTERVAL ~ MAX_INTERVAL），一有变化立即恢复
+- 程序自己写入剪贴板的内容（复制结果等）用 ignore() 登记，不会被当作新数据再处理一遍
+"""
+import sys
+import tkinter as tk
+
+import extractor
+import formatting
+
+# 检查剪贴板的间隔（毫秒）：有变化后为最短间隔，之后每次没有变化就乘以 BACKOFF，直到最长间隔
+MIN_INTERVAL = 250
+MAX_INTERVAL = 2000
+BACKOFF = 1.5
+
+# 只在开头这么多字符中检查是否含有单号
+SAMPLE_CHARS = 64 * 1024
+
+if sys.platform == "win32":
+    import ctypes
+
+    _clipboard_sequence = ctypes.windll.user32.GetClipboardSequenceNumber
+else:
+    _clipboard_sequence = None
+
+
+def signature(text):
+    """用于比较剪贴板内容的签名（长度和哈希值），不保存内容本身"""
+    return len(text), hash(text)
+
+
+def has_ids(text):
+    """开头 SAMPLE_CHARS 个字符中是否含有任何单号"""
+    data = extractor.extract_order_numbers(text[:SAMPLE_CHARS])
+    return any(len(data[key]) for key in formatting.CLASSES)
+
+
+class ClipboardWatcher:
+    """
+    剪贴板监视，所有方法和回调都在界面线程中执行
+
+    参数:
+        on_change(text): 剪贴板出现新的、含有单号的文本时调用
+        busy(): 可选，返回 True 时（例如正在处理上一次的内容）暂不检查，稍后再试
+        read(): 读取剪贴板文本，默认 root.clipboard_get；剪贴板为空或不是文本时抛出 tk.TclError
+    """
+
+    def __init__(self, root, on_change, busy=None, read=None):
+        self.root = root
+        self.on_change = on_change
+        self.busy = busy
+        self.read = read or root.clipboard_get
+        self.running = False
+        self.interval = MIN_INTERVAL
+        self._after = None
+        self._sequence = None
+        self._seen = None
+
+    def start(self):
+        """开始监视；剪贴板中已有的内容视为已处理，只处理之后复制的内容"""
+        if self.running:
+            return
+        self.running = True
+        self.interval = MIN_INTERVAL
+        self._sequence = _clipboard_sequence() if _clipboard_sequence else None
+        text = self._read()
+        self._seen = signature(text) if text is not None else None
+        self._schedule()
+
+    def stop(self):
+        self.running = False
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+
+    def ignore(self, text):
+        """登记程序自己写入剪贴板的内容，之后检查时不处理"""
+        self._seen = signature(text)
+
+    def _schedule(self):
+        self._after = self.root.after(int(self.interval), self._poll)
+
+    def _poll(self):
+        self._after = None
+        if not self.running:
+            return
+        if self.busy is not None and self.busy():
+            self.interval = MIN_INTERVAL
+        elif self.check():
+            self.interval = MIN_INTERVAL
+        else:
+            self.interval = min(self.interval * BACKOFF, MAX_INTERVAL)
+        self._schedule()
+
+    def check(self):
+        """检查一次剪贴板，内容有变化时返回 True（不论是否含有单号）"""
+        if _clipboard_sequence is not None:
+            sequence = _clipboard_sequence()
+            if sequence == self._sequence:
+                return False
+            self._sequence = sequence
+        text = self._read()
+        if text is None:
+            return False
+        current = signature(text)
+        if current == self._seen:
+            return False
+        self._seen = current
+        if has_ids(text):
+            self.on_change(text)
+        return True
+
+    def _read(self):
+        try:
+            return self.read()
+        except tk.TclError:
+            return None
@@ -0,0 +1,165 @@
+"""
+单号去重
+
+    dedupe()     保持首次出现顺序的去重，每个单号 O(1)
+    SeenIndex    以前处理过的单号索引（SQLite，单号为主键），跨会话发现重复的单号，
+                 可标记数量或直接跳过，不需要重新扫描以前的数据
+
+索引中每个单号记录第一次处理它的会话（每次启动程序为一个会话），
+同一会话中反复处理同一批数据（例如切换输出格式）不会把它们当作以前处理过的单号。
+"""
+import os
+import time
+
+import formatting
+from idlist import IdList
+
+SEEN_DB_ENV = "ORDER_PROCESSOR_SEEN_DB"
+
+# 本次运行的会话编号，第一次打开索引时生成（见 current_session）
+_session = None
+
+# 每次查询/写入索引的单号数量
+_BATCH_SIZE = 10000
+
+
+def current_session():
+    """本次运行的会话编号"""
+    global _session
+    if _session is None:
+        import uuid  # 只在用到索引时才导入
+
+        _session = uuid.uuid4().hex
+    return _session
+
+
+def dedupe(items, seen=None):
+    """
+    去掉重复单号，保留第一次出现的位置
+
+    参数:
+        seen: 可选的集合，分块处理时用于跨块去重；其中已有的单号会被去掉，新单号会加入其中
+    """
+    if seen is None:
+        return list(dict.fromkeys(items))
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+
+def dedupe_data(data, seen=None):
+    """
+    对各类单号分别去重，返回新的字典（不修改原数据，原数据可能在缓存中），各类单号打包为 IdList
+
+    参数:
+        seen: 可选的 {类别: 集合}，同 dedupe
+    """
+    result = dict(data)
+    for key in formatting.CLASSES:
+        result[key] = IdList.pack(dedupe(data[key], None if seen is None else seen.setdefault(key, set())))
+    return result
+
+
+def default_db_path():
+    """索引文件的默认位置"""
+    path = os.environ.get(SEEN_DB_ENV)
+    if path:
+        return path
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "order-processor", "seen.sqlite3")
+
+
+class SeenIndex:
+    """
+    以前处理过的单号索引
+
+    with SeenIndex() as index:
+        data, repeats = index.check(data, skip=True)
+
+    SQLite 连接只能在创建它的线程中使用，后台处理时应在工作线程中创建。
+    """
+
+    def __init__(self, path=None, session=None):
+        import sqlite3  # 只在用到索引时才导入
+
+        self.path = path or default_db_path()
+        self.session = session or current_session()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        # 临时表放在内存中；索引较大时多缓存一些页
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " session TEXT NOT NULL,"
+            " first_seen REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch (id TEXT PRIMARY KEY)")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def clear(self):
+        """清除全部记录"""
+        with self.conn:
+            self.conn.execute("DELETE FROM seen")
+
+    def check(self, data, skip=False, check=None):
+        """
+        找出以前的会话处理过的单号，并把本次的单号记入索引
+
+        参数:
+            data: 各类单号，同 formatting.filter_data 的返回值
+            skip: 是否从结果中去掉以前处理过的单号
+            check: 可选回调，每处理一批单号调用一次，抛出异常即可中止（此时不记录任何单号）
+
+        返回:
+            (data, repeats)，data 为新的字典（skip=False 时各类单号不变），
+            repeats 为各类别中以前处理过的单号个数 {"sls": n, ...}（重复出现的按次数计）
+        """
+        result = dict(data)
+        repeats = {}
+        now = time.time()
+        # 所有类别在同一个事务中记录，中止时全部回滚
+        with self.conn:
+            for key in formatting.CLASSES:
+                items = data[key]
+                old = set()
+                for start in range(0, len(items), _BATCH_SIZE):
+                    if check is not None:
+                        check()
+                    old.update(self._check_batch(key, items[start:start + _BATCH_SIZE], now))
+                repeats[key] = sum(1 for item in items if item in old) if old else 0
+                if skip and old:
+                    result[key] = IdList.pack([item for item in items if item not in old])
+        return result, repeats
+
+    def _check_batch(self, key, items, now):
+        """返回这一批中以前的会话处理过的单号，并记录新单号"""
+        conn = self.conn
+        conn.execute("DELETE FROM batch")
+        # 排好序再插入，主键B树按顺序追加
+        conn.executemany("INSERT OR IGNORE INTO batch (id) VALUES (?)", ((item,) for item in sorted(items)))
+        # CROSS JOIN 固定以这一批为外层逐个查主键，否则可能按整个索引表扫描
+        old = [row[0] for row in conn.execute(
+            "SELECT seen.id FROM batch CROSS JOIN seen ON seen.id = batch.id WHERE seen.session != ?",
+            (self.session,))]
+        conn.execute(
+            "INSERT OR IGNORE INTO seen (id, kind, session, first_seen) SELECT id, ?, ?, ? FROM batch",
+            (key, self.session, now))
+        return old
@@ -0,0 +1,215 @@
+"""
+导出结果到文件
+
+逐行写入，完整结果不会拼接成一个字符串:
+    .txt          与结果区域相同的文本（格式整理 / 批量查订单格式 / 批量跑数据格式）
+    .csv / .tsv   每类单号一列（SLS单号、订单编号、未知单号），第一行为列名
+    .xlsx         同上，工作表行数超过 Excel 上限时自动续写到下一个工作表
+
+批量格式分段后也可以每段导出为一个文本文件（见 export_chunks）。
+"""
+import csv
+import os
+import zipfile
+from itertools import chain, islice, zip_longest
+from xml.sax.saxutils import escape
+
+import formatting
+
+EXPORT_TYPES = (
+    ("文本文件", "*.txt"),
+    ("CSV文件", "*.csv"),
+    ("TSV文件", "*.tsv"),
+    ("Excel工作簿", "*.xlsx"),
+)
+
+# 写文件的缓冲区大小
+BUFFER_SIZE = 1 << 20
+
+# 每写这么多行回调一次进度
+_PROGRESS_ROWS = 10000
+
+# Excel 单个工作表的最大行数
+XLSX_MAX_ROWS = 1048576
+
+
+def export_kind(path):
+    """按扩展名判断导出类型: "txt" / "csv" / "tsv" / "xlsx"，其他扩展名按文本导出"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in ("csv", "tsv", "xlsx") else "txt"
+
+
+def export_columns(path, fmt, columns, progress=None, max_items=None, max_bytes=None, alignment=None):
+    """
+    把结果写入文件
+
+    参数:
+        fmt: 输出格式，只影响 .txt 导出
+        columns: [(类别, 单号序列), ...]，同 formatting.iter_format，序列可以是任意可迭代对象
+        max_items, max_bytes: 批量格式的分段上限，同样只影响 .txt 导出
+        alignment: 表格按列提取时与原表格逐行对应，同 formatting.iter_format，只影响 .txt 导出
+        progress: 可选回调 progress("export", 已写入的行数/段数)，抛出异常即可中止
+
+    中途出错或被中止时删除未写完的文件。
+    """
+    kind = export_kind(path)
+    try:
+        if kind == "txt":
+            _write_text(path, formatting.iter_format(fmt, columns, max_items, max_bytes, alignment), progress)
+        elif kind == "xlsx":
+            _write_xlsx(path, columns, progress)
+        else:
+            _write_table(path, columns, "\t" if kind == "tsv" else ",", progress)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+
+
+def chunk_path(path, key, number):
+    """第 number 段的文件名，如 result.txt -> result_sls_0001.txt"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{key}_{number:04d}{ext or '.txt'}"
+
+
+def export_chunks(path, fmt, columns, max_items=None, max_bytes=None, progress=None):
+    """
+    把批量格式的结果按段写入多个文本文件，每段一个文件，文件名见 chunk_path
+
+    参数:
+        columns, max_items, max_bytes: 同 formatting.iter_format
+        progress: 可选回调 progress("export", 已写入的段数)，抛出异常即可中止
+
+    返回:
+        写入的文件路径列表；中途出错或被中止时删除已写入的全部文件
+    """
+    written = []
+    try:
+        for key, number, text in formatting.iter_chunk_texts(fmt, columns, max_items, max_bytes):
+            chunk_file = chunk_path(path, key, number)
+            written.append(chunk_file)
+            with open(chunk_file, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            if progress is not None:
+                progress("export", len(written))
+    except BaseException:
+        for chunk_file in written:
+            try:
+                os.remove(chunk_file)
+            except OSError:
+                pass
+        raise
+    return written
+
+
+def _report_rows(rows, progress):
+    """逐行转发，每隔 _PROGRESS_ROWS 行回调一次进度"""
+    if progress is None:
+        yield from rows
+        return
+    for n, row in enumerate(rows, 1):
+        yield row
+        if n % _PROGRESS_ROWS == 0:
+            progress("export", n)
+
+
+def _table_rows(columns):
+    """表头加上各列按行对齐的单号"""
+    yield [formatting.CLASS_LABELS[key] for key, _ in columns]
+    yield from zip_longest(*(items for _, items in columns), fillvalue="")
+
+
+def _write_text(path, pieces, progress):
+    with open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as f:
+        for i, piece in enumerate(pieces, 1):
+            f.write(piece)
+            if progress is not None:
+                progress("export", i)
+
+
+def _write_table(path, columns, delimiter, progress):
+    # 带BOM的UTF-8，Excel 直接打开时中文列名不会乱码
+    with open(path, "w", encoding="utf-8-sig", newline="", buffering=BUFFER_SIZE) as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerows(_report_rows(_table_rows(columns), progress))
+
+
+def _write_xlsx(path, columns, progress):
+    """
+    直接生成最简的 xlsx（不依赖第三方库）
+
+    工作表XML通过 ZipFile.open(..., "w") 边生成边压缩写入，单元格使用内联字符串，
+    不需要先收集共享字符串表。
+    """
+    rows = _report_rows(_table_rows(columns), progress)
+    sheet_count = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        # 表头行总是存在，因此至少有一个工作表
+        for first in rows:
+            sheet_count += 1
+            with zf.open(f"xl/worksheets/sheet{sheet_count}.xml", "w") as raw:
+                _write_sheet(raw, chain([first], islice(rows, XLSX_MAX_ROWS - 1)))
+        _write_xlsx_parts(zf, sheet_count)
+
+
+def _write_sheet(raw, rows):
+    """逐块生成一个工作表的XML并写入"""
+    raw.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+              b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+              b'<sheetData>')
+    number = 0
+    while True:
+        block = list(islice(rows, 4096))
+        if not block:
+            break
+        parts = []
+        for row in block:
+            number += 1
+            parts.append(_row_xml(number, row))
+        raw.write("".join(parts).encode("utf-8"))
+    raw.write(b"</sheetData></worksheet>")
+
+
+def _row_xml(number, row):
+    # 空单元格不写出，其余单元格带上位置（A1、B1…），列数最多为3
+    cells = "".join(f'<c r="{"ABC"[i]}{number}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+                    for i, value in enumerate(row) if value)
+    return f'<row r="{number}">{cells}</row>'
+
+
+def _write_xlsx_parts(zf, sheet_count):
+    """写入工作簿结构等固定内容"""
+    sheets = range(1, sheet_count + 1)
+    zf.writestr("[Content_Types].xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                  'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                  for i in sheets)
+        + '</Types>'))
+    zf.writestr("_rels/.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'))
+    zf.writestr("xl/workbook.xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+        + "".join(f'<sheet name="单号{i}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets)
+        + '</sheets></workbook>'))
+    zf.writestr("xl/_rels/workbook.xml.rels", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + "".join(f'<Relationship Id="rId{i}" '
+                  'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                  f'Target="worksheets/sheet{i}.xml"/>' for i in sheets)
+        + '</Relationships>'))
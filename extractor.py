@@ -0,0 +1,1072 @@
+"""
+订单号提取引擎
+
+按匹配区间(span)工作：SLS单号、订单编号、未知单号依次在同一份原始文本上
+用 pos/endpos 扫描，已识别的区间只记录下来作为"空白"，不再复制或改写文本，
+整体为线性时间。结果与早期"逐个 str.replace 置空 + 循环 re.search"的实现
+完全一致，包括同一单号在文本其他位置出现时也会被一并置空的行为。
+
+各类单号以 IdList（换行符连接的文本 + 偏移量数组）返回，用法同列表；
+分片提取时每个分片的结果立即打包，几百万个单号也不会同时存在几百万个 str 对象。
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+import id_types
+from idlist import IdList
+
+# 单号类型（SLS单号的国家代码和长度、订单编号规则等）见 id_types 模块，可由配置文件修改
+_TYPES = id_types.ACTIVE
+
+# SLS单号模式，默认为 (?:MX|CL|CO)[A-Za-z0-9]{16}|(?:BR|MY|PH|SG|TH|TW|VN)[A-Za-z0-9]{13}
+SLS_PATTERN = _TYPES.sls_pattern()
+
+# 订单编号模式，默认为6位数字开头 + 8-9位字母数字混合字符，且要求同一行后面至少还有一个字母
+ORDER_PATTERN = _TYPES.order.pattern()
+
+# 未知单号候选，默认为至少8位的字母数字组合
+UNKNOWN_PATTERN = _TYPES.unknown_pattern()
+
+
+def _prefix_dispatch(prefixes, classes_from=None):
+    """
+    匹配一组等长前缀的正则：先用各位置的字符集快速定位，再用后顾断言确认是哪个前缀
+
+    例如 MX/CL/CO 得到 [CM][LOX](?<=MX|CL|CO)，比直接扫描 (?:MX|CL|CO) 的分支快数倍。
+    classes_from 为生成字符集所用的前缀（默认即 prefixes）：各分支用相同的字符集时，
+    re 可以对整个正则做首字符快速跳过。
+    """
+    classes_from = classes_from or prefixes
+    size = len(prefixes[0])
+    head = f"[{''.join(sorted({p[0] for p in classes_from}))}]"
+    if size == 1:
+        return f"{head}(?<={'|'.join(prefixes)})" if classes_from is not prefixes else head
+    rest = f"[{''.join(sorted({c for p in classes_from for c in p[1:]}))}]"
+    if size > 2:
+        rest += f"{{{size - 1}}}"
+    return f"{head}{rest}(?<={'|'.join(prefixes)})"
+
+
+class _Patterns:
+    """
+    扫描用的一组正则，由 id_types 中的单号类型生成
+
+    分别为 str 和 bytes（内存映射的文件）各编译一份，扫描函数按文本类型选用，
+    其余逻辑两者共用。bytes 版本中的 \\d 只匹配ASCII数字。
+    """
+
+    def __init__(self, kind, types=_TYPES):
+        def compile(pattern):
+            return re.compile(pattern if kind is str else pattern.encode("ascii"))
+
+        # 全部前缀按长度分组，用于查找单号内部是否又出现了前缀
+        prefix_groups = {}
+        for sls_type in types.sls:
+            for size, prefixes in sls_type.prefix_groups():
+                group = prefix_groups.setdefault(size, [])
+                for prefix in prefixes:
+                    if prefix not in group:
+                        group.append(prefix)
+        self.sls_prefix = compile("|".join(_prefix_dispatch(group) for group in prefix_groups.values()) or "(?!)")
+        # 与 SLS_PATTERN 等价：全部类型按优先级合成一个正则，各分支用前缀分派，只扫描一遍
+        self.sls = compile("|".join(
+            f"{_prefix_dispatch(prefixes, prefix_groups[size])}[{sls_type.charset}]{{{sls_type.length - size}}}"
+            for sls_type in types.sls for size, prefixes in sls_type.prefix_groups()) or "(?!)")
+        lengths = [sls_type.length for sls_type in types.sls] or [1]
+        self.sls_min_length = min(lengths)
+        self.sls_max_length = max(lengths)
+        self.sls_max_prefix = max(prefix_groups, default=1)
+
+        # 去掉 (?=.*[A-Za-z]) 前瞻后的订单编号模式，前瞻条件按行单独判断
+        order = types.order
+        self.order_digits = order.digits
+        self.order_min_length = order.min_length
+        self.order_max_length = order.max_length
+        self.order_letter_on_line = order.letter_on_line
+        self.order = compile(rf"\d{{{order.digits}}}[{order.charset}]"
+                             f"{{{order.min_length - order.digits},{order.max_length - order.digits}}}")
+        self.digits = compile(rf"\d{{{order.digits}}}")
+        # 字符集中的字符；同时包含对应的字节值，bytes 文本按下标取到的是整数
+        order_chars = {chr(c) for c in range(128) if re.fullmatch(f"[{order.charset}]", chr(c))}
+        self.order_chars = frozenset(order_chars) | frozenset(ord(c) for c in order_chars)
+
+        self.unknown = compile(types.unknown_pattern())
+        self.unknown_min_length = types.unknown_min_length
+
+        # 零宽前瞻扫描可以找出所有(包括相互重叠的)符合单号形状的位置
+        self.sls_shape = compile(f'(?=({types.sls_pattern()}))')
+        self.order_shape = compile(rf'(?=\d{{{order.digits}}}[{order.charset}]{{{order.min_length - order.digits}}})')
+
+        # 区间内最后一个字母
+        self.last_letter = compile(r'[A-Za-z](?=[^A-Za-z]*\Z)')
+
+        self.newline = "\n" if kind is str else b"\n"
+
+
+_STR_PATTERNS = _Patterns(str)
+_BYTES_PATTERNS = _Patterns(bytes)
+
+
+def _patterns(text):
+    return _STR_PATTERNS if isinstance(text, str) else _BYTES_PATTERNS
+
+
+# 流式处理时每次读取的字符数
+CHUNK_SIZE = 1 << 20
+
+# 超过该字符数的输入才分片交给多个进程并行提取
+PARALLEL_THRESHOLD = 4 * 1024 * 1024
+
+# 并行提取时每个分片的最小字符数
+_MIN_SHARD_SIZE = 1 << 20
+
+# 导入文件时每个分片的最大字节数，同时在内存中的分片数有上限，内存占用与文件大小无关
+FILE_SHARD_SIZE = 8 << 20
+
+# 每处理这么多个匹配/区间回调一次进度
+_PROGRESS_INTERVAL = 4096
+
+# 字母数字字符；同时包含对应的字节值，bytes 文本按下标取到的是整数
+_ALNUM_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+_ALNUM = frozenset(_ALNUM_CHARS) | frozenset(_ALNUM_CHARS.encode("ascii"))
+
+
+class Cancelled(Exception):
+    """提取过程被取消"""
+
+
+def extract_order_numbers(text, progress=None):
+    """
+    提取SLS单号、订单编号和未知单号
+
+    参数:
+        text: 原始文本
+        progress: 可选的进度回调，见 extract_range
+
+    返回:
+        {"sls": IdList, "order": IdList, "unknown": IdList}，各类单号按出现顺序排列
+    """
+    return extract_range(text, 0, len(text), progress)
+
+
+def extract_range(text, start, end, progress=None):
+    """
+    在 text[start:end] 范围内提取单号，不复制文本
+
+    start/end 应落在行边界上（例如 0、len(text) 或紧跟在换行符之后），
+    这样订单编号"同一行后面有字母"的判断才与整段处理一致。
+
+    progress 为可选回调 progress(stage, pos)，stage 依次为 "sls"、"order"、"unknown"，
+    pos 为当前扫描到的位置，每个阶段开始时至少汇报一次。回调中抛出 Cancelled 即可中止提取。
+    """
+    if progress is not None:
+        progress("sls", start)
+    sls, sls_spans, sls_extras = _scan_sls(text, start, end, progress)
+    blanks = _resolve_blanks(text, sls, sls_spans, sls_extras)
+
+    orders, order_spans, order_extras = _scan_orders(text, blanks, start, end, progress)
+    order_blanks = _resolve_blanks(text, orders, order_spans, order_extras)
+
+    blanks = sorted(blanks + order_blanks)
+    unknown = _scan_unknown(text, blanks, start, end, progress)
+
+    return {"sls": IdList.pack(sls), "order": IdList.pack(orders), "unknown": IdList.pack(unknown)}
+
+
+def extract_parallel(text, progress=None, max_workers=None):
+    """
+    多进程并行提取，结果（包括顺序）与 extract_order_numbers 完全一致
+
+    文本在换行符处切成若干分片，由进程池分别完成三类单号的识别后按原顺序合并。
+    跨分片的影响只有一种：某分片里匹配到的单号会把其他分片中同一字符串的
+    出现位置置空。各分片因此额外返回"未被选中的同形状字符串"，合并时与全局
+    单号集合求交集；交集为空（绝大多数情况）即可直接合并，否则在本进程中
+    按全局顺序重新计算受影响的分片。
+
+    文本不足 PARALLEL_THRESHOLD 或无法切分时直接串行处理；只有一个CPU时在本进程中
+    逐个处理分片（每片不超过 FILE_SHARD_SIZE），各分片的结果随即打包，
+    不会同时保留整段文本的全部单号字符串。
+    progress 同 extract_order_numbers，分片阶段的 stage 为 "parallel"（多进程）或 "shards"（单进程）；
+    progress 带有 add_seconds(step, seconds) 属性时（见 instrumentation.StageRecorder.wrap_progress），
+    每个分片完成后用它汇报分片中 "sls"、"order"、"unknown" 各步的耗时。
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if len(text) < PARALLEL_THRESHOLD:
+        return extract_order_numbers(text, progress)
+
+    bounds = _shard_bounds(text, workers, FILE_SHARD_SIZE if workers < 2 else None)
+    if len(bounds) < 2:
+        return extract_order_numbers(text, progress)
+
+    stage = "parallel" if workers > 1 else "shards"
+    if progress is not None:
+        progress(stage, 0)
+    return _extract_sharded(text, bounds, workers, progress, stage)
+
+
+def _extract_sharded(text, bounds, workers, progress, stage="parallel", take=None):
+    """
+    按 bounds 分片提取后合并，见 extract_parallel
+
+    workers 为 1 时在本进程中逐个处理分片。take(start, end) 返回分片内容，
+    默认为 text[start:end]。
+    """
+    # 进程池相关模块只在真正并行时导入，不拖慢程序启动
+    from concurrent.futures.process import BrokenProcessPool
+
+    try:
+        shards = _run_shards(text, bounds, workers, progress, stage, take)
+    except BrokenProcessPool:
+        _shutdown_pool()
+        return extract_order_numbers(text, progress)
+
+    # SLS单号重叠出现在其他分片中时，置空结果会改变后续订单编号的识别，直接串行重算
+    if _conflicts(shards, "sls"):
+        return extract_order_numbers(text, progress)
+
+    conflicts = _conflicts(shards, "order")
+    ranks = None
+    for (start, end), shard in zip(bounds, shards):
+        if conflicts.isdisjoint(shard["order_extras"]):
+            continue
+        if ranks is None:
+            ranks = _first_seen_ranks(o for s in shards for o in s["order"])
+        began = time.perf_counter()
+        shard["unknown"] = _rescan_unknown(text, start, end, ranks)
+        _report_seconds(progress, {"unknown": time.perf_counter() - began})
+
+    return {key: IdList.concat(shard[key] for shard in shards) for key in ("sls", "order", "unknown")}
+
+
+def extract_shards(text, bounds, progress=None, max_workers=None):
+    """
+    按给定的分片边界（应落在行边界上）分别提取，返回与 bounds 对应的分片结果列表
+
+    分片结果附带检查跨分片影响所需的字符串，可用 merge_shards 合并。
+    文本达到 PARALLEL_THRESHOLD 时多进程并行。progress 同 extract_parallel。
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if len(text) < PARALLEL_THRESHOLD:
+        workers = 1
+    return _run_shards(text, bounds, workers, progress)
+
+
+def merge_shards(shards, progress=None):
+    """
+    按顺序合并 extract_shards 得到的分片结果（可以来自不同的文本，只要按原文顺序排列）
+
+    分片之间没有相互影响时（绝大多数情况）结果与整段提取完全一致；
+    否则返回 None，调用方需要对整段文本重新提取。
+    progress 带有 add_seconds 属性时（见 extract_parallel）汇报各分片当初提取时各步的耗时。
+    """
+    for shard in shards:
+        _report_seconds(progress, shard["seconds"])
+    if _conflicts(shards, "sls") or _conflicts(shards, "order"):
+        return None
+    return {key: IdList.concat(shard[key] for shard in shards) for key in ("sls", "order", "unknown")}
+
+
+def _conflicts(shards, key):
+    """
+    各分片中"未被选中的同形状字符串"里，在某个分片中被识别为单号的那些
+
+    这类字符串通常很少，因此只为它们建集合，再逐个检查单号，
+    不必为全部单号建集合（几百万个单号时集合本身就要占用几百MB）。
+    """
+    extras = set()
+    for shard in shards:
+        extras.update(shard[key + "_extras"])
+    if not extras:
+        return extras
+    return {item for shard in shards for item in shard[key] if item in extras}
+
+
+# 缓存中没有该项（缓存的结果本身可以是 None）
+_MISSING = object()
+
+
+class ExtractionCache:
+    """
+    最近几次提取结果的LRU缓存
+
+    以文本长度和哈希值为键，同一段文本切换输出选项或格式时不必重新扫描。
+    返回的结果在多次调用间共享，调用方不应修改其中的列表。可在多个线程中使用。
+    """
+
+    def __init__(self, maxsize=3):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extract(self, text, progress=None, extract=None, tag=None):
+        """
+        返回缓存的结果，未命中时调用 extract（默认 extract_parallel）并缓存
+
+        tag 区分同一段文本的不同提取方式，例如表格按列提取时为所选的列。
+        extract 返回 None 时（例如 tabular.extract_table 判断文本不是表格）同样缓存，不会每次重新判断。
+        """
+        return self._get((len(text), hash(text), tag), lambda: (extract or extract_parallel)(text, progress))
+
+    def extract_file(self, path, progress=None):
+        """同 extract，以文件路径、大小和修改时间为键，未命中时调用 extract_file"""
+        st = os.stat(path)
+        key = ("file", os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        return self._get(key, lambda: extract_file(path, progress))
+
+    def _get(self, key, compute):
+        with self._lock:
+            data = self._entries.get(key, _MISSING)
+            if data is not _MISSING:
+                self._entries.move_to_end(key)
+                return data
+
+        data = compute()
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _shard_bounds(text, workers, max_size=None):
+    """按换行符把文本切成若干分片，返回 [(start, end), ...]"""
+    size = max(len(text) // (workers * 2), _MIN_SHARD_SIZE)
+    if max_size is not None:
+        size = min(size, max_size)
+    bounds = []
+    start = 0
+    while start < len(text):
+        cut = text.find(_patterns(text).newline, start + size)
+        end = len(text) if cut == -1 else cut + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _run_shards(text, bounds, workers, progress, stage="parallel", take=None):
+    """把分片提交给进程池，同时在途的分片数受限以控制内存"""
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    if take is None:
+        def take(start, end):
+            return text[start:end]
+
+    if workers < 2:
+        results = []
+        for start, end in bounds:
+            results.append(_extract_shard(take(start, end)))
+            _report_seconds(progress, results[-1]["seconds"])
+            if progress is not None:
+                progress(stage, end)
+        return results
+
+    pool = _get_pool(workers)
+    results = [None] * len(bounds)
+    pending = {}
+    next_index = 0
+    done_size = 0
+    try:
+        while next_index < len(bounds) or pending:
+            while next_index < len(bounds) and len(pending) < workers * 2:
+                start, end = bounds[next_index]
+                pending[pool.submit(_extract_shard, take(start, end))] = next_index
+                next_index += 1
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                results[index] = future.result()
+                _report_seconds(progress, results[index]["seconds"])
+                done_size += bounds[index][1] - bounds[index][0]
+            if progress is not None:
+                progress(stage, done_size)
+    finally:
+        for future in pending:
+            future.cancel()
+    return results
+
+
+def _extract_shard(shard):
+    """
+    在子进程中提取一个分片，并附带合并时检查跨分片影响所需的字符串
+
+    "seconds" 为 "sls"、"order"、"unknown" 各步的耗时，由 _report_seconds 汇报给进度回调。
+    """
+    end = len(shard)
+    t0 = time.perf_counter()
+    sls, sls_spans, sls_extras = _scan_sls(shard, 0, end)
+    blanks = _resolve_blanks(shard, sls, sls_spans, sls_extras)
+
+    t1 = time.perf_counter()
+    orders, order_spans, order_extras = _scan_orders(shard, blanks, 0, end)
+    order_blanks = _resolve_blanks(shard, orders, order_spans, order_extras)
+
+    t2 = time.perf_counter()
+    unknown = _scan_unknown(shard, sorted(blanks + order_blanks), 0, end)
+    t3 = time.perf_counter()
+    return {
+        "sls": IdList.pack(sls),
+        "order": IdList.pack(orders),
+        "unknown": IdList.pack(unknown),
+        "sls_extras": [shard[s:e] for s, e in sls_extras],
+        "order_extras": [shard[s:e] for s, e in order_extras],
+        "seconds": {"sls": t1 - t0, "order": t2 - t1, "unknown": t3 - t2},
+    }
+
+
+def _report_seconds(progress, seconds):
+    """进度回调带有 add_seconds 属性时，汇报分片中各步的耗时 {步骤: 秒数}"""
+    add = getattr(progress, "add_seconds", None)
+    if add is not None:
+        for step, value in seconds.items():
+            add(step, value)
+
+
+def _rescan_unknown(text, start, end, ranks):
+    """按全局的订单编号顺序重新计算一个分片中的未知单号"""
+    _, sls_spans, _ = _scan_sls(text, start, end)
+    orders, order_spans, order_extras = _scan_orders(text, sls_spans, start, end)
+    order_blanks = _resolve_blanks(text, orders, order_spans, order_extras, ranks)
+    return IdList.pack(_scan_unknown(text, sorted(sls_spans + order_blanks), start, end))
+
+
+_pool = None
+_pool_workers = 0
+# 界面、本地服务等可能在多个线程中同时提交分片
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """复用同一个进程池，避免每次处理都重新启动子进程"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            _shutdown_pool()
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def extract_file(path, progress=None, max_workers=None):
+    """
+    直接从文件提取单号，不把文件内容读入字符串
+
+    文件以只读方式映射到内存，用 bytes 版本的正则按分片扫描映射区域，
+    每个分片处理完即释放对应页面，内存占用与文件大小基本无关。
+    结果与把文件内容解码后调用 extract_order_numbers 一致
+    （唯一的区别是订单编号开头的6位只认ASCII数字，不认全角数字）。
+
+    UTF-8（含BOM）及纯ASCII文件走映射扫描，不足 PARALLEL_THRESHOLD 的文件在本进程中扫描；
+    UTF-16 或不是合法 UTF-8 的文件（例如 GBK 编码的导出）按系统默认编码解码后整段处理。
+
+    压缩文件（.gz / .bz2 / .zip）交给 extract_archive 边解压边提取。
+
+    progress 同 extract_order_numbers，pos 为字节位置；检查编码阶段的 stage 为 "encoding"，
+    分片扫描阶段为 "file"（单进程）或 "parallel"（多进程）。
+    """
+    import mmap
+
+    import archive
+
+    if archive.is_archive(path):
+        return extract_archive(path, progress, max_workers)
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return {"sls": IdList(), "order": IdList(), "unknown": IdList()}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            encoding = _detect_encoding(mm, progress)
+            if encoding is not None:
+                return extract_parallel(mm[:].decode(encoding, errors="replace"), progress, max_workers)
+
+            workers = max_workers or os.cpu_count() or 1
+            # 小文件不值得启动进程池，与 extract_parallel 相同，在本进程中扫描
+            if size < PARALLEL_THRESHOLD:
+                workers = 1
+            bounds = _shard_bounds(mm, workers, FILE_SHARD_SIZE)
+            if progress is not None:
+                progress("parallel" if workers > 1 else "file", 0)
+
+            def take(start, end):
+                shard = mm[start:end]
+                _release_pages(mm, start, end)
+                return shard
+
+            data = _extract_sharded(mm, bounds, workers, progress,
+                                    "parallel" if workers > 1 else "file", take)
+
+    # 单号只含ASCII字符，打包的文本整体解码即可，偏移量不变
+    return {key: items.decode("ascii") for key, items in data.items()}
+
+
+def _detect_encoding(mm, progress=None):
+    """
+    检查映射的文件能否按 UTF-8 按字节扫描
+
+    返回 None 表示可以（UTF-8、带BOM的UTF-8或纯ASCII），否则返回应当用于解码的编码。
+    """
+    import codecs
+    import locale
+
+    if mm[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return "utf-16"
+    if progress is not None:
+        progress("encoding", 0)
+    # UTF-8 多字节字符的每个字节都不小于 0x80，不会被误认为字母、数字或换行；
+    # BOM 同理，可以原样留在扫描范围内
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for start in range(0, len(mm), FILE_SHARD_SIZE):
+            end = min(start + FILE_SHARD_SIZE, len(mm))
+            decoder.decode(mm[start:end], final=end == len(mm))
+            _release_pages(mm, start, end)
+            if progress is not None:
+                progress("encoding", end)
+    except UnicodeDecodeError:
+        return locale.getpreferredencoding(False)
+    return None
+
+
+def _release_pages(mm, start, end):
+    """提示系统可以回收映射中已处理完的页面（不支持时什么也不做）"""
+    import mmap
+
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    start -= start % mmap.PAGESIZE
+    try:
+        mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+    except (OSError, ValueError):
+        pass
+
+
+def extract_archive(path, progress=None, max_workers=None):
+    """
+    边解压边提取压缩文件（.gz / .bz2 / .zip，见 archive 模块）中的单号
+
+    每个成员的解压流按 FILE_SHARD_SIZE 逐块读取、在换行符处切开，每块作为一个分片提取后
+    只保留打包的结果，解压后的内容不会整体放入内存。分片结果的合并与 extract_parallel 相同，
+    结果与把各成员解压后依次连接（每个成员以换行结尾）再调用 extract_order_numbers 一致；
+    分片之间相互影响时只重新解压受影响的成员，重算其中受影响的分片。
+    唯一需要整段重算的情况是SLS单号重叠出现在其他分片中，实际数据中几乎不会遇到。
+
+    有多个成员的 zip 由进程池中的多个进程分别解压、提取各成员；只有一个成员时在本进程中
+    解压，各块交给进程池提取。解压后的数据不足 PARALLEL_THRESHOLD 时不启动进程池。
+    每个成员的编码单独判断，规则同 extract_file。
+
+    progress 同 extract_order_numbers，stage 为 "archive"，pos 为已读取的压缩数据字节数。
+    """
+    import archive
+
+    names = archive.members(path)
+    workers = max_workers or os.cpu_count() or 1
+    if progress is not None:
+        progress("archive", 0)
+    # 成员解压后的总大小达到 PARALLEL_THRESHOLD 才启动进程池分别处理各成员
+    if len(names) > 1 and workers > 1 and sum(size for _, _, size in names) >= PARALLEL_THRESHOLD:
+        results = _run_members(path, names, workers, progress)
+    else:
+        results = [_member_shards(path, name, progress, workers) for name, _, _ in names]
+
+    shards = [shard for _, member_shards in results for shard in member_shards]
+    if _conflicts(shards, "sls"):
+        return extract_order_numbers(_archive_text(path, names, results), progress)
+
+    conflicts = _conflicts(shards, "order")
+    ranks = None
+    for (name, _, _), (encoding, member_shards) in zip(names, results):
+        affected = {i for i, shard in enumerate(member_shards) if not conflicts.isdisjoint(shard["order_extras"])}
+        if not affected:
+            continue
+        if ranks is None:
+            ranks = _first_seen_ranks(o for s in shards for o in s["order"])
+            # 按字节扫描的分片要用字节串查找（解码提取的成员可能有全角数字开头的订单编号）
+            byte_ranks = {item.encode("utf-8"): rank for item, rank in ranks.items()}
+        with archive.open_member(path, name) as (stream, _):
+            for i, chunk in enumerate(_member_chunks(stream, encoding)):
+                if i in affected:
+                    began = time.perf_counter()
+                    unknown = _rescan_unknown(chunk, 0, len(chunk), ranks if encoding else byte_ranks)
+                    member_shards[i]["unknown"] = unknown.decode("ascii")
+                    _report_seconds(progress, {"unknown": time.perf_counter() - began})
+
+    return {key: IdList.concat(shard[key] for shard in shards) for key in ("sls", "order", "unknown")}
+
+
+def _run_members(path, names, workers, progress):
+    """把各成员提交给进程池分别解压、提取，同时在途的成员数受限以控制内存"""
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool = _get_pool(workers)
+    results = [None] * len(names)
+    pending = {}
+    next_index = 0
+    done_size = 0
+    try:
+        while next_index < len(names) or pending:
+            while next_index < len(names) and len(pending) < workers * 2:
+                pending[pool.submit(_member_shards, path, names[next_index][0])] = next_index
+                next_index += 1
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                results[index] = future.result()
+                for shard in results[index][1]:
+                    _report_seconds(progress, shard["seconds"])
+                done_size += names[index][1]
+            if progress is not None:
+                progress("archive", done_size)
+    except BrokenProcessPool:
+        _shutdown_pool()
+        return [_member_shards(path, name, progress) for name, _, _ in names]
+    finally:
+        for future in pending:
+            future.cancel()
+    return results
+
+
+def _member_shards(path, member, progress=None, workers=1):
+    """
+    解压并提取压缩包中的一个成员（也在子进程中执行）
+
+    返回:
+        (encoding, shards)：encoding 为 None 表示按 UTF-8 字节扫描，否则为解码所用的编码；
+        shards 为各块的分片结果，其中的单号已转为 str
+    """
+    import archive
+    import codecs
+    import locale
+
+    with archive.open_member(path, member) as (stream, position):
+        encoding = "utf-16" if stream.peek(2)[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE) else None
+        try:
+            return encoding, _chunk_shards(_member_chunks(stream, encoding), workers, progress, position)
+        except UnicodeDecodeError:
+            pass
+    # 不是合法的 UTF-8（例如 GBK 编码的导出），按系统默认编码解码后重新提取
+    encoding = locale.getpreferredencoding(False)
+    with archive.open_member(path, member) as (stream, position):
+        return encoding, _chunk_shards(_member_chunks(stream, encoding), workers, progress, position)
+
+
+def _member_chunks(stream, encoding=None):
+    """
+    逐块读取解压流，在换行符处切开
+
+    encoding 为 None 时产出 bytes，同时检查是否为合法的 UTF-8，不是时抛出 UnicodeDecodeError；
+    否则按 encoding 解码后产出 str。切分只取决于内容，重新读取同一成员得到的分块完全相同。
+    """
+    import codecs
+    import io
+
+    if encoding is None:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        tail = b""
+    else:
+        # newline="" 保留原来的换行符，与整段解码的结果相同
+        stream = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+        tail = ""
+    newline = _patterns(tail).newline
+    while True:
+        block = stream.read(FILE_SHARD_SIZE)
+        if encoding is None:
+            decoder.decode(block, final=not block)
+        if not block:
+            break
+        buffer = tail + block
+        cut = buffer.rfind(newline) + 1
+        if cut == 0:
+            # 没有换行符时与 _shard_bounds 相同，继续并入下一块
+            tail = buffer
+            continue
+        yield buffer[:cut]
+        tail = buffer[cut:]
+    if tail:
+        yield tail
+
+
+def _chunk_shards(chunks, workers, progress=None, position=None):
+    """
+    逐块提取，返回各块的分片结果，单号转为 str
+
+    先在本进程中提取，解压出的数据达到 PARALLEL_THRESHOLD 后（workers 大于 1 时）
+    余下的块才交给进程池，小文件不必启动进程池。
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from itertools import chain
+
+    chunks = iter(chunks)
+    shards = []
+    size = 0
+    while workers < 2 or size < PARALLEL_THRESHOLD:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return shards
+        shards.append(_decode_shard(_extract_shard(chunk)))
+        _report_seconds(progress, shards[-1]["seconds"])
+        size += len(chunk)
+        if progress is not None:
+            progress("archive", position())
+
+    chunk = next(chunks, None)
+    if chunk is None:
+        return shards
+    chunks = chain([chunk], chunks)
+    pool = _get_pool(workers)
+    pending = {}
+    exhausted = False
+    try:
+        while not exhausted or pending:
+            while not exhausted and len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[pool.submit(_extract_shard, chunk)] = len(shards)
+                shards.append(None)
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                shards[index] = _decode_shard(future.result())
+                _report_seconds(progress, shards[index]["seconds"])
+            if progress is not None:
+                progress("archive", position())
+    finally:
+        for future in pending:
+            future.cancel()
+    return shards
+
+
+def _decode_shard(shard):
+    """按字节扫描得到的分片结果转为 str（单号只含ASCII字符，偏移量不变）"""
+    for key in ("sls", "order", "unknown"):
+        shard[key] = shard[key].decode("ascii")
+    for key in ("sls_extras", "order_extras"):
+        shard[key] = [item.decode("ascii") if isinstance(item, bytes) else item for item in shard[key]]
+    return shard
+
+
+def _archive_text(path, names, results):
+    """各成员解压、解码后依次连接的全文，只在无法按分片合并时使用"""
+    import archive
+
+    parts = []
+    for (name, _, _), (encoding, _) in zip(names, results):
+        with archive.open_member(path, name) as (stream, _):
+            text = stream.read().decode(encoding or "utf-8", errors="replace")
+        parts.append(text if not text or text.endswith("\n") else text + "\n")
+    return "".join(parts)
+
+
+def extract_stream(stream, chunk_size=CHUNK_SIZE):
+    """
+    逐块读取文本流并提取单号，内存占用只与块大小有关
+
+    每块在最后一个换行符处切开，余下部分并入下一块，因此单号不会被块边界截断。
+    某一行超过块大小时退而在最后一个非字母数字字符处切开。
+
+    与整段处理的区别：置空只在所在块内进行。SLS单号和订单编号都只会把本块中同一字符串的
+    其他出现位置置空，其他块中的这些位置照常识别，订单编号和未知单号因此可能多出或缺少
+    个别几个；超长行被切开后，"同一行后面有字母"的判断也只看到当前块。
+    需要与整段处理完全一致时用 extract_file（压缩文件为 extract_archive）。
+
+    参数:
+        stream: 文本流（需支持 read(size)）
+        chunk_size: 每次读取的字符数
+
+    返回:
+        生成器，每块产出一个与 extract_order_numbers 相同结构的字典
+    """
+    tail = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer = tail + chunk
+        cut = buffer.rfind("\n") + 1
+        if cut == 0 and len(buffer) >= chunk_size:
+            cut = _last_separator(buffer)
+        if cut == 0:
+            tail = buffer
+            continue
+        yield extract_range(buffer, 0, cut)
+        tail = buffer[cut:]
+    if tail:
+        yield extract_range(tail, 0, len(tail))
+
+
+def _last_separator(buffer):
+    """返回最后一个非字母数字字符之后的位置，找不到返回 0"""
+    for i in range(len(buffer) - 1, -1, -1):
+        if buffer[i] not in _ALNUM and not buffer[i].isdigit():
+            return i + 1
+    return 0
+
+
+def is_unknown_candidate(item):
+    """纯数字，或只含大写字母和数字（不含小写字母）的组合"""
+    return (item.isdigit() or item.isupper()) and not item.isalpha()
+
+
+def classify_id(item):
+    """
+    整段文本恰好是一个单号时返回它的类别 "sls" / "order" / "unknown"，否则返回 None
+
+    结果与对这段文本单独调用 extract_order_numbers 一致，但只做几次锚定匹配，
+    适合逐个判断表格的单元格（见 tabular 模块）。返回 None 时文本中仍可能含有单号，
+    需要时再交给 extract_order_numbers。
+    """
+    rx = _patterns(item)
+    m = rx.sls.match(item)
+    if m is not None and m.end() == len(item):
+        return "sls"
+    if rx.sls.search(item) is not None:
+        return None
+    # 要求同一行后面有字母时，纯数字的文本中不会有订单编号
+    if not (rx.order_letter_on_line and item.isdigit()):
+        m = rx.order.match(item)
+        if (m is not None and m.end() == len(item)
+                and not (rx.order_letter_on_line and item[rx.order_digits:].isdigit())):
+            return "order"
+        if rx.order.search(item) is not None:
+            return None
+    if rx.unknown.fullmatch(item) is not None and is_unknown_candidate(item):
+        return "unknown"
+    return None
+
+
+def _gaps(blanks, start, end):
+    """返回 blanks 之间未被置空的区间起止位置列表"""
+    starts = [start]
+    starts.extend([e for _, e in blanks])
+    ends = [s for s, _ in blanks]
+    ends.append(end)
+    return starts, ends
+
+
+def _scan_sls(text, start, end, progress=None):
+    """
+    查找SLS单号
+
+    返回 (单号列表, 对应区间, 与已匹配区间重叠的其他同形状区间)。
+    后者只在单号内部又以国家代码开头时才可能非空。
+    """
+    rx = _patterns(text)
+    matches = []
+    spans = []
+    extras = []
+    for m in rx.sls.finditer(text, start, end):
+        s, e = m.span()
+        matches.append(m.group())
+        spans.append((s, e))
+        if progress is not None and len(spans) % _PROGRESS_INTERVAL == 0:
+            progress("sls", e)
+        # 最短的单号后面不是字母数字时，内部不可能再开始另一个单号（它会超出当前单号的末尾）
+        if e - s <= rx.sls_min_length and (e == end or text[e] not in _ALNUM):
+            continue
+        if rx.sls_prefix.search(text, s + 1, min(e + rx.sls_max_prefix - 1, end)):
+            for x in rx.sls_shape.finditer(text, s + 1, min(e + rx.sls_max_length - 1, end)):
+                if x.start() >= e:
+                    break
+                extras.append(x.span(1))
+    return matches, spans, extras
+
+
+def _scan_orders(text, blanks, start, end, progress=None):
+    """
+    在SLS单号置空后的文本中查找订单编号
+
+    返回值同 _scan_sls；extras 为所有未被选中的同形状区间，
+    用于模拟"同一编号在其他位置出现也被置空"的行为。
+    """
+    rx = _patterns(text)
+    gap_starts, gap_ends = _gaps(blanks, start, end)
+    matches = []
+    spans = []
+    extras = []
+
+    # 当前行的结束位置及该行最后一个(未被置空的)字母位置
+    line_end = start - 1
+    last_letter = -1
+    # 该位置之前的本行剩余部分后面已没有字母，不会再产生匹配
+    dead_until = start - 1
+
+    for gi in range(len(gap_starts)):
+        a, b = gap_starts[gi], gap_ends[gi]
+        if progress is not None and gi % _PROGRESS_INTERVAL == 0:
+            progress("order", a)
+        if b - a < rx.order_min_length:
+            continue
+        pos = a
+        while pos < b:
+            if pos <= dead_until:
+                stop = min(b, dead_until)
+                _collect_order_shapes(text, pos, stop, b, extras)
+                pos = stop + 1
+                continue
+
+            m = rx.order.search(text, pos, b)
+            if m is None:
+                break
+            p, e = m.span()
+            item = m.group()
+
+            # 对应原模式中的 (?=.*[A-Za-z])：本行后面必须还有字母。
+            # 编号本身后半段含字母时直接满足，否则才需要查看整行
+            if rx.order_letter_on_line and item[rx.order_digits:].isdigit():
+                if p > line_end:
+                    line_end = text.find(rx.newline, p, end)
+                    if line_end == -1:
+                        line_end = end
+                    last_letter = _last_letter(text, gap_starts, gap_ends, gi, p, line_end)
+                if last_letter < p + rx.order_digits:
+                    dead_until = line_end
+                    pos = p
+                    continue
+
+            matches.append(item)
+            spans.append((p, e))
+            # 比匹配到的更短的同形状字符串
+            for q in range(p + rx.order_min_length, e):
+                extras.append((p, q))
+            if rx.digits.search(text, p + 1, min(e + rx.order_digits - 1, b)):
+                _collect_order_shapes(text, p + 1, e, b, extras)
+            pos = e
+    return matches, spans, extras
+
+
+def _collect_order_shapes(text, lo, hi, endpos, extras):
+    """收集 [lo, hi) 内所有订单编号形状的起点及其各种可能的长度（默认为14位和15位）"""
+    rx = _patterns(text)
+    for m in rx.order_shape.finditer(text, lo, endpos):
+        p = m.start()
+        if p >= hi:
+            break
+        q = p + rx.order_min_length
+        extras.append((p, q))
+        while q < min(p + rx.order_max_length, endpos) and text[q] in rx.order_chars:
+            q += 1
+            extras.append((p, q))
+
+
+def _last_letter(text, gap_starts, gap_ends, gi, pos, line_end):
+    """从行尾向前查找 [pos, line_end) 中最后一个未被置空的字母，找不到返回 -1"""
+    last_letter_re = _patterns(text).last_letter
+    j = bisect_right(gap_starts, line_end - 1) - 1
+    while j >= gi:
+        lo = max(gap_starts[j], pos)
+        hi = min(gap_ends[j], line_end)
+        if lo < hi:
+            m = last_letter_re.search(text, lo, hi)
+            if m:
+                return m.start()
+        j -= 1
+    return -1
+
+
+def _resolve_blanks(text, strings, spans, extras, ranks=None):
+    """
+    计算依次对每个已匹配单号执行 str.replace 置空后被置空的区间
+
+    单号在其他位置的重复出现同样会被置空；只有相互重叠的出现位置
+    才需要按单号首次出现的顺序模拟替换过程。ranks 为单号到首次出现序号的映射，
+    省略时按 strings 计算。
+    """
+    if not extras:
+        return list(spans)
+
+    if ranks is None:
+        ranks = _first_seen_ranks(strings)
+
+    occurrences = [(s, e, ranks[item]) for (s, e), item in zip(spans, strings)]
+    found_extra = False
+    for s, e in extras:
+        rank = ranks.get(text[s:e])
+        if rank is not None:
+            occurrences.append((s, e, rank))
+            found_extra = True
+    if not found_extra:
+        return list(spans)
+
+    occurrences.sort()
+    blanks = []
+    cluster = []
+    cluster_end = -1
+    for occ in occurrences:
+        if cluster and occ[0] >= cluster_end:
+            blanks.extend(_replay_cluster(cluster))
+            cluster = []
+        cluster.append(occ)
+        cluster_end = max(cluster_end, occ[1])
+    if cluster:
+        blanks.extend(_replay_cluster(cluster))
+    return blanks
+
+
+def _first_seen_ranks(strings):
+    """单号 -> 去重后的首次出现序号"""
+    ranks = {}
+    for item in strings:
+        if item not in ranks:
+            ranks[item] = len(ranks)
+    return ranks
+
+
+def _replay_cluster(cluster):
+    """按 str.replace 的语义重放一组相互重叠的出现位置"""
+    if len(cluster) == 1:
+        s, e, _ = cluster[0]
+        return [(s, e)]
+
+    base = cluster[0][0]
+    mask = bytearray(max(e for _, e, _ in cluster) - base)
+    blanks = []
+    current_rank = None
+    prev_end = -1
+    for s, e, rank in sorted(cluster, key=lambda occ: (occ[2], occ[0])):
+        if rank != current_rank:
+            current_rank = rank
+            prev_end = -1
+        # 不与本单号上一次替换重叠，且未被先前的替换破坏
+        if s >= prev_end and mask.find(1, s - base, e - base) == -1:
+            mask[s - base:e - base] = b'\x01' * (e - s)
+            blanks.append((s, e))
+            prev_end = e
+    blanks.sort()
+    return blanks
+
+
+def _scan_unknown(text, blanks, start, end, progress=None):
+    """在SLS单号和订单编号都置空后的文本中查找未知单号"""
+    rx = _patterns(text)
+    unknown_re = rx.unknown
+    gap_starts, gap_ends = _gaps(blanks, start, end)
+    unknown = []
+    for gi, (a, b) in enumerate(zip(gap_starts, gap_ends)):
+        if progress is not None and gi % _PROGRESS_INTERVAL == 0:
+            progress("unknown", a)
+        if b - a < rx.unknown_min_length:
+            continue
+        for m in unknown_re.finditer(text, a, b):
+            item = m.group(0)
+            if is_unknown_candidate(item):
+                unknown.append(item)
+    return unknown
@@ -0,0 +1,430 @@
+"""
+输出格式化
+
+格式整理（Excel竖排）、批量查订单格式、批量跑数据格式三种输出，
+界面和命令行模式共用。输出以文本片段逐段生成，既可以拼成完整字符串，
+也可以边生成边写入文件或标准输出。
+
+批量格式可按每段最多的单号数量或字节数分段（见 iter_chunks），
+各段之间空一行，每段可单独复制或导出，便于按查询工具和数据库
+IN 子句的长度限制分批查询。
+"""
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice, zip_longest
+
+from idlist import IdList
+
+# 单号类别及其显示名称，顺序即输出列(A/B/C)的顺序
+CLASSES = ("sls", "order", "unknown")
+CLASS_LABELS = {
+    "sls": "SLS单号",
+    "order": "订单编号",
+    "unknown": "未知单号",
+    # 对比两个列表时结果的各部分（见 reconcile 模块），同样可以按列或分组输出
+    "a_only": "仅A有",
+    "b_only": "仅B有",
+    "both": "两边都有",
+}
+
+OUTPUT_OPTIONS = ("auto", "sls_only", "order_only")
+FORMATS = ("organization", "batch_query", "batch_data")
+FORMAT_LABELS = {
+    "organization": "格式整理",
+    "batch_query": "批量查订单格式",
+    "batch_data": "批量跑数据格式",
+}
+
+# 状态栏提示
+STATUS_MESSAGES = {
+    "organization": "已整理 {count} 个{desc}",
+    "batch_query": "已处理 {count} 个{desc}为批量查询格式",
+    "batch_data": "已处理 {count} 个{desc}为批量数据格式",
+}
+
+# 每次拼接输出的单号数量
+_BLOCK_SIZE = 4096
+
+# 批量格式在结果区域中每行显示的单号数量
+BATCH_ITEMS_PER_ROW = 10
+
+
+def filter_data(data, output_option):
+    """根据输出选项过滤数据"""
+    sls_numbers = data["sls"]
+    order_numbers = data["order"]
+    unknown_numbers = data["unknown"]
+
+    # 统计检测到的单号类型
+    has_sls = len(sls_numbers) > 0
+    has_order = len(order_numbers) > 0
+    has_unknown = len(unknown_numbers) > 0
+
+    if output_option == "sls_only":
+        # 仅保留SLS单号
+        order_numbers = []
+        unknown_numbers = []
+    elif output_option == "order_only":
+        # 仅保留订单编号
+        sls_numbers = []
+        unknown_numbers = []
+    # 自动模式 (auto) 使用所有检测到的单号
+
+    return {
+        "sls": sls_numbers,
+        "order": order_numbers,
+        "unknown": unknown_numbers,
+        "has_sls": has_sls,
+        "has_order": has_order,
+        "has_unknown": has_unknown
+    }
+
+
+def describe(fmt, keys):
+    """生成状态栏中的单号类型描述，keys 为实际输出的类别"""
+    if not keys:
+        return "单号"
+    labels = [CLASS_LABELS[key] for key in keys]
+    if len(labels) == 1:
+        return labels[0]
+
+    names = "、".join(labels[:-1]) + "和" + labels[-1]
+    if fmt == "organization":
+        return names + (" (A/B/C列)" if len(labels) == 3 else " (A/B列)")
+    return names + " (分组显示)"
+
+
+def status_message(fmt, count, output_desc, notes=()):
+    """完成后状态栏的说明，notes 为附加说明（如去重数量），放在括号中"""
+    message = STATUS_MESSAGES[fmt].format(count=count, desc=output_desc)
+    if notes:
+        message += "（" + "，".join(notes) + "）"
+    return message
+
+
+def iter_chunks(items, quote="", max_items=None, max_bytes=None):
+    """
+    把单号序列分段，逐段产出单号列表（用到哪段生成哪段）
+
+    参数:
+        items: 单号序列，可以是任意可迭代对象
+        quote: 单号两侧的引号，计入字节数
+        max_items: 每段最多的单号数量，None 表示不限
+        max_bytes: 每段文本（含引号和逗号，按UTF-8计）最多的字节数，None 表示不限；
+            单个单号就超过上限时单独成段
+
+    两个上限都为 None 时整个序列作为一段。
+    """
+    items = iter(items)
+    if not max_bytes:
+        while True:
+            chunk = list(islice(items, max_items))
+            if not chunk:
+                return
+            yield chunk
+
+    # 每个单号占用的字节数为自身加两侧引号和一个逗号，第一个单号前没有逗号
+    extra = 2 * len(quote) + 1
+    chunk = []
+    used = -1
+    for item in items:
+        cost = len(item.encode("utf-8")) + extra
+        if chunk and (used + cost > max_bytes or len(chunk) == max_items):
+            yield chunk
+            chunk = []
+            used = -1
+        chunk.append(item)
+        used += cost
+    if chunk:
+        yield chunk
+
+
+def _class_chunks(items, quote, max_items, max_bytes):
+    """一个类别的各段；不分段时直接返回原序列，不复制"""
+    if max_items is None and max_bytes is None:
+        return [items]
+    return iter_chunks(items, quote, max_items, max_bytes)
+
+
+def iter_format(fmt, columns, max_items=None, max_bytes=None, alignment=None):
+    """
+    按指定格式逐段生成输出文本
+
+    参数:
+        fmt: "organization" / "batch_query" / "batch_data"
+        columns: [(类别, 单号序列), ...]，只包含非空的类别，序列可以是任意可迭代对象
+        max_items, max_bytes: 批量格式的分段上限，见 iter_chunks；格式整理不分段
+        alignment: 表格按列提取时各单号所在的行（见 tabular.align），格式整理按原表格逐行输出
+
+    只有一个类别时输出单列；多个类别时格式整理输出 A/B(/C) 多列，
+    批量格式按类别分组显示，分段时各段之间空一行。
+    """
+    if not columns:
+        return
+
+    if fmt == "organization":
+        if alignment is not None:
+            yield from _iter_joined(_iter_aligned(columns, alignment), "\n")
+        elif len(columns) == 1:
+            yield from _iter_joined(columns[0][1], "\n")
+        else:
+            rows = zip_longest(*(items for _, items in columns), fillvalue="")
+            yield from _iter_joined(("\t".join(row) for row in rows), "\n")
+        return
+
+    quote = batch_quote(fmt)
+    for i, (key, items) in enumerate(columns):
+        if i:
+            yield "\n\n"
+        if len(columns) > 1:
+            yield f"{CLASS_LABELS[key]}:\n"
+        for j, chunk in enumerate(_class_chunks(items, quote, max_items, max_bytes)):
+            if j:
+                yield "\n\n"
+            yield from _iter_joined(chunk, ",", quote)
+
+
+def iter_chunk_texts(fmt, columns, max_items=None, max_bytes=None):
+    """
+    逐段产出批量格式的 (类别, 段序号, 文本)，段序号在每个类别内从1开始
+
+    每段文本即可直接放进一次查询的单号列表。
+    """
+    quote = batch_quote(fmt)
+    for key, items in columns:
+        for number, chunk in enumerate(_class_chunks(items, quote, max_items, max_bytes), 1):
+            yield key, number, "".join(_iter_joined(chunk, ",", quote))
+
+
+def batch_quote(fmt):
+    """批量格式中单号两侧的引号"""
+    return "'" if fmt == "batch_data" else ""
+
+
+def format_result(fmt, filtered_data, check=None):
+    """
+    生成完整输出
+
+    参数:
+        check: 可选回调，每生成一段输出调用一次，抛出异常即可中止
+
+    返回:
+        (result, count, output_desc)
+    """
+    keys = [key for key in CLASSES if filtered_data[key]]
+    columns = [(key, filtered_data[key]) for key in keys]
+    pieces = []
+    for piece in iter_format(fmt, columns):
+        if check is not None:
+            check()
+        pieces.append(piece)
+    result = "".join(pieces)
+    count = sum(len(filtered_data[key]) for key in keys)
+    return result, count, describe(fmt, keys)
+
+
+def format_rows(fmt, filtered_data, max_items=None, max_bytes=None, classes=CLASSES, alignment=None):
+    """
+    生成按行访问的输出，不拼接完整文本
+
+    参数:
+        max_items, max_bytes: 批量格式的分段上限，见 iter_chunks
+        classes: 依次输出的类别，例如对比结果的 reconcile.PARTS
+        alignment: 见 iter_format，只用于格式整理
+
+    返回:
+        (ResultRows, count, output_desc)
+    """
+    keys = [key for key in classes if filtered_data[key]]
+    if fmt != "organization":
+        alignment = None
+    rows = ResultRows(fmt, [(key, filtered_data[key]) for key in keys], max_items, max_bytes, alignment)
+    count = sum(len(filtered_data[key]) for key in keys)
+    return rows, count, describe(fmt, keys)
+
+
+class ResultRows:
+    """
+    按行访问的格式化结果
+
+    格式整理的每一行对应 A/B/C 列中的同一行；批量格式的长行按
+    BATCH_ITEMS_PER_ROW 个单号折成多行显示（除最后一行外行尾带逗号）。
+    某一行的文本只在访问时生成，完整文本由 iter_text() 逐段生成，与 iter_format 一致。
+
+    批量格式的每个类别至少是一段（chunks），设置了分段上限时再按上限拆分，
+    可用 chunk_index() 找到某一行所在的段，用 chunk_text() 取出单独一段的文本。
+
+    指定 alignment 时格式整理的第 i 行对应原表格的第 i 行，同一行的多个同类单号以空格分隔。
+    """
+
+    def __init__(self, fmt, columns, max_items=None, max_bytes=None, alignment=None):
+        """columns、alignment 同 iter_format，各单号序列需支持 len() 和切片"""
+        self.fmt = fmt
+        self.columns = columns
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.alignment = alignment
+        # 各行区段的 (起始行号, 行数, 取行函数)，及各区段的起始行号（用于二分查找）
+        self._segments = []
+        self._starts = []
+        self._total = 0
+        # 批量格式各段的 (类别, 单号序列, 起始下标, 结束下标)，及各段第一行的行号
+        self.chunks = []
+        self._chunk_rows = []
+
+        if fmt == "organization":
+            if alignment is not None:
+                if columns:
+                    self._add(alignment["count"], self._aligned_row)
+            elif len(columns) == 1:
+                self._add(len(columns[0][1]), columns[0][1].__getitem__)
+            elif columns:
+                self._add(max(len(items) for _, items in columns), self._organization_row)
+            return
+
+        quote = batch_quote(fmt)
+        multi = len(columns) > 1
+        for i, (key, items) in enumerate(columns):
+            if i:
+                self._add(1, lambda _: "")
+            if multi:
+                self._add(1, lambda _, key=key: f"{CLASS_LABELS[key]}:")
+            start = 0
+            for j, chunk in enumerate(_class_chunks(items, quote, max_items, max_bytes)):
+                if j:
+                    self._add(1, lambda _: "")
+                stop = start + len(chunk)
+                row_count = -(-len(chunk) // BATCH_ITEMS_PER_ROW)
+                self.chunks.append((key, items, start, stop))
+                self._chunk_rows.append(self._total)
+                self._add(row_count, lambda r, items=items, start=start, stop=stop, n=row_count:
+                          self._batch_row(items, quote, start, stop, r, n))
+                start = stop
+
+    def _add(self, row_count, getter):
+        self._segments.append((self._total, row_count, getter))
+        self._starts.append(self._total)
+        self._total += row_count
+
+    def _organization_row(self, i):
+        return "\t".join(items[i] if i < len(items) else "" for _, items in self.columns)
+
+    def _aligned_row(self, i):
+        if i == 0 and self.alignment["header"]:
+            return "\t".join(CLASS_LABELS[key] for key, _ in self.columns)
+        cells = []
+        for key, items in self.columns:
+            rows = self.alignment["rows"][key]
+            cells.append(" ".join(items[bisect_left(rows, i):bisect_right(rows, i)]))
+        return "\t".join(cells)
+
+    @staticmethod
+    def _batch_row(items, quote, start, stop, j, row_count):
+        block = items[start + j * BATCH_ITEMS_PER_ROW:min(start + (j + 1) * BATCH_ITEMS_PER_ROW, stop)]
+        joiner = f"{quote},{quote}"
+        row = quote + joiner.join(block) + quote
+        return row if j == row_count - 1 else row + ","
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._total:
+            raise IndexError(i)
+        start, _, getter = self._segments[bisect_right(self._starts, i) - 1]
+        return getter(i - start)
+
+    def rows(self, start, stop):
+        """返回 [start, stop) 范围内各行的文本"""
+        return [self[i] for i in range(max(start, 0), min(stop, self._total))]
+
+    def find(self, query, start=0):
+        """从第 start 行起向后查找包含 query 的行，到末尾后从头继续，找不到返回 -1"""
+        if not query or not self._total:
+            return -1
+        start = min(max(start, 0), self._total)
+        for i in chain(range(start, self._total), range(0, start)):
+            if query in self[i]:
+                return i
+        return -1
+
+    def chunk_index(self, row):
+        """第 row 行所在的段（段之间的空行和类别标题归入前一段），不是批量格式时返回 -1"""
+        if not self.chunks:
+            return -1
+        return max(bisect_right(self._chunk_rows, row) - 1, 0)
+
+    def chunk_first_row(self, index):
+        """第 index 段第一行的行号"""
+        return self._chunk_rows[index]
+
+    def chunk_text(self, index):
+        """第 index 段的文本，可直接用作一次查询的单号列表"""
+        _, items, start, stop = self.chunks[index]
+        return "".join(_iter_joined(items[start:stop], ",", batch_quote(self.fmt)))
+
+    def iter_text(self):
+        """逐段生成完整的输出文本"""
+        return iter_format(self.fmt, self.columns, self.max_items, self.max_bytes, self.alignment)
+
+    def text(self):
+        """返回完整的输出文本"""
+        return "".join(self.iter_text())
+
+
+def _iter_aligned(columns, alignment):
+    """按原表格逐行生成格式整理的各行，见 ResultRows._aligned_row"""
+    if alignment["header"]:
+        yield "\t".join(CLASS_LABELS[key] for key, _ in columns)
+    cursors = [(iter(items), iter(alignment["rows"][key])) for key, items in columns]
+    pending = [(next(rows, None), next(items, None)) for items, rows in cursors]
+    for i in range(1 if alignment["header"] else 0, alignment["count"]):
+        cells = []
+        for j, (items, rows) in enumerate(cursors):
+            row, item = pending[j]
+            cell = []
+            while row == i:
+                cell.append(item)
+                row, item = next(rows, None), next(items, None)
+            pending[j] = (row, item)
+            cells.append(" ".join(cell))
+        yield "\t".join(cells)
+
+
+def _iter_joined(items, sep, quote=""):
+    """相当于分批执行 sep.join(...)，每项可加引号"""
+    if isinstance(items, IdList):
+        yield from _iter_packed(items, sep, quote)
+        return
+    items = iter(items)
+    if quote:
+        joiner = f"{quote}{sep}{quote}"
+    else:
+        joiner = sep
+    first = True
+    while True:
+        block = list(islice(items, _BLOCK_SIZE))
+        if not block:
+            break
+        if first:
+            yield quote + joiner.join(block)
+            first = False
+        else:
+            yield joiner + joiner.join(block)
+    if quote and not first:
+        yield quote
+
+
+def _iter_packed(items, sep, quote=""):
+    """_iter_joined 的 IdList 版本：整块替换换行符，不逐个生成单号字符串"""
+    joiner = f"{quote}{sep}{quote}"
+    first = True
+    for block in items.blocks(_BLOCK_SIZE):
+        if joiner != "\n":
+            block = block.replace("\n", joiner)
+        if first:
+            yield quote + block
+            first = False
+        else:
+            yield joiner + block
+    if quote and not first:
+        yield quote
@@ -0,0 +1,208 @@
+"""
+单号类型配置
+
+SLS单号的国家代码和长度、订单编号的规则、未知单号的最短长度在这里声明，
+可以用 JSON 配置文件覆盖，新增市场或单号格式时不必等待新版本，例如:
+
+    {
+      "sls": [
+        {"name": "MX/CL/CO", "prefixes": ["MX", "CL", "CO"], "length": 18},
+        {"name": "东南亚/巴西", "prefixes": ["BR", "MY", "PH", "SG", "TH", "TW", "VN"], "length": 15},
+        {"name": "ID", "prefixes": ["ID"], "length": 16, "charset": "A-Z0-9"}
+      ],
+      "order": {"digits": 6, "min_length": 14, "max_length": 15, "letter_on_line": true},
+      "unknown": {"min_length": 8}
+    }
+
+    sls      SLS单号的各种类型，按列表顺序决定优先级（同一位置能匹配多种类型时取排在前面的）；
+             prefixes 为前缀（字母或数字），length 为含前缀的总长度，
+             charset 为前缀之后允许的字符（正则字符集写法，只能是字母和数字，默认 A-Za-z0-9）
+    order    订单编号: digits 位数字开头，总长度 min_length ~ max_length，
+             letter_on_line 为真时要求同一行后面还有字母
+    unknown  未知单号的最短长度
+
+配置文件默认为程序目录下的 id_types.json，可用环境变量 ORDER_PROCESSOR_ID_TYPES
+指定其他位置；文件不存在时使用内置的默认值，各部分也可以只写需要修改的那部分。
+配置有误时同样使用默认值，错误信息见 LOAD_ERROR（界面和命令行启动时会提示）。
+
+配置在 extractor 导入时编译一次（见 extractor._Patterns），全部SLS类型合成一个正则，
+类型再多也只扫描一遍文本。
+"""
+import os
+import re
+
+ID_TYPES_ENV = "ORDER_PROCESSOR_ID_TYPES"
+
+DEFAULT_CHARSET = "A-Za-z0-9"
+
+DEFAULT_CONFIG = {
+    "sls": [
+        # MX/CL/CO是18位单号(国家代码2位+16位字符)
+        {"name": "MX/CL/CO", "prefixes": ["MX", "CL", "CO"], "length": 18},
+        # 其他国家代码(BR/MY/PH/SG/TH/TW/VN)仍为15位(国家代码2位+13位字符)
+        {"name": "BR/MY/PH/SG/TH/TW/VN", "prefixes": ["BR", "MY", "PH", "SG", "TH", "TW", "VN"], "length": 15},
+    ],
+    # 订单编号: 6位数字开头 + 8-9位字母数字混合字符，且要求同一行后面至少还有一个字母
+    "order": {"digits": 6, "min_length": 14, "max_length": 15, "charset": DEFAULT_CHARSET, "letter_on_line": True},
+    # 未知单号候选: 至少8位的字母数字组合
+    "unknown": {"min_length": 8},
+}
+
+_ALNUM = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+
+
+class SlsType:
+    """一种SLS单号：若干个前缀 + 固定总长度"""
+
+    def __init__(self, name, prefixes, length, charset=DEFAULT_CHARSET):
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.length = length
+        self.charset = charset
+
+    def pattern(self):
+        """不含优化的等价正则，如 (?:MX|CL|CO)[A-Za-z0-9]{16}"""
+        return "|".join(f"(?:{'|'.join(prefixes)})[{self.charset}]{{{self.length - size}}}"
+                        for size, prefixes in self.prefix_groups())
+
+    def prefix_groups(self):
+        """按长度分组的前缀 [(前缀长度, [前缀, ...]), ...]，后顾断言要求同一组内长度相同"""
+        groups = {}
+        for prefix in self.prefixes:
+            groups.setdefault(len(prefix), []).append(prefix)
+        return list(groups.items())
+
+
+class OrderRule:
+    """订单编号规则"""
+
+    def __init__(self, digits, min_length, max_length, charset=DEFAULT_CHARSET, letter_on_line=True):
+        self.digits = digits
+        self.min_length = min_length
+        self.max_length = max_length
+        self.charset = charset
+        self.letter_on_line = letter_on_line
+
+    def pattern(self):
+        """原始形式的正则，如 \\d{6}(?=.*[A-Za-z])[A-Za-z0-9]{8,9}"""
+        lookahead = "(?=.*[A-Za-z])" if self.letter_on_line else ""
+        return (rf"\d{{{self.digits}}}{lookahead}"
+                f"[{self.charset}]{{{self.min_length - self.digits},{self.max_length - self.digits}}}")
+
+
+class IdTypes:
+    """全部单号类型"""
+
+    def __init__(self, sls, order, unknown_min_length):
+        self.sls = list(sls)
+        self.order = order
+        self.unknown_min_length = unknown_min_length
+
+    def sls_pattern(self):
+        """全部SLS类型按优先级合成的正则（未优化的原始形式）"""
+        return "|".join(sls_type.pattern() for sls_type in self.sls) or "(?!)"
+
+    def unknown_pattern(self):
+        return f"[A-Za-z0-9]{{{self.unknown_min_length},}}"
+
+
+def from_config(config):
+    """
+    由配置字典（JSON 的内容）生成 IdTypes，省略的部分使用默认值
+
+    配置有误时抛出 ValueError，说明哪一项有误。
+    """
+    if not isinstance(config, dict):
+        raise ValueError("配置应为JSON对象")
+    unknown_keys = set(config) - set(DEFAULT_CONFIG)
+    if unknown_keys:
+        raise ValueError(f"未知的配置项: {', '.join(sorted(unknown_keys))}")
+
+    sls_config = config.get("sls", DEFAULT_CONFIG["sls"])
+    if not isinstance(sls_config, list):
+        raise ValueError("sls 应为列表")
+    sls = [_sls_type(item, i) for i, item in enumerate(sls_config, 1)]
+
+    order_config = dict(DEFAULT_CONFIG["order"], **_section(config, "order"))
+    digits = _int(order_config, "digits", "order", 1)
+    min_length = _int(order_config, "min_length", "order", digits + 1)
+    max_length = _int(order_config, "max_length", "order", min_length)
+    order = OrderRule(digits, min_length, max_length, _charset(order_config.get("charset"), "order"),
+                      bool(order_config.get("letter_on_line")))
+
+    unknown_config = dict(DEFAULT_CONFIG["unknown"], **_section(config, "unknown"))
+    return IdTypes(sls, order, _int(unknown_config, "min_length", "unknown", 1))
+
+
+def load(path=None):
+    """读取配置文件，文件不存在时返回默认配置；文件有误时抛出 ValueError 或 OSError"""
+    path = path or config_path()
+    if not os.path.exists(path):
+        return from_config(DEFAULT_CONFIG)
+    # 只在有配置文件时才导入，不拖慢程序启动
+    import json
+
+    with open(path, encoding="utf-8-sig") as f:
+        try:
+            config = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"不是有效的JSON: {e}") from None
+    return from_config(config)
+
+
+def config_path():
+    """配置文件的位置"""
+    path = os.environ.get(ID_TYPES_ENV)
+    if path:
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "id_types.json")
+
+
+def _section(config, key):
+    section = config.get(key, {})
+    if not isinstance(section, dict):
+        raise ValueError(f"{key} 应为JSON对象")
+    return section
+
+
+def _sls_type(item, index):
+    where = f"sls 第{index}项"
+    if not isinstance(item, dict):
+        raise ValueError(f"{where} 应为JSON对象")
+    prefixes = item.get("prefixes")
+    if (not isinstance(prefixes, list) or not prefixes
+            or not all(isinstance(p, str) and p and set(p) <= _ALNUM for p in prefixes)):
+        raise ValueError(f"{where} 的 prefixes 应为非空的前缀列表，前缀只能包含字母和数字")
+    length = _int(item, "length", where, max(len(p) for p in prefixes) + 1)
+    return SlsType(str(item.get("name", ",".join(prefixes))), prefixes, length,
+                   _charset(item.get("charset", DEFAULT_CHARSET), where))
+
+
+def _int(config, key, where, minimum):
+    value = config.get(key)
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise ValueError(f"{where} 的 {key} 应为不小于 {minimum} 的整数")
+    return value
+
+
+def _charset(charset, where):
+    """检查字符集（正则字符集的内容，如 A-Z0-9），只允许匹配字母和数字"""
+    try:
+        rx = re.compile(f"[{charset}]")
+    except (re.error, TypeError):
+        raise ValueError(f"{where} 的 charset 不是有效的字符集: {charset!r}") from None
+    matched = {chr(c) for c in range(128) if rx.fullmatch(chr(c))}
+    if not matched or not matched <= _ALNUM or "^" in charset:
+        raise ValueError(f"{where} 的 charset 只能包含字母和数字: {charset!r}")
+    return charset
+
+
+def _load_active():
+    try:
+        return load(), None
+    except (OSError, ValueError) as e:
+        return from_config(DEFAULT_CONFIG), f"单号类型配置 {config_path()} 有误，已使用默认配置: {e}"
+
+
+# 当前使用的单号类型，以及读取配置文件时的错误（无错误时为 None）
+ACTIVE, LOAD_ERROR = _load_active()
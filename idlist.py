@@ -0,0 +1,124 @@
+"""
+紧凑的单号列表
+
+提取结果中每个单号如果单独保存为 str 对象，加上列表中的指针每个约占 70 多字节，
+而单号本身只有十几个字符。IdList 把同一类的全部单号用换行符连接成一个字符串，
+另用 array 保存各单号的结束位置，每个单号只占"长度 + 5"字节左右；
+按下标或迭代访问时才生成对应的 str。
+
+连接后的文本本身就是"格式整理"单列输出的内容，批量格式只需把换行符替换成逗号，
+因此格式化时可以整块处理（见 blocks()），不必逐个生成字符串。
+"""
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate, islice
+
+# blocks() 每块包含的单号数量
+BLOCK_SIZE = 4096
+
+
+def _typecode(size):
+    """偏移量的数组类型：通常为32位无符号整数，文本超过 4G 时用64位"""
+    return "I" if size < 1 << 32 else "Q"
+
+
+class IdList(Sequence):
+    """
+    只读的单号序列，用法同列表（len、下标、切片、迭代、比较）
+
+    text 为各单号以换行符连接的文本（str，文件扫描时也可以是 bytes），
+    stops[i] 为第 i 个单号之后下一个单号的起始位置，即结束位置 + 1。
+    切片返回普通列表。
+    """
+
+    __slots__ = ("text", "stops")
+
+    def __init__(self, text="", stops=None):
+        self.text = text
+        self.stops = stops if stops is not None else array("I")
+
+    @classmethod
+    def pack(cls, items):
+        """把单号序列打包成 IdList，已经是 IdList 时原样返回"""
+        if isinstance(items, IdList):
+            return items
+        if not isinstance(items, list):
+            items = list(items)
+        if not items:
+            return cls()
+        text = _separator(items[0]).join(items)
+        stops = array(_typecode(len(text)), accumulate(map((1).__add__, map(len, items))))
+        return cls(text, stops)
+
+    @classmethod
+    def concat(cls, parts):
+        """按顺序连接多个 IdList（或列表）"""
+        parts = [cls.pack(part) for part in parts]
+        parts = [part for part in parts if part.stops]
+        if not parts:
+            return cls()
+        if len(parts) == 1:
+            return parts[0]
+        text = _separator(parts[0].text).join(part.text for part in parts)
+        stops = array(_typecode(len(text)))
+        offset = 0
+        for part in parts:
+            stops.extend(map(offset.__add__, part.stops) if offset else part.stops.tolist())
+            offset += len(part.text) + 1
+        return cls(text, stops)
+
+    def decode(self, encoding="ascii"):
+        """bytes 版本转为 str 版本（单号只含ASCII字符时偏移量不变）"""
+        if isinstance(self.text, str):
+            return self
+        return IdList(self.text.decode(encoding), self.stops)
+
+    def _start(self, i):
+        return self.stops[i - 1] if i else 0
+
+    def __len__(self):
+        return len(self.stops)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.stops))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return self.text[self._start(start):self.stops[stop - 1] - 1].split(_separator(self.text))
+        if index < 0:
+            index += len(self.stops)
+        if not 0 <= index < len(self.stops):
+            raise IndexError("IdList index out of range")
+        return self.text[self._start(index):self.stops[index] - 1]
+
+    def __iter__(self):
+        sep = _separator(self.text)
+        for block in self.blocks():
+            yield from block.split(sep)
+
+    def blocks(self, size=BLOCK_SIZE):
+        """逐块产出文本，每块为不超过 size 个单号以换行符连接的文本"""
+        count = len(self.stops)
+        for i in range(0, count, size):
+            j = min(i + size, count)
+            yield self.text[self._start(i):self.stops[j - 1] - 1]
+
+    def __eq__(self, other):
+        if isinstance(other, IdList):
+            return len(self) == len(other) and self.text == other.text
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        head = ", ".join(repr(item) for item in islice(self, 3))
+        more = ", ..." if len(self) > 3 else ""
+        return f"IdList([{head}{more}], len={len(self)})"
+
+
+def _separator(text):
+    return b"\n" if isinstance(text, bytes) else "\n"
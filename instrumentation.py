@@ -0,0 +1,233 @@
+"""
+处理耗时记录
+
+按阶段（SLS单号、订单编号、未知单号的提取，过滤，去重，格式化，显示）记录耗时和内存峰值，
+用于定位"处理很慢"具体慢在哪一步。默认关闭，可在"帮助"菜单中打开，或设置环境变量:
+
+    ORDER_PROCESSOR_PROFILE=1               启动时即打开
+    ORDER_PROCESSOR_PROFILE_LOG=timing.jsonl 每次处理追加一行JSON到此文件（默认见 default_log_path()）
+    ORDER_PROCESSOR_CPROFILE=run.prof        同时用 cProfile 分析，结果写入此文件
+"""
+import contextlib
+import os
+import time
+
+PROFILE_ENV = "ORDER_PROCESSOR_PROFILE"
+PROFILE_LOG_ENV = "ORDER_PROCESSOR_PROFILE_LOG"
+CPROFILE_ENV = "ORDER_PROCESSOR_CPROFILE"
+
+# 状态栏摘要中各阶段的简称
+STAGE_LABELS = {
+    "cache": "缓存",
+    "encoding": "编码检查",
+    "file": "文件",
+    "archive": "解压",
+    "parallel": "并行",
+    "shards": "分片",
+    "live": "增量",
+    "sls": "SLS",
+    "order": "订单",
+    "unknown": "未知",
+    "table": "表格",
+    "list_b": "列表B",
+    "reconcile": "对比",
+    "filter": "过滤",
+    "dedup": "去重",
+    "history": "历史",
+    "format": "格式化",
+    "render": "显示",
+}
+
+
+def enabled_by_env():
+    """是否通过环境变量打开了耗时记录"""
+    return any(os.environ.get(name) for name in (PROFILE_ENV, PROFILE_LOG_ENV, CPROFILE_ENV))
+
+
+def default_log_path():
+    """JSON-lines 日志的默认位置"""
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if path:
+        return path
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "order-processor", "timing.jsonl")
+
+
+class StageRecorder:
+    """
+    记录一次处理中各阶段的耗时和内存峰值
+
+    同一时间只有一个阶段在计时，begin() 新阶段时自动结束上一个；
+    同名阶段多次出现时耗时累加、峰值取最大。分片提取时各分片中 SLS单号、订单编号、
+    未知单号各步的耗时由 add_part() 记在当前阶段的 "parts" 中，不计入总耗时。内存用 tracemalloc 统计，
+    开启后处理会变慢，memory=False 时只记录耗时。
+    enabled=False 时所有方法都不做任何事，调用方无需另作判断。
+    """
+
+    def __init__(self, enabled=True, memory=True):
+        self.enabled = enabled
+        self.memory = memory
+        self.stages = {}
+        self.current = None
+        self._started = 0.0
+        self._base = 0
+        self._own_tracing = False
+        self._begin_time = None
+        # 附加到日志记录中的其他信息（格式、输入大小等）
+        self.info = {}
+
+    def start(self):
+        """开始记录（开启内存跟踪）"""
+        if not self.enabled:
+            return
+        # tracemalloc 只在打开耗时记录时才导入，不拖慢程序启动
+        import tracemalloc
+
+        self._begin_time = time.time()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+
+    def stop(self):
+        """结束当前阶段并停止内存跟踪"""
+        self.end()
+        if self._own_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def begin(self, name):
+        """开始一个阶段"""
+        if not self.enabled:
+            return
+        import tracemalloc
+
+        self.end()
+        self.current = name
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+
+    def end(self):
+        """结束当前阶段（没有进行中的阶段时什么也不做）"""
+        if self.current is None:
+            return
+        import tracemalloc
+
+        elapsed = time.perf_counter() - self._started
+        peak = None
+        if tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1] - self._base, 0)
+        stage = self.stages.setdefault(self.current, {"seconds": 0.0, "peak_bytes": None})
+        stage["seconds"] += elapsed
+        if peak is not None:
+            stage["peak_bytes"] = max(stage["peak_bytes"] or 0, peak)
+        self.current = None
+
+    def add_part(self, name, seconds):
+        """
+        把当前阶段中一个步骤的耗时累加到该阶段的 "parts"
+
+        多进程提取时为各进程耗时之和，可能超过阶段本身的耗时；
+        合并输入时已提取的结果时为当时提取所用的时间。没有进行中的阶段时忽略。
+        """
+        if self.current is None:
+            return
+        stage = self.stages.setdefault(self.current, {"seconds": 0.0, "peak_bytes": None})
+        parts = stage.setdefault("parts", {})
+        parts[name] = parts.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """with recorder.stage("filter"): ..."""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def wrap_progress(self, progress=None):
+        """
+        包装提取函数的进度回调：stage 变化时切换计时阶段，再调用原回调
+
+        提取函数在每个阶段开始时都会汇报一次进度，因此阶段边界是准确的。
+        包装后的回调带有 add_seconds 属性（即 add_part），分片提取时用它汇报各步的耗时。
+        """
+        if not self.enabled:
+            return progress
+
+        def wrapped(stage, pos):
+            if stage != self.current:
+                self.begin(stage)
+            if progress is not None:
+                progress(stage, pos)
+        wrapped.add_seconds = self.add_part
+        return wrapped
+
+    @property
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages.values())
+
+    def summary(self):
+        """状态栏用的简短摘要，如 "SLS 0.12s | 并行 0.30s/12MB (SLS 0.40s, 订单 0.45s, 未知 0.20s) | 共 0.50s" """
+        parts = []
+        for name, stage in self.stages.items():
+            part = f"{STAGE_LABELS.get(name, name)} {stage['seconds']:.2f}s"
+            if (stage["peak_bytes"] or 0) >= 1024 * 1024:
+                part += f"/{stage['peak_bytes'] / (1024 * 1024):.0f}MB"
+            if stage.get("parts"):
+                part += " (" + ", ".join(f"{STAGE_LABELS.get(step, step)} {seconds:.2f}s"
+                                         for step, seconds in stage["parts"].items()) + ")"
+            parts.append(part)
+        parts.append(f"共 {self.total_seconds:.2f}s")
+        return " | ".join(parts)
+
+    def to_record(self, **extra):
+        """生成一条日志记录"""
+        record = {"time": self._begin_time or time.time()}
+        record.update(self.info)
+        record.update(extra)
+        record["total_seconds"] = round(self.total_seconds, 6)
+        record["stages"] = {}
+        for name, stage in self.stages.items():
+            entry = {"seconds": round(stage["seconds"], 6), "peak_bytes": stage["peak_bytes"]}
+            if stage.get("parts"):
+                entry["parts"] = {step: round(seconds, 6) for step, seconds in stage["parts"].items()}
+            record["stages"][name] = entry
+        return record
+
+
+def append_log(path, record):
+    """把一条记录追加到 JSON-lines 日志，写入失败时返回错误信息"""
+    import json
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        return str(e)
+    return None
+
+
+@contextlib.contextmanager
+def profile(path=None):
+    """
+    在 with 块中运行 cProfile 并把结果写入 path，path 为空时不做任何事
+
+    结果可用 python -m pstats 或 snakeviz 等工具查看。只统计当前线程。
+    """
+    if not path:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
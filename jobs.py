@@ -0,0 +1,348 @@
+"""
+任务列表
+
+需要处理多个文件或多段粘贴内容（例如每个市场一份导出）时，把它们加入任务列表，
+由有限数量的工作线程同时处理，每个任务的结果、数量和耗时分别保存，
+可以逐个显示、复制或一起导出。界面线程只负责调度和刷新列表，处理期间窗口保持响应。
+
+    JobQueue       排队和调度，同时运行的任务不超过 max_workers 个（每个任务是一个 worker.BackgroundTask）
+    JobListWindow  任务列表窗口
+"""
+import os
+import re
+import time
+import tkinter as tk
+from itertools import count
+from tkinter import ttk
+
+import formatting
+from worker import BackgroundTask
+
+# 同时处理的任务数量；大文件和大段文本的提取本身还会用到 extractor 的进程池
+MAX_WORKERS = max(2, min(4, os.cpu_count() or 1))
+
+STATUS_LABELS = {
+    "queued": "排队中",
+    "running": "处理中",
+    "done": "完成",
+    "failed": "出错",
+    "cancelled": "已取消",
+}
+
+_job_ids = count(1)
+
+
+class Job:
+    """
+    任务列表中的一项
+
+    func 在工作线程中以 func(task) 的方式调用，返回值同 OrderProcessorApp.format_job:
+    (提取结果, 按行访问的结果, 输出数量, 单号类型描述, 状态栏附加说明列表)
+    """
+
+    def __init__(self, name, fmt, func):
+        self.id = next(_job_ids)
+        self.name = name
+        self.fmt = fmt
+        self.func = func
+        self.status = "queued"
+        # 处理中时最近一次汇报的阶段和进度（进度可以为 None）
+        self.stage = None
+        self.fraction = None
+        self.result = None
+        self.error = None
+        self.seconds = None
+        self.task = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def rows(self):
+        """按行访问的结果（formatting.ResultRows），未完成时为 None"""
+        return None if self.result is None else self.result[1]
+
+    def counts(self):
+        """提取到的各类单号数量 {"sls": n, ...}，未完成时为 None"""
+        if self.result is None:
+            return None
+        data = self.result[0]
+        return {key: len(data[key]) for key in formatting.CLASSES}
+
+    def message(self):
+        """完成后的说明，同主窗口的状态栏"""
+        _, _, output_count, output_desc, notes = self.result
+        return formatting.status_message(self.fmt, output_count, output_desc, notes)
+
+    def file_stem(self):
+        """导出时的文件名（不含扩展名）：任务名称去掉扩展名和文件名中不能使用的字符"""
+        stem = re.sub(r'[\\/:*?"<>|\s]+', "_", os.path.splitext(self.name)[0]).strip("_")
+        return f"{stem or '任务'}_结果"
+
+
+class JobQueue:
+    """
+    任务队列，任务按加入的顺序开始，同时运行的不超过 max_workers 个
+
+    on_update(job) 在任务加入、开始、汇报进度和结束时于界面线程中调用。
+    """
+
+    def __init__(self, root, max_workers=MAX_WORKERS, on_update=None):
+        self.root = root
+        self.max_workers = max_workers
+        self.on_update = on_update
+        self.jobs = []
+        # 工作线程尚未结束的任务（包括已取消、已移除但还没停下来的）
+        self._running = set()
+
+    def add(self, name, fmt, func):
+        """加入一个任务，有空闲的工作线程时立即开始"""
+        job = Job(name, fmt, func)
+        self.jobs.append(job)
+        self._notify(job)
+        self._start_queued()
+        return job
+
+    def cancel(self, job):
+        """取消排队中或处理中的任务"""
+        if job.status == "queued":
+            self._finish(job, "cancelled")
+        elif job.status == "running":
+            # 工作线程在下一次 check() 时停止，随后由 on_cancel 结束任务
+            job.task.cancel()
+
+    def remove(self, job):
+        """从列表中移除任务，未完成时先取消"""
+        self.cancel(job)
+        if job in self.jobs:
+            self.jobs.remove(job)
+        self._notify(job)
+
+    def clear_finished(self):
+        """移除全部已结束的任务，返回被移除的任务"""
+        removed = [job for job in self.jobs if job.finished]
+        self.jobs = [job for job in self.jobs if not job.finished]
+        for job in removed:
+            self._notify(job)
+        return removed
+
+    def counts(self):
+        """各状态的任务数量 {"queued": n, ...}"""
+        result = dict.fromkeys(STATUS_LABELS, 0)
+        for job in self.jobs:
+            result[job.status] += 1
+        return result
+
+    def _start_queued(self):
+        for job in self.jobs:
+            if len(self._running) >= self.max_workers:
+                break
+            if job.status == "queued":
+                self._start(job)
+
+    def _start(self, job):
+        job.status = "running"
+        job.task = BackgroundTask(
+            self.root,
+            lambda task: _timed(job.func, task),
+            on_done=lambda result: self._on_done(job, result),
+            on_progress=lambda stage, fraction: self._on_progress(job, stage, fraction),
+            on_cancel=lambda: self._finish(job, "cancelled"),
+            on_error=lambda error: self._finish(job, "failed", error),
+        )
+        self._running.add(job)
+        job.task.start()
+        self._notify(job)
+
+    def _on_progress(self, job, stage, fraction):
+        job.stage = stage
+        job.fraction = fraction
+        self._notify(job)
+
+    def _on_done(self, job, result):
+        job.result, job.seconds = result
+        self._finish(job, "done")
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.task = None
+        self._running.discard(job)
+        self._notify(job)
+        self._start_queued()
+
+    def _notify(self, job):
+        if self.on_update is not None:
+            self.on_update(job)
+
+
+def _timed(func, task):
+    """在工作线程中执行任务并计时，返回 (结果, 秒数)"""
+    start = time.perf_counter()
+    result = func(task)
+    return result, time.perf_counter() - start
+
+
+class JobListWindow:
+    """
+    任务列表窗口，关闭时只是隐藏，任务继续在后台处理
+
+    参数:
+        queue: JobQueue，窗口创建后接管它的 on_update
+        add_files(fmt), add_input(fmt): 加入任务，fmt 为窗口中选择的输出格式
+        show(job): 在主窗口的结果区域显示任务的结果（之后可用主窗口的复制、导出）
+        export_all(jobs): 把已完成任务的结果逐个导出
+        copy_text(text): 把文本复制到剪贴板
+        stage_labels: 进度阶段的说明，同 main.STAGE_LABELS
+    """
+
+    # 列表的各列: (标识, 标题, 宽度)
+    COLUMNS = (
+        ("name", "名称", 200),
+        ("format", "格式", 110),
+        ("status", "状态", 150),
+        ("sls", "SLS单号", 70),
+        ("order", "订单编号", 70),
+        ("unknown", "未知单号", 70),
+        ("count", "输出", 70),
+        ("seconds", "耗时", 60),
+    )
+
+    def __init__(self, root, queue, add_files, add_input, show, export_all, copy_text, stage_labels):
+        self.queue = queue
+        self.show = show
+        self.export_all = export_all
+        self.copy_text = copy_text
+        self.stage_labels = stage_labels
+        queue.on_update = self.refresh
+
+        self.window = tk.Toplevel(root)
+        self.window.title("任务列表")
+        self.window.geometry("900x380")
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
+
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.pack(fill=tk.X)
+        ttk.Label(toolbar, text="输出格式").pack(side=tk.LEFT)
+        self.format_var = tk.StringVar(value=formatting.FORMAT_LABELS["organization"])
+        ttk.Combobox(toolbar, textvariable=self.format_var, values=list(formatting.FORMAT_LABELS.values()),
+                     state="readonly", width=14).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="添加文件...", command=lambda: add_files(self.selected_format())).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="添加输入框内容",
+                   command=lambda: add_input(self.selected_format())).pack(side=tk.LEFT, padx=5)
+        ttk.Label(toolbar, text=f"（同时处理 {queue.max_workers} 个，使用主窗口当前的输出选项）").pack(side=tk.LEFT, padx=5)
+
+        list_frame = ttk.Frame(self.window, padding=(5, 0))
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(list_frame, columns=[key for key, _, _ in self.COLUMNS], show="headings")
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor=tk.W if key in ("name", "format", "status") else tk.E)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<Double-1>", lambda event: self.show_selected())
+
+        buttons = ttk.Frame(self.window, padding="5")
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="显示结果", command=self.show_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="复制结果", command=self.copy_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="导出全部...", command=self.export_finished).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="取消", command=self.cancel_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="移除", command=self.remove_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="清除已结束", command=self.clear_finished).pack(side=tk.LEFT, padx=5)
+
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W).pack(fill=tk.X, padx=5, pady=2)
+
+        for job in queue.jobs:
+            self.refresh(job)
+        self.update_summary()
+
+    def present(self):
+        """显示（或重新显示）窗口"""
+        self.window.deiconify()
+        self.window.lift()
+
+    def selected_format(self):
+        labels = {label: fmt for fmt, label in formatting.FORMAT_LABELS.items()}
+        return labels.get(self.format_var.get(), "organization")
+
+    def selected_jobs(self):
+        ids = {int(iid) for iid in self.tree.selection()}
+        return [job for job in self.queue.jobs if job.id in ids]
+
+    def refresh(self, job):
+        """任务状态变化后更新对应的一行"""
+        iid = str(job.id)
+        if job not in self.queue.jobs:
+            if self.tree.exists(iid):
+                self.tree.delete(iid)
+        elif self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_values(job))
+        else:
+            self.tree.insert("", tk.END, iid=iid, values=self.row_values(job))
+        self.update_summary()
+
+    def row_values(self, job):
+        status = STATUS_LABELS[job.status]
+        if job.status == "running" and job.stage is not None:
+            status = self.stage_labels.get(job.stage, status)
+            if job.fraction is not None:
+                status += f" {int(job.fraction * 100)}%"
+        elif job.status == "failed":
+            status = f"出错: {job.error}"
+        counts = job.counts() or {}
+        output_count = job.result[2] if job.result is not None else ""
+        seconds = f"{job.seconds:.1f}s" if job.seconds is not None else ""
+        return (job.name, formatting.FORMAT_LABELS[job.fmt], status,
+                counts.get("sls", ""), counts.get("order", ""), counts.get("unknown", ""), output_count, seconds)
+
+    def update_summary(self):
+        counts = self.queue.counts()
+        self.status_var.set(f"共 {len(self.queue.jobs)} 个任务：处理中 {counts['running']}，"
+                            f"排队 {counts['queued']}，完成 {counts['done']}，"
+                            f"出错 {counts['failed']}，已取消 {counts['cancelled']}")
+
+    def _selected_done_job(self):
+        jobs = [job for job in self.selected_jobs() if job.status == "done"]
+        if not jobs:
+            self.status_var.set("请先选择一个已完成的任务")
+            return None
+        return jobs[0]
+
+    def show_selected(self):
+        job = self._selected_done_job()
+        if job is not None:
+            self.show(job)
+
+    def copy_selected(self):
+        job = self._selected_done_job()
+        if job is None:
+            return
+        text = job.rows.text().strip()
+        if not text:
+            self.status_var.set(f"{job.name} 没有可复制的内容")
+            return
+        self.copy_text(text)
+        self.status_var.set(f"已复制 {job.name} 的结果到剪贴板")
+
+    def export_finished(self):
+        jobs = [job for job in self.queue.jobs if job.status == "done"]
+        if not jobs:
+            self.status_var.set("没有已完成的任务")
+            return
+        self.export_all(jobs)
+
+    def cancel_selected(self):
+        for job in self.selected_jobs():
+            self.queue.cancel(job)
+
+    def remove_selected(self):
+        for job in self.selected_jobs():
+            self.queue.remove(job)
+
+    def clear_finished(self):
+        self.queue.clear_finished()
@@ -0,0 +1,240 @@
+"""
+输入区域的增量提取
+
+粘贴或编辑时只重新提取改动所在的行，统计数随输入实时更新。
+输入文本按行分成若干段（每段约 SEGMENT_CHARS 个字符），每段保存自己的提取结果；
+文本框的 insert/delete 经 watch_text 转发给 LiveExtraction.edit()，
+被改动的行所在的段标记为待提取，稍后（去抖）只提取这些段。
+在 40 MB 的输入后追加 1 MB 时，只需提取追加的部分和它前面的一段。
+待提取的段在取出文本时即切成小段，后台提取期间的编辑只作废被编辑的小段。
+
+各段结果按 extractor.merge_shards 的规则合并，与整段提取完全一致；
+分段之间有相互影响时（极少见）conflicted 为真，调用方改为整段提取。
+"""
+import extractor
+
+# 每段的大致字符数
+SEGMENT_CHARS = 64 * 1024
+
+KEYS = ("sls", "order", "unknown")
+
+
+class _Segment:
+    """连续的若干行及其提取结果（shard 为 None 表示待提取）"""
+
+    __slots__ = ("lines", "shard")
+
+    def __init__(self, lines, shard=None):
+        self.lines = lines
+        self.shard = shard
+
+
+class LiveExtraction:
+    """
+    按行分段保存的提取结果
+
+    行号与 Tk 文本框一致，从1开始；每一行都包含行尾的换行符，
+    因此所有段的文本依次拼接起来就是 text.get("1.0", "end")。
+    只应在界面线程中调用，提取本身由 extract_pending 在工作线程中完成。
+    """
+
+    def __init__(self):
+        self.segments = []
+        # 每次 edit() 加一，用于发现未经过 edit() 的改动
+        self.revision = 0
+        # 已提取的段中各类单号的数量
+        self.counts = dict.fromkeys(KEYS, 0)
+        # 出现过的"同形状但未被选中"的字符串 -> [出现次数, 作为单号出现的次数]
+        self._extras = {"sls": {}, "order": {}}
+        self.reset(1)
+
+    @property
+    def lines(self):
+        return sum(segment.lines for segment in self.segments)
+
+    @property
+    def pending(self):
+        """是否还有待提取的段"""
+        return any(segment.shard is None for segment in self.segments)
+
+    @property
+    def conflicted(self):
+        """某个分段中被跳过的字符串在别处是单号，按段合并的结果可能与整段提取不同"""
+        return any(extras and ids
+                   for watch in self._extras.values() for extras, ids in watch.values())
+
+    def reset(self, lines):
+        """全部 lines 行都需要重新提取（例如发现了未记录的改动）"""
+        for segment in self.segments:
+            self._remove(segment)
+        self.segments = [_Segment(lines)]
+
+    def edit(self, first, last, lines):
+        """
+        记录一次改动：原来的第 first 至 last 行（含两端）变成了 lines 行
+
+        与这些行重叠的段合并成一个待提取的段，其余段的结果保持不变。
+        """
+        self.revision += 1
+        last = min(last, self.lines)
+        first = min(first, last)
+        start = stop = None
+        merged = 0
+        pos = 1
+        for i, segment in enumerate(self.segments):
+            end = pos + segment.lines - 1
+            if end >= first and pos <= last:
+                if start is None:
+                    start = i
+                stop = i + 1
+                merged += segment.lines
+            elif pos > last:
+                break
+            pos = end + 1
+        for segment in self.segments[start:stop]:
+            self._remove(segment)
+        self.segments[start:stop] = [_Segment(merged - (last - first + 1) + lines)]
+
+    def prepare(self, get_lines):
+        """
+        取出待提取的段的文本，并按 SEGMENT_CHARS 在换行符处切成小段
+
+        参数:
+            get_lines: get_lines(first, last) 返回第 first 至 last 行的文本（含换行符）
+
+        返回:
+            [(段, 文本), ...]，交给 extract_pending
+        """
+        jobs = []
+        segments = []
+        pos = 1
+        for segment in self.segments:
+            if segment.shard is not None:
+                segments.append(segment)
+            else:
+                text = get_lines(pos, pos + segment.lines - 1)
+                for start, end in _split_lines(text):
+                    piece = _Segment(text.count("\n", start, end))
+                    segments.append(piece)
+                    jobs.append((piece, text[start:end]))
+            pos += segment.lines
+        self.segments = segments
+        return jobs
+
+    def apply(self, segment, shard):
+        """
+        填入一段的提取结果
+
+        提取期间该段又被改动过（已不在段列表中）时忽略结果，返回 False。
+        """
+        if segment.shard is not None or not any(current is segment for current in self.segments):
+            return False
+        segment.shard = shard
+        self._add(segment)
+        return True
+
+    def shards(self):
+        """全部段都已提取时返回各段的分片结果（用于 extractor.merge_shards），否则返回 None"""
+        if self.pending:
+            return None
+        return [segment.shard for segment in self.segments]
+
+    def _add(self, segment):
+        shard = segment.shard
+        for key in KEYS:
+            self.counts[key] += len(shard[key])
+        for key, watch in self._extras.items():
+            for item in shard[key + "_extras"]:
+                if item not in watch:
+                    # 第一次出现时统计它在其他段中作为单号出现的次数，之后增量维护
+                    watch[item] = [0, sum(s.shard[key].count(item)
+                                          for s in self.segments if s.shard is not None and s is not segment)]
+                watch[item][0] += 1
+            if watch:
+                for item in shard[key]:
+                    if item in watch:
+                        watch[item][1] += 1
+
+    def _remove(self, segment):
+        shard = segment.shard
+        if shard is None:
+            return
+        for key in KEYS:
+            self.counts[key] -= len(shard[key])
+        for key, watch in self._extras.items():
+            if watch:
+                for item in shard[key]:
+                    if item in watch:
+                        watch[item][1] -= 1
+            for item in shard[key + "_extras"]:
+                watch[item][0] -= 1
+                if not watch[item][0]:
+                    del watch[item]
+
+
+def extract_pending(jobs, check=None):
+    """
+    在工作线程中提取 LiveExtraction.prepare 取出的各段（数据量大时多进程并行）
+
+    参数:
+        check: 可选回调，抛出 extractor.Cancelled 即可中止
+
+    返回:
+        [(段, 分片结果), ...]，逐个交给 LiveExtraction.apply
+    """
+    text = "".join(piece for _, piece in jobs)
+    bounds = []
+    start = 0
+    for _, piece in jobs:
+        bounds.append((start, start + len(piece)))
+        start += len(piece)
+    shards = extractor.extract_shards(text, bounds, check)
+    return [(segment, shard) for (segment, _), shard in zip(jobs, shards)]
+
+
+def _split_lines(text):
+    """在换行符处把文本切成约 SEGMENT_CHARS 大小的若干段，返回 [(start, end), ...]"""
+    bounds = []
+    start = 0
+    while start < len(text):
+        cut = text.find("\n", start + SEGMENT_CHARS)
+        end = len(text) if cut == -1 else cut + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def watch_text(widget, on_edit):
+    """
+    截获 Tk 文本框的 insert/delete/replace，每次改动后调用 on_edit(first, last, lines)
+
+    参数含义同 LiveExtraction.edit。做法是把文本框的Tcl命令改名，
+    换成先记录改动行号再转调原命令的Python命令。
+    """
+    original = widget._w + "_original"
+    widget.tk.call("rename", widget._w, original)
+
+    def line_of(index):
+        return int(str(widget.tk.call(original, "index", index)).split(".")[0])
+
+    def proxy(*args):
+        if not args or args[0] not in ("insert", "delete", "replace"):
+            return widget.tk.call((original,) + args)
+        # 文本框末尾总保留一个换行符，"end - 1c" 所在的行即最后一行
+        before = line_of("end - 1c")
+        if args[0] == "insert":
+            first = last = line_of(args[1])
+        elif args[0] == "replace" or len(args) <= 3:
+            first = line_of(args[1])
+            last = line_of(args[2]) if len(args) > 2 else first
+        else:
+            # 一次删除多个区间，按整段改动处理
+            first, last = 1, before
+        result = widget.tk.call((original,) + args)
+        after = line_of("end - 1c")
+        first = min(first, before)
+        last = min(max(last, first), before)
+        on_edit(first, last, last - first + 1 + after - before)
+        return result
+
+    widget.tk.createcommand(widget._w, proxy)
@@ -1,14 +1,75 @@
+import os  
+import sys  
+import time  
+
+# 启动计时起点，尽量放在其他导入之前  
+STARTUP_BEGIN = time.perf_counter()  
+
+# 带命令行参数时以无界面模式运行：在导入 tkinter 和界面模块之前转到 cli，  
+# 没有安装 Tk 的机器上也能使用，也不必为界面模块付出导入时间  
+if __name__ == "__main__" and len(sys.argv) > 1:  
+    # 打包为可执行文件后，并行提取的子进程需要由此启动  
+    import multiprocessing  
+    multiprocessing.freeze_support()  
+    import cli  
+    sys.exit(cli.run(sys.argv[1:]))  
+
 import tkinter as tk  
-from tkinter import ttk, scrolledtext, messagebox  
-import re  
-import pyperclip  # 用于复制到剪贴板  
-from updater import check_for_updates, show_update_dialog  
+from tkinter import ttk, scrolledtext, messagebox, filedialog  
+from updater import check_for_updates_async, show_update_dialog  
+import clipboard_watch  
+import extractor  
+import dedup  
+import formatting  
+import id_types  
+import jobs  
+import instrumentation  
+import live  
+import reconcile  
+import tabular  
+from worker import BackgroundTask  
+from output_view import VirtualOutputView  
+
+# pyperclip 在第一次复制时才导入，requests 等在第一次检查更新时才导入（见 updater 模块）  
+STARTUP_IMPORTED = time.perf_counter()  
  
 # 定义版本号  
 APP_VERSION = "2.1.0"  
 GITHUB_OWNER = "Guowei-Shopee"  # 替换为您实际的GitHub用户名  
 GITHUB_REPO = "order-processor"    # 替换为您实际计划使用的仓库名 
 
+# 设置此环境变量后，窗口显示出来时把启动耗时输出到标准错误  
+STARTUP_TIME_ENV = "ORDER_PROCESSOR_STARTUP_TIME"  
+
+# 输入区域的标题（对比模式时改为"列表A"）  
+INPUT_LABEL = "请粘贴订单数据"  
+
+# 输入停止多久（毫秒）后更新实时统计  
+LIVE_DELAY = 300  
+
+# 批量格式分段时默认每段最多的单号数量  
+DEFAULT_CHUNK_ITEMS = 1000  
+
+# 后台处理各阶段在状态栏中的提示  
+STAGE_LABELS = {  
+    "live": "正在合并输入时已提取的结果",  
+    "encoding": "正在检查文件编码",  
+    "file": "正在读取文件并提取",  
+    "archive": "正在解压并提取",  
+    "parallel": "正在多核并行提取",  
+    "shards": "正在分片提取",  
+    "sls": "正在提取SLS单号",  
+    "order": "正在提取订单编号",  
+    "unknown": "正在提取未知单号",  
+    "table": "正在按列提取表格",  
+    "list_b": "正在提取列表B",  
+    "reconcile": "正在对比两个列表",  
+    "dedup": "正在去除重复单号",  
+    "history": "正在检查以前处理过的单号",  
+    "format": "正在生成结果",  
+    "export": "正在导出结果",  
+}  
+
 
 class OrderProcessorApp:  
     def __init__(self, root):  
@@ -20,13 +81,33 @@ class OrderProcessorApp:
         main_frame = ttk.Frame(root, padding="10")  
         main_frame.pack(fill=tk.BOTH, expand=True)  
         
-        # 输入区域  
-        input_frame = ttk.LabelFrame(main_frame, text="请粘贴订单数据", padding="10")  
-        input_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)  
+        # 输入区域（对比模式时右侧再显示列表B）  
+        inputs_frame = ttk.Frame(main_frame)  
+        inputs_frame.pack(fill=tk.BOTH, expand=True)  
+        
+        self.input_frame = input_frame = ttk.LabelFrame(inputs_frame, text=INPUT_LABEL, padding="10")  
+        input_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)  
         
         self.input_text = scrolledtext.ScrolledText(input_frame, height=10)  
         self.input_text.pack(fill=tk.BOTH, expand=True)  
         
+        # 通过"打开文件"或拖放导入的文件，处理时直接读取，不放入输入框  
+        self.input_file = None  
+        self.enable_file_drop()  
+        
+        # 输入或粘贴时实时更新统计，只重新提取改动的行（见 live 模块）  
+        self.live = live.LiveExtraction()  
+        self.live_revision = 0  
+        self.live_after = None  
+        self.live_task = None  
+        live.watch_text(self.input_text, self.live.edit)  
+        self.input_text.bind("<<Modified>>", self.on_input_modified)  
+        
+        # 对比模式的列表B，用相同规则提取后与上面的输入（列表A）对比  
+        self.input_b_frame = ttk.LabelFrame(inputs_frame, text="列表B", padding="10")  
+        self.input_b_text = scrolledtext.ScrolledText(self.input_b_frame, height=10, width=40)  
+        self.input_b_text.pack(fill=tk.BOTH, expand=True)  
+        
         # 输出格式选择区域  
         options_frame = ttk.Frame(main_frame)  
         options_frame.pack(fill=tk.X, padx=5, pady=5)  
@@ -43,6 +124,60 @@ class OrderProcessorApp:
         ttk.Radiobutton(format_frame, text="仅输出订单编号", variable=self.output_option,   
                       value="order_only").pack(side=tk.LEFT, padx=15)  
         
+        # 批量格式分段：按每段最多的单号数量和/或KB数拆成多段，便于按查询工具的限制分批查询  
+        chunk_frame = ttk.LabelFrame(options_frame, text="批量格式分段", padding="10")  
+        chunk_frame.pack(side=tk.LEFT, padx=(5, 0))  
+        
+        self.chunk_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(chunk_frame, text="每段最多", variable=self.chunk_var).pack(side=tk.LEFT)  
+        self.chunk_items_var = tk.StringVar(value=str(DEFAULT_CHUNK_ITEMS))  
+        ttk.Spinbox(chunk_frame, from_=1, to=10000000, increment=100, width=8,  
+                    textvariable=self.chunk_items_var).pack(side=tk.LEFT, padx=2)  
+        ttk.Label(chunk_frame, text="个单号").pack(side=tk.LEFT)  
+        self.chunk_kb_var = tk.StringVar()  
+        ttk.Entry(chunk_frame, textvariable=self.chunk_kb_var, width=6).pack(side=tk.LEFT, padx=(8, 2))  
+        ttk.Label(chunk_frame, text="KB").pack(side=tk.LEFT)  
+        
+        # 表格粘贴：制表符分隔的内容只提取单号列（留空自动识别），格式整理与原表格逐行对应  
+        table_frame = ttk.LabelFrame(options_frame, text="表格粘贴", padding="10")  
+        table_frame.pack(side=tk.LEFT, padx=(5, 0))  
+        
+        self.table_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(table_frame, text="按列提取", variable=self.table_var).pack(side=tk.LEFT)  
+        ttk.Label(table_frame, text="单号列").pack(side=tk.LEFT, padx=(8, 2))  
+        self.table_columns_var = tk.StringVar()  
+        ttk.Entry(table_frame, textvariable=self.table_columns_var, width=6).pack(side=tk.LEFT)  
+        
+        # 重复单号：本次输入内去重，以及跨会话标记/跳过以前处理过的单号（记录在本地索引中）  
+        repeat_frame = ttk.LabelFrame(main_frame, text="重复单号", padding="10")  
+        repeat_frame.pack(fill=tk.X, padx=5, pady=5)  
+        
+        self.dedup_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(repeat_frame, text="去除重复 (保留第一次出现)", variable=self.dedup_var).pack(side=tk.LEFT, padx=15)  
+        ttk.Label(repeat_frame, text="以前处理过的单号:").pack(side=tk.LEFT, padx=(15, 5))  
+        self.history_var = tk.StringVar(value="off")  
+        ttk.Radiobutton(repeat_frame, text="不检查", variable=self.history_var, value="off").pack(side=tk.LEFT, padx=5)  
+        ttk.Radiobutton(repeat_frame, text="标记数量", variable=self.history_var, value="mark").pack(side=tk.LEFT, padx=5)  
+        ttk.Radiobutton(repeat_frame, text="跳过", variable=self.history_var, value="skip").pack(side=tk.LEFT, padx=5)  
+        ttk.Button(repeat_frame, text="清除记录", command=self.clear_history).pack(side=tk.RIGHT, padx=5)  
+        
+        # 剪贴板监视：复制含有单号的内容后自动按所选格式处理（见 clipboard_watch 模块）  
+        watch_frame = ttk.LabelFrame(main_frame, text="剪贴板监视", padding="10")  
+        watch_frame.pack(fill=tk.X, padx=5, pady=5)  
+        
+        self.watch_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(watch_frame, text="复制单号后自动处理", variable=self.watch_var,  
+                        command=self.toggle_clipboard_watch).pack(side=tk.LEFT, padx=15)  
+        ttk.Label(watch_frame, text="格式:").pack(side=tk.LEFT, padx=(15, 5))  
+        self.watch_format_var = tk.StringVar(value=formatting.FORMAT_LABELS["organization"])  
+        ttk.Combobox(watch_frame, textvariable=self.watch_format_var, values=list(formatting.FORMAT_LABELS.values()),  
+                     state="readonly", width=14).pack(side=tk.LEFT)  
+        self.watch_copy_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(watch_frame, text="结果写回剪贴板", variable=self.watch_copy_var).pack(side=tk.LEFT, padx=15)  
+        # 正在处理时先不检查剪贴板，处理完再看有没有新内容  
+        self.clipboard_watcher = clipboard_watch.ClipboardWatcher(self.root, self.on_clipboard_changed,  
+                                                                  busy=lambda: self.task is not None)  
+        
         # 功能按钮区域  
         button_frame = ttk.Frame(main_frame, padding="10")  
         button_frame.pack(fill=tk.X, padx=5)  
@@ -51,14 +186,23 @@ class OrderProcessorApp:
         ttk.Button(button_frame, text="批量查订单格式", command=self.batch_query_format).pack(side=tk.LEFT, padx=5)  
         ttk.Button(button_frame, text="批量跑数据格式", command=self.batch_data_format).pack(side=tk.LEFT, padx=5)  
         ttk.Button(button_frame, text="复制结果", command=self.copy_to_clipboard).pack(side=tk.LEFT, padx=5)  
+        ttk.Button(button_frame, text="复制本段", command=self.copy_chunk).pack(side=tk.LEFT, padx=5)  
+        ttk.Button(button_frame, text="导出结果", command=self.export_result).pack(side=tk.LEFT, padx=5)  
+        self.cancel_button = ttk.Button(button_frame, text="取消", command=self.cancel_task, state=tk.DISABLED)  
+        self.cancel_button.pack(side=tk.LEFT, padx=5)  
         ttk.Button(button_frame, text="清空", command=self.clear_all).pack(side=tk.RIGHT, padx=5)  
+        # 对比模式：格式按钮输出列表A、B的对比结果（仅A有 / 仅B有 / 两边都有）  
+        self.reconcile_var = tk.BooleanVar(value=False)  
+        ttk.Checkbutton(button_frame, text="对比两个列表", variable=self.reconcile_var,  
+                        command=self.toggle_reconcile).pack(side=tk.RIGHT, padx=5)  
         
         # 输出区域  
         output_frame = ttk.LabelFrame(main_frame, text="处理结果", padding="10")  
         output_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)  
         
-        self.output_text = scrolledtext.ScrolledText(output_frame, height=15)  
-        self.output_text.pack(fill=tk.BOTH, expand=True)  
+        # 结果按行保存，只渲染可见部分，百万行结果也能立即显示  
+        self.output_view = VirtualOutputView(output_frame, height=15)  
+        self.output_view.pack(fill=tk.BOTH, expand=True)  
         
         # 状态栏和统计信息  
         stats_frame = ttk.Frame(main_frame)  
@@ -69,22 +213,41 @@ class OrderProcessorApp:
         ttk.Label(stats_frame, textvariable=self.stats_var).pack(side=tk.LEFT)  
         
         self.status_var = tk.StringVar()  
-        self.status_var.set("就绪")  
+        # 单号类型配置有误时已退回默认配置，启动时在状态栏提示  
+        self.status_var.set(id_types.LOAD_ERROR or "就绪")  
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)  
         status_bar.pack(fill=tk.X, padx=5, pady=2)  
         
+        # 最近几次输入的提取结果，切换输出选项或格式时直接复用  
+        self.extraction_cache = extractor.ExtractionCache()  
+        
+        # 任务列表（多个文件或粘贴内容排队同时处理），第一次打开时创建  
+        self.job_queue = jobs.JobQueue(self.root)  
+        self.job_window = None  
+        
+        # 当前后台任务及其耗时记录  
+        self.task = None  
+        self.recorder = None  
+        
+        # 是否记录各阶段耗时（帮助菜单中可切换）  
+        self.profile_var = tk.BooleanVar(value=instrumentation.enabled_by_env())  
+        
         # 添加菜单栏  
         self.create_menu()  
                 
         # 初始化后检查更新（延迟2秒，让界面先加载完毕）  
         self.root.after(2000, self.check_for_updates)  
-
+    
     def create_menu(self):  
         """创建菜单栏"""  
         menubar = tk.Menu(self.root)  
         
         # 文件菜单  
         file_menu = tk.Menu(menubar, tearoff=0)  
+        file_menu.add_command(label="打开文件...", accelerator="Ctrl+O", command=self.open_file)  
+        file_menu.add_command(label="任务列表...", command=self.open_job_list)  
+        file_menu.add_command(label="导出结果...", accelerator="Ctrl+S", command=self.export_result)  
+        file_menu.add_command(label="导出各段...", command=self.export_chunks)  
         file_menu.add_command(label="清空", command=self.clear_all)  
         file_menu.add_separator()  
         file_menu.add_command(label="退出", command=self.root.quit)  
@@ -92,23 +255,35 @@ class OrderProcessorApp:
         
         # 帮助菜单  
         help_menu = tk.Menu(menubar, tearoff=0)  
-        help_menu.add_command(label="检查更新", command=self.check_for_updates)  
+        help_menu.add_command(label="检查更新", command=lambda: self.check_for_updates(manual=True))  
+        help_menu.add_checkbutton(label="记录处理耗时", variable=self.profile_var)  
+        help_menu.add_separator()  
         help_menu.add_command(label="关于", command=self.show_about)  
         menubar.add_cascade(label="帮助", menu=help_menu)  
         
         self.root.config(menu=menubar)  
-
-    def check_for_updates(self):  
-        """检查更新"""  
-        has_update, latest_version, download_url, changelog = check_for_updates(  
-            APP_VERSION, GITHUB_OWNER, GITHUB_REPO  
+        self.root.bind("<Control-o>", lambda event: self.open_file())  
+        self.root.bind("<Control-s>", lambda event: self.export_result())  
+    
+    def check_for_updates(self, manual=False):  
+        """检查更新（后台进行，启动时优先使用缓存，手动检查时向服务器确认）"""  
+        if manual:  
+            self.status_var.set("正在检查更新...")  
+        check_for_updates_async(  
+            self.root, APP_VERSION, GITHUB_OWNER, GITHUB_REPO,  
+            lambda *result: self.on_update_checked(manual, *result),  
+            force=manual,  
         )  
-        
+    
+    def on_update_checked(self, manual, has_update, latest_version, download_url, changelog):  
+        """更新检查完成"""  
         if has_update and download_url:  
             show_update_dialog(  
                 self.root, APP_VERSION, latest_version, download_url, changelog  
             )  
-
+        elif manual:  
+            self.status_var.set(f"未发现新版本（当前 v{APP_VERSION}）")  
+    
     def show_about(self):  
         """显示关于对话框"""  
         messagebox.showinfo(  
@@ -117,385 +292,681 @@ class OrderProcessorApp:
             "一个高效的订单号提取和格式化工具\n\n"  
             "© 2025 Guowei Huang"  
         )  
-
-    def extract_order_numbers(self, text):  
-        """提取SLS单号、订单编号和未知单号"""  
-        # SLS单号模式:   
-        # MX/CL/CO是18位单号(国家代码2位+16位字符)  
-        # 其他国家代码(BR/MY/PH/SG/TH/TW/VN)仍为15位(国家代码2位+13位字符)  
-        sls_pattern = r'(?:MX|CL|CO)[A-Za-z0-9]{16}|(?:BR|MY|PH|SG|TH|TW|VN)[A-Za-z0-9]{13}'  
-        
-        # 查找所有SLS单号匹配项  
-        sls_matches = re.findall(sls_pattern, text)  
-        
-        # 创建一个新的文本副本，将所有SLS单号替换为空格，以避免重复匹配  
-        filtered_text = text  
-        for sls in sls_matches:  
-            filtered_text = filtered_text.replace(sls, ' ' * len(sls))  
-        
-        # 订单编号模式: 6位数字开头 + 8-9位字母数字混合字符，且要求必须至少包含一个字母  
-        order_pattern = r'\d{6}(?=.*[A-Za-z])[A-Za-z0-9]{8,9}'  
-        
-        # 在过滤后的文本中查找订单编号  
-        order_matches = re.findall(order_pattern, filtered_text)  
-        
-        # 再次过滤文本，将订单编号也替换为空格  
-        for order in order_matches:  
-            filtered_text = filtered_text.replace(order, ' ' * len(order))  
-            
-        # 提取未知单号，进行逐个处理以避免重叠匹配  
-        unknown_matches = []  
-        
-        # 持续搜索直到没有新的匹配  
-        while True:  
-            # 提取至少8位的字母数字组合  
-            unknown_pattern = r'[A-Za-z0-9]{8,}'  
-            match = re.search(unknown_pattern, filtered_text)  
-            
-            # 如果没有找到匹配项，退出循环  
-            if not match:  
-                break  
-                
-            # 获取匹配的文本  
-            item = match.group(0)  
-            
-            # 检查是否是纯数字  
-            is_pure_digits = item.isdigit()  
-            
-            # 检查是否包含大写字母和数字的组合（不含小写字母）  
-            has_uppercase = any(char.isupper() for char in item)  
-            has_digit = any(char.isdigit() for char in item)  
-            has_lowercase = any(char.islower() for char in item)  
-            is_uppercase_with_digits = has_uppercase and has_digit and not has_lowercase  
-            
-            # 如果符合条件，添加到结果列表  
-            if is_pure_digits or is_uppercase_with_digits:  
-                unknown_matches.append(item)  
-            
-            # 无论是否符合条件，都从文本中移除当前匹配项以避免重复匹配  
-            start, end = match.span()  
-            filtered_text = filtered_text[:start] + ' ' * (end - start) + filtered_text[end:]  
-        
-        # 更新统计信息  
-        self.stats_var.set(f"SLS单号: {len(sls_matches)} | 订单编号: {len(order_matches)} | 未知单号: {len(unknown_matches)}")  
-        
-        return {"sls": sls_matches, "order": order_matches, "unknown": unknown_matches}
-    
-    def get_filtered_data(self, data):  
-        """根据用户选择过滤数据"""  
-        output_option = self.output_option.get()  
-        
-        sls_numbers = data["sls"]  
-        order_numbers = data["order"]  
-        unknown_numbers = data["unknown"]  
-        
-        # 统计检测到的单号类型  
-        has_sls = len(sls_numbers) > 0  
-        has_order = len(order_numbers) > 0  
-        has_unknown = len(unknown_numbers) > 0  
-        
-        if output_option == "sls_only":  
-            # 仅保留SLS单号  
-            sls_numbers = data["sls"]  
-            order_numbers = []  
-            unknown_numbers = []  
-        elif output_option == "order_only":  
-            # 仅保留订单编号  
-            sls_numbers = []  
-            order_numbers = data["order"]  
-            unknown_numbers = []  
-        # 自动模式 (auto) 使用所有检测到的单号  
+    
+    def enable_file_drop(self):  
+        """安装了 tkinterdnd2 时支持把文件拖放到输入区域"""  
+        try:  
+            from tkinterdnd2 import DND_FILES  
+            self.input_text.drop_target_register(DND_FILES)  
+            self.input_text.dnd_bind("<<Drop>>", self.on_file_drop)  
+        except (ImportError, AttributeError, tk.TclError):  
+            # 未安装或窗口不是由 TkinterDnD 创建时不支持拖放，仍可通过菜单打开文件  
+            pass  
+    
+    def on_file_drop(self, event):  
+        """拖放文件到输入区域"""  
+        paths = self.root.tk.splitlist(event.data)  
+        if paths:  
+            self.open_file(paths[0])  
+    
+    def open_file(self, path=None):  
+        """导入文本/CSV导出文件（也可以是 .gz/.bz2/.zip 压缩文件），处理时直接读取文件，不把内容载入输入框"""  
+        if path is None:  
+            path = filedialog.askopenfilename(  
+                title="打开订单数据文件",  
+                filetypes=[("文本、CSV或压缩文件", "*.txt *.csv *.tsv *.gz *.bz2 *.zip"), ("所有文件", "*.*")],  
+            )  
+            if not path:  
+                return  
+        try:  
+            size = os.path.getsize(path)  
+        except OSError as e:  
+            messagebox.showerror("打开文件失败", str(e))  
+            return  
+        
+        self.cancel_task(quiet=True)  
+        self.input_file = path  
+        self.input_text.config(state=tk.NORMAL)  
+        self.input_text.delete("1.0", tk.END)  
+        self.input_text.insert(tk.END, f"已导入文件: {path}\n大小: {size / (1024 * 1024):.1f} MB\n\n"  
+                                       "处理时直接读取文件，内容不在此显示。点击\"清空\"可恢复粘贴输入。")  
+        self.input_text.config(state=tk.DISABLED)  
+        self.status_var.set(f"已导入文件 {os.path.basename(path)}，请选择输出格式")  
+    
+    def update_stats(self, data):  
+        """更新统计信息"""  
+        self.stats_var.set(self.format_stats({key: len(data[key]) for key in formatting.CLASSES}))  
+    
+    @staticmethod  
+    def format_stats(counts):  
+        """统计栏文本"""  
+        return f"SLS单号: {counts['sls']} | 订单编号: {counts['order']} | 未知单号: {counts['unknown']}"  
+    
+    def on_input_modified(self, event=None):  
+        """输入内容改变后，等输入停顿再更新统计"""  
+        if not self.input_text.edit_modified():  
+            return  
+        self.input_text.edit_modified(False)  
+        if self.live.revision == self.live_revision:  
+            # 有未经 insert/delete 的改动（例如撤销），全部重新提取  
+            self.live.reset(int(self.input_text.index("end - 1c").split(".")[0]))  
+        self.live_revision = self.live.revision  
+        if self.live_after is not None:  
+            self.root.after_cancel(self.live_after)  
+        self.live_after = self.root.after(LIVE_DELAY, self.update_live_stats)  
+    
+    def update_live_stats(self):  
+        """在后台提取改动过的行，完成后更新统计"""  
+        self.live_after = None  
+        if self.live_task is not None:  
+            # 正在提取，完成后会再检查一次  
+            return  
+        jobs = self.live.prepare(lambda first, last: self.input_text.get(f"{first}.0", f"{last + 1}.0"))  
+        if jobs:  
+            self.start_live_task(lambda task: live.extract_pending(jobs, task.check), self.on_live_extracted)  
+        elif self.live.conflicted:  
+            # 分段之间有相互影响（极少见），统计改为整段提取  
+            input_text = self.input_text.get("1.0", tk.END)  
+            self.start_live_task(lambda task: self.extraction_cache.extract(input_text, task.check),  
+                                 self.on_live_full_extracted)  
+        elif self.input_file is None:  
+            self.stats_var.set(self.format_stats(self.live.counts))  
+    
+    def start_live_task(self, func, on_done):  
+        """启动实时统计的后台提取（与格式化等任务互不影响）"""  
+        def done(result):  
+            self.live_task = None  
+            on_done(result)  
         
-        return {  
-            "sls": sls_numbers,   
-            "order": order_numbers,  
-            "unknown": unknown_numbers,  
-            "has_sls": has_sls,  
-            "has_order": has_order,  
-            "has_unknown": has_unknown  
-        }  
+        def failed(error):  
+            self.live_task = None  
         
+        self.live_task = BackgroundTask(self.root, func, on_done=done, on_error=failed)  
+        self.live_task.start()  
+    
+    def on_live_extracted(self, results):  
+        """改动的行提取完成"""  
+        for segment, shard in results:  
+            self.live.apply(segment, shard)  
+        # 提取期间又有改动时等去抖后再处理  
+        if self.live_after is None:  
+            self.update_live_stats()  
+    
+    def on_live_full_extracted(self, data):  
+        """整段提取完成（仅在分段之间有相互影响时）"""  
+        if self.input_file is None and self.live_after is None and not self.live.pending:  
+            self.update_stats(data)  
+    
+    def toggle_reconcile(self):  
+        """显示或隐藏列表B"""  
+        if self.reconcile_var.get():  
+            self.input_frame.config(text="列表A")  
+            self.input_b_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)  
+            self.status_var.set("对比模式：在右侧粘贴列表B，点击格式按钮输出仅A有、仅B有和两边都有的单号")  
+        else:  
+            self.input_frame.config(text=INPUT_LABEL)  
+            self.input_b_frame.pack_forget()  
+            self.status_var.set("就绪")  
+    
     def format_organization(self):  
         """格式整理功能：按excel格式竖排列整理"""  
-        input_text = self.input_text.get("1.0", tk.END)  
-        raw_data = self.extract_order_numbers(input_text)  
-        filtered_data = self.get_filtered_data(raw_data)  
-        
-        sls_numbers = filtered_data["sls"]  
-        order_numbers = filtered_data["order"]  
-        unknown_numbers = filtered_data["unknown"]  
-        
-        has_sls = filtered_data["has_sls"]  
-        has_order = filtered_data["has_order"]  
-        has_unknown = filtered_data["has_unknown"]  
-        
-        # 智能输出布局决策  
-        # 如果同时存在多种单号，使用多列布局  
-        # 如果只有一种单号，使用单列布局  
-        column_count = sum([1 if sls_numbers else 0,   
-                          1 if order_numbers else 0,   
-                          1 if unknown_numbers and self.output_option.get() == "auto" else 0])  
-        
-        using_multi_columns = column_count > 1  
-        
-        if using_multi_columns:  
-            # 多列输出模式 (可能是A/B列或A/B/C列)  
-            max_rows = max(len(sls_numbers) if sls_numbers else 0,   
-                         len(order_numbers) if order_numbers else 0,  
-                         len(unknown_numbers) if unknown_numbers else 0)  
-            result_rows = []  
-            
-            for i in range(max_rows):  
-                sls_value = sls_numbers[i] if sls_numbers and i < len(sls_numbers) else ""  
-                order_value = order_numbers[i] if order_numbers and i < len(order_numbers) else ""  
-                unknown_value = unknown_numbers[i] if unknown_numbers and i < len(unknown_numbers) else ""  
-                
-                if column_count == 3:  
-                    # A/B/C三列  
-                    result_rows.append(f"{sls_value}\t{order_value}\t{unknown_value}")  
-                else:  
-                    # A/B两列  
-                    if sls_numbers and order_numbers:  
-                        result_rows.append(f"{sls_value}\t{order_value}")  
-                    elif sls_numbers and unknown_numbers:  
-                        result_rows.append(f"{sls_value}\t{unknown_value}")  
-                    elif order_numbers and unknown_numbers:  
-                        result_rows.append(f"{order_value}\t{unknown_value}")  
-                
-            result = "\n".join(result_rows)  
-            count = len(sls_numbers) + len(order_numbers) + len(unknown_numbers)  
-            
-            if column_count == 3:  
-                output_desc = "SLS单号、订单编号和未知单号 (A/B/C列)"  
-            elif sls_numbers and order_numbers:  
-                output_desc = "SLS单号和订单编号 (A/B列)"  
-            elif sls_numbers and unknown_numbers:  
-                output_desc = "SLS单号和未知单号 (A/B列)"  
-            else:  
-                output_desc = "订单编号和未知单号 (A/B列)"  
-        else:  
-            # 单列输出  
-            if sls_numbers:  
-                all_numbers = sls_numbers  
-                output_desc = "SLS单号"  
-            elif order_numbers:  
-                all_numbers = order_numbers  
-                output_desc = "订单编号"   
-            elif unknown_numbers:  
-                all_numbers = unknown_numbers  
-                output_desc = "未知单号"  
-            else:  
-                all_numbers = []  
-                output_desc = "单号"  
-                
-            result = "\n".join(all_numbers)  
-            count = len(all_numbers)  
-        
-        self.output_text.delete("1.0", tk.END)  
-        self.output_text.insert("1.0", result)  
-        
-        # 更新状态栏  
-        self.status_var.set(f"已整理 {count} 个{output_desc}")  
+        # 如果同时存在多种单号，使用多列布局(A/B列或A/B/C列)，只有一种单号时使用单列布局  
+        self.show_formatted("organization")  
     
     def batch_query_format(self):  
         """批量查订单格式：每个订单号后添加逗号，最后一个除外"""  
-        input_text = self.input_text.get("1.0", tk.END)  
-        raw_data = self.extract_order_numbers(input_text)  
-        filtered_data = self.get_filtered_data(raw_data)  
-        
-        sls_numbers = filtered_data["sls"]  
-        order_numbers = filtered_data["order"]  
-        unknown_numbers = filtered_data["unknown"]  
-        
-        has_sls = filtered_data["has_sls"]  
-        has_order = filtered_data["has_order"]  
-        has_unknown = filtered_data["has_unknown"]  
-        
-        # 智能输出布局决策  
-        column_count = sum([1 if sls_numbers else 0,   
-                          1 if order_numbers else 0,   
-                          1 if unknown_numbers and self.output_option.get() == "auto" else 0])  
-        
-        using_multi_columns = column_count > 1  
-        
-        if using_multi_columns:  
-            # 多列输出处理 - 分别处理各类单号  
-            result_parts = []  
-            total_count = 0  
-            
-            if sls_numbers:  
-                sls_temp = [num + "," for num in sls_numbers[:-1]]  
-                sls_temp.append(sls_numbers[-1])  
-                sls_formatted = "".join(sls_temp)  
-                result_parts.append(f"SLS单号:\n{sls_formatted}")  
-                total_count += len(sls_numbers)  
-                
-            if order_numbers:  
-                order_temp = [num + "," for num in order_numbers[:-1]]  
-                order_temp.append(order_numbers[-1])  
-                order_formatted = "".join(order_temp)  
-                result_parts.append(f"订单编号:\n{order_formatted}")  
-                total_count += len(order_numbers)  
-            
-            if unknown_numbers and self.output_option.get() == "auto":  
-                unknown_temp = [num + "," for num in unknown_numbers[:-1]]  
-                unknown_temp.append(unknown_numbers[-1])  
-                unknown_formatted = "".join(unknown_temp)  
-                result_parts.append(f"未知单号:\n{unknown_formatted}")  
-                total_count += len(unknown_numbers)  
-                
-            result = "\n\n".join(result_parts)  
-            count = total_count  
-            
-            if column_count == 3:  
-                output_desc = "SLS单号、订单编号和未知单号 (分组显示)"  
-            elif sls_numbers and order_numbers:  
-                output_desc = "SLS单号和订单编号 (分组显示)"  
-            elif sls_numbers and unknown_numbers:  
-                output_desc = "SLS单号和未知单号 (分组显示)"  
-            else:  
-                output_desc = "订单编号和未知单号 (分组显示)"  
-        else:  
-            # 单列输出  
-            if sls_numbers:  
-                all_numbers = sls_numbers  
-                output_desc = "SLS单号"  
-            elif order_numbers:  
-                all_numbers = order_numbers  
-                output_desc = "订单编号"   
-            elif unknown_numbers:  
-                all_numbers = unknown_numbers  
-                output_desc = "未知单号"  
-            else:  
-                all_numbers = []  
-                output_desc = "单号"  
-            
-            if all_numbers:  
-                # 除最后一个外，所有订单号后添加逗号  
-                formatted_numbers = [num + "," for num in all_numbers[:-1]]  
-                formatted_numbers.append(all_numbers[-1])  # 添加最后一个（不带逗号）  
-                result = "".join(formatted_numbers)  
-                count = len(all_numbers)  
-            else:  
-                result = ""  
-                count = 0  
-        
-        self.output_text.delete("1.0", tk.END)  
-        self.output_text.insert("1.0", result)  
-        
-        # 更新状态栏  
-        self.status_var.set(f"已处理 {count} 个{output_desc}为批量查询格式")  
+        self.show_formatted("batch_query")  
     
     def batch_data_format(self):  
         """批量跑数据格式：'订单号',格式"""  
-        input_text = self.input_text.get("1.0", tk.END)  
-        raw_data = self.extract_order_numbers(input_text)  
-        filtered_data = self.get_filtered_data(raw_data)  
-        
-        sls_numbers = filtered_data["sls"]  
-        order_numbers = filtered_data["order"]  
-        unknown_numbers = filtered_data["unknown"]  
-        
-        has_sls = filtered_data["has_sls"]  
-        has_order = filtered_data["has_order"]  
-        has_unknown = filtered_data["has_unknown"]  
-        
-        # 智能输出布局决策  
-        column_count = sum([1 if sls_numbers else 0,   
-                          1 if order_numbers else 0,   
-                          1 if unknown_numbers and self.output_option.get() == "auto" else 0])  
-        
-        using_multi_columns = column_count > 1  
-        
-        if using_multi_columns:  
-            # 多列输出处理 - 分别处理各类单号  
-            result_parts = []  
-            total_count = 0  
+        self.show_formatted("batch_data")  
+    
+    def show_formatted(self, fmt, text=None, copy=False):  
+        """  
+        在后台提取、过滤并按指定格式输出到结果区域  
+        
+        参数:  
+            text: 要处理的文本，默认为输入框的内容（或导入的文件）；监视剪贴板时为剪贴板的内容  
+            copy: 完成后是否把结果复制到剪贴板  
+        """  
+        # 取消尚未完成的任务，以最新的点击为准  
+        self.cancel_task(quiet=True)  
+        
+        settings = self.read_settings(fmt)  
+        if settings is None:  
+            return  
+        cache = self.extraction_cache  
+        # 表格按列提取只适用于粘贴的文本  
+        table = settings["table"] and (text is not None or self.input_file is None)  
+        table_columns = settings["table_columns"]  
+        if text is None and self.input_file is not None:  
+            path = self.input_file  
+            try:  
+                size = os.path.getsize(path)  
+            except OSError as e:  
+                self.status_var.set(f"无法读取文件: {e}")  
+                return  
+            extract = lambda progress: cache.extract_file(path, progress)  
+            source = {"file": path, "bytes": size}  
+        elif text is None and self.live.shards() is not None and not self.live.conflicted and not table:  
+            # 输入时各段都已提取完毕，直接合并，不必重新扫描（记录耗时时各段当时提取各步的耗时计入 "live"）  
+            shards = self.live.shards()  
+            size = 1  
             
-            if sls_numbers:  
-                sls_temp = [f"'{num}'," for num in sls_numbers[:-1]]  
-                sls_temp.append(f"'{sls_numbers[-1]}'")  
-                sls_formatted = "".join(sls_temp)  
-                result_parts.append(f"SLS单号:\n{sls_formatted}")  
-                total_count += len(sls_numbers)  
+            def extract(progress):  
+                progress("live", 0)  
+                return extractor.merge_shards(shards, progress)  
+            source = {"lines": self.live.lines, "incremental": True}  
+        else:  
+            input_text = self.input_text.get("1.0", tk.END) if text is None else text  
+            size = len(input_text)  
+            extract = self.text_extractor(input_text, table, table_columns)  
+            source = {"chars": size, "table": table, "clipboard": text is not None}  
+        max_items, max_bytes = settings["max_items"], settings["max_bytes"]  
+        if max_items or max_bytes:  
+            source = dict(source, max_items=max_items, max_bytes=max_bytes)  
+        output_option = settings["output_option"]  
+        dedupe = settings["dedupe"]  
+        history = settings["history"]  
+        compare = None  
+        if self.reconcile_var.get() and text is None:  
+            # 对比结果本身不含重复单号，也不检查以前处理过的单号  
+            input_b = self.input_b_text.get("1.0", tk.END)  
+            compare = (self.text_extractor(input_b, table, table_columns), len(input_b))  
+            dedupe, history = False, "off"  
+            source = dict(source, list_b_chars=len(input_b))  
+        recorder = instrumentation.StageRecorder(enabled=self.profile_var.get())  
+        recorder.info = dict(source, format=fmt, output_option=output_option, dedupe=dedupe, history=history)  
+        profile_path = os.environ.get(instrumentation.CPROFILE_ENV) if recorder.enabled else None  
+        
+        task = BackgroundTask(  
+            self.root,  
+            lambda task: self.format_job(task, extract, size, output_option, fmt, recorder, profile_path,  
+                                         max_items, max_bytes, dedupe, history, compare),  
+            on_done=lambda result: self.on_format_done(fmt, result, recorder, copy),  
+            on_progress=self.show_progress,  
+            on_cancel=lambda: self.on_task_cancelled(task),  
+            on_error=self.on_task_error,  
+        )  
+        self.task = task  
+        self.recorder = recorder  
+        self.cancel_button.config(state=tk.NORMAL)  
+        self.status_var.set("正在处理...")  
+        task.start()  
+    
+    def read_settings(self, fmt):  
+        """  
+        读取界面上的处理选项，设置无效时在状态栏提示并返回 None  
+        
+        返回:  
+            {"output_option", "dedupe", "history", "max_items", "max_bytes", "table", "table_columns"}，  
+            含义同 format_job 和 text_extractor 的参数  
+        """  
+        table_columns = None  
+        if self.table_var.get():  
+            try:  
+                table_columns = tabular.parse_columns(self.table_columns_var.get())  
+            except ValueError as e:  
+                self.status_var.set(str(e))  
+                return None  
+        # 分段只适用于批量格式  
+        max_items = max_bytes = None  
+        if fmt != "organization":  
+            limits = self.chunk_limits()  
+            if limits is None:  
+                self.status_var.set("分段设置无效：每段单号数量和KB数需为正数，至少填写一项")  
+                return None  
+            max_items, max_bytes = limits  
+        return {  
+            "output_option": self.output_option.get(),  
+            "dedupe": self.dedup_var.get(),  
+            "history": self.history_var.get(),  
+            "max_items": max_items,  
+            "max_bytes": max_bytes,  
+            "table": self.table_var.get(),  
+            "table_columns": table_columns,  
+        }  
+    
+    def text_extractor(self, text, table=False, columns=None):  
+        """  
+        返回粘贴文本的提取函数 extract(progress)  
+        
+        参数:  
+            table: 是否按表格的单号列提取；文本不是表格或识别不到单号列时仍按普通文本提取  
+            columns: 单号列的下标列表，None 表示自动识别，见 tabular.extract_table  
+        """  
+        cache = self.extraction_cache  
+        if not table:  
+            return lambda progress: cache.extract(text, progress)  
+        tag = ("table", None if columns is None else tuple(columns))  
+        
+        def extract(progress):  
+            data = cache.extract(text, progress, lambda t, p: tabular.extract_table(t, columns, p), tag)  
+            return data if data is not None else cache.extract(text, progress)  
+        return extract  
+    
+    @staticmethod  
+    def format_job(task, extract, size, output_option, fmt, recorder, profile_path=None,  
+                   max_items=None, max_bytes=None, dedupe=False, history="off", compare=None):  
+        """  
+        在工作线程中执行：提取、过滤并生成按行访问的结果（不能访问Tk控件）  
+        
+        参数:  
+            extract: extract(progress) 返回提取结果（粘贴的文本或导入的文件）  
+            size: 输入的字符数或字节数，用于计算进度  
+            max_items, max_bytes: 批量格式的分段上限，见 formatting.iter_chunks  
+            dedupe: 是否去除重复单号  
+            history: 以前处理过的单号 "off" 不检查 / "mark" 只统计数量 / "skip" 跳过；  
+                检查时同时把本次的单号记入索引  
+            compare: 对比模式时为列表B的 (extract, size)，输出与 extract 的结果（列表A）对比的  
+                仅A有 / 仅B有 / 两边都有，见 reconcile 模块  
+        
+        返回:  
+            (提取结果, 按行访问的结果, 输出数量, 单号类型描述, 状态栏附加说明列表)  
+        """  
+        size = max(size, 1)  
+        
+        def progress(stage, pos):  
+            task.check()  
+            task.report(stage, pos / size)  
+        
+        recorder.start()  
+        with instrumentation.profile(profile_path):  
+            # 输入未变化时直接使用缓存结果，大量数据时自动分片并行提取  
+            # 查找缓存的耗时记为 cache，实际提取时由进度回调切换到 sls/order/unknown 等阶段  
+            recorder.begin("cache")  
+            data = extract(recorder.wrap_progress(progress))  
+            if compare is not None:  
+                extract_b, size_b = compare  
                 
-            if order_numbers:  
-                order_temp = [f"'{num}'," for num in order_numbers[:-1]]  
-                order_temp.append(f"'{order_numbers[-1]}'")  
-                order_formatted = "".join(order_temp)  
-                result_parts.append(f"订单编号:\n{order_formatted}")  
-                total_count += len(order_numbers)  
-            
-            if unknown_numbers and self.output_option.get() == "auto":  
-                unknown_temp = [f"'{num}'," for num in unknown_numbers[:-1]]  
-                unknown_temp.append(f"'{unknown_numbers[-1]}'")  
-                unknown_formatted = "".join(unknown_temp)  
-                result_parts.append(f"未知单号:\n{unknown_formatted}")  
-                total_count += len(unknown_numbers)  
+                def progress_b(stage, pos):  
+                    task.check()  
+                    task.report("list_b", pos / max(size_b, 1))  
                 
-            result = "\n\n".join(result_parts)  
-            count = total_count  
-            
-            if column_count == 3:  
-                output_desc = "SLS单号、订单编号和未知单号 (分组显示)"  
-            elif sls_numbers and order_numbers:  
-                output_desc = "SLS单号和订单编号 (分组显示)"  
-            elif sls_numbers and unknown_numbers:  
-                output_desc = "SLS单号和未知单号 (分组显示)"  
-            else:  
-                output_desc = "订单编号和未知单号 (分组显示)"  
+                recorder.begin("list_b")  
+                data_b = extract_b(progress_b)  
+                task.report("reconcile", None)  
+                with recorder.stage("reconcile"):  
+                    result = reconcile.reconcile_data(data, data_b, output_option)  
+                task.report("format", None)  
+                with recorder.stage("format"):  
+                    rows, count, output_desc = formatting.format_rows(fmt, result, max_items, max_bytes,  
+                                                                      reconcile.PARTS)  
+                return data, rows, count, output_desc, reconcile.describe_counts(result)  
+            with recorder.stage("filter"):  
+                filtered_data = formatting.filter_data(data, output_option)  
+            notes = []  
+            if "table" in data:  
+                notes.append(tabular.describe(data))  
+            if dedupe:  
+                task.report("dedup", None)  
+                with recorder.stage("dedup"):  
+                    before = sum(len(filtered_data[key]) for key in formatting.CLASSES)  
+                    filtered_data = dedup.dedupe_data(filtered_data)  
+                    removed = before - sum(len(filtered_data[key]) for key in formatting.CLASSES)  
+                notes.append(f"去除重复 {removed} 个")  
+            if history != "off":  
+                task.report("history", None)  
+                with recorder.stage("history"), dedup.SeenIndex() as index:  
+                    filtered_data, repeats = index.check(filtered_data, skip=history == "skip", check=task.check)  
+                repeated = sum(repeats.values())  
+                notes.append(f"跳过以前处理过的 {repeated} 个" if history == "skip" else f"其中 {repeated} 个以前处理过")  
+            task.report("format", None)  
+            with recorder.stage("format"):  
+                # 表格按列提取时格式整理与原表格逐行对应  
+                alignment = tabular.align(data, filtered_data) if "table" in data and fmt == "organization" else None  
+                rows, count, output_desc = formatting.format_rows(fmt, filtered_data, max_items, max_bytes,  
+                                                                  alignment=alignment)  
+        return data, rows, count, output_desc, notes  
+    
+    def chunk_limits(self):  
+        """  
+        读取分段设置  
+        
+        返回:  
+            (max_items, max_bytes)，未勾选分段时均为 None；设置无效时返回 None  
+        """  
+        if not self.chunk_var.get():  
+            return None, None  
+        items = self.chunk_items_var.get().strip()  
+        kb = self.chunk_kb_var.get().strip()  
+        try:  
+            max_items = int(items) if items else None  
+            max_bytes = int(float(kb) * 1024) if kb else None  
+        except ValueError:  
+            return None  
+        if max_items is None and max_bytes is None:  
+            return None  
+        if (max_items is not None and max_items < 1) or (max_bytes is not None and max_bytes < 1):  
+            return None  
+        return max_items, max_bytes  
+    
+    def show_progress(self, stage, fraction):  
+        """在状态栏显示后台处理进度"""  
+        label = STAGE_LABELS[stage]  
+        if fraction is None:  
+            self.status_var.set(f"{label}...")  
         else:  
-            # 单列输出  
-            if sls_numbers:  
-                all_numbers = sls_numbers  
-                output_desc = "SLS单号"  
-            elif order_numbers:  
-                all_numbers = order_numbers  
-                output_desc = "订单编号"   
-            elif unknown_numbers:  
-                all_numbers = unknown_numbers  
-                output_desc = "未知单号"  
-            else:  
-                all_numbers = []  
-                output_desc = "单号"  
-            
-            if all_numbers:  
-                # 所有订单号格式化为'订单号',  
-                formatted_numbers = [f"'{num}'," for num in all_numbers[:-1]]  
-                # 最后一个不加逗号  
-                formatted_numbers.append(f"'{all_numbers[-1]}'")  
-                result = "".join(formatted_numbers)  
-                count = len(all_numbers)  
-            else:  
-                result = ""  
-                count = 0  
-        
-        self.output_text.delete("1.0", tk.END)  
-        self.output_text.insert("1.0", result)  
-        
+            self.status_var.set(f"{label}... {int(fraction * 100)}%")  
+    
+    def on_format_done(self, fmt, result, recorder, copy=False):  
+        """后台处理完成，在结果区域显示，copy 为真时同时复制到剪贴板"""  
+        data, rows, count, output_desc, notes = result  
+        self.task = None  
+        self.recorder = None  
+        self.cancel_button.config(state=tk.DISABLED)  
+        self.update_stats(data)  
+        with recorder.stage("render"):  
+            self.output_view.set_rows(rows)  
+            self.root.update_idletasks()  
+        recorder.stop()  
         # 更新状态栏  
-        self.status_var.set(f"已处理 {count} 个{output_desc}为批量数据格式")  
+        message = formatting.status_message(fmt, count, output_desc, notes)  
+        if copy and count:  
+            self.write_clipboard(self.output_view.get_text().strip())  
+            message += "，已复制到剪贴板"  
+        if recorder.enabled:  
+            message += f"  [{recorder.summary()}]"  
+            error = instrumentation.append_log(instrumentation.default_log_path(), recorder.to_record(count=count))  
+            if error:  
+                message += f"  (耗时日志写入失败: {error})"  
+        self.status_var.set(message)  
+    
+    def cancel_task(self, quiet=False):  
+        """取消正在进行的后台处理"""  
+        if self.task is None:  
+            return  
+        self.task.cancel()  
+        self.task = None  
+        self.stop_recorder()  
+        self.cancel_button.config(state=tk.DISABLED)  
+        if not quiet:  
+            self.status_var.set("已取消")  
+    
+    def stop_recorder(self):  
+        """停止当前任务的耗时记录（关闭内存跟踪）"""  
+        if self.recorder is not None:  
+            self.recorder.stop()  
+            self.recorder = None  
+    
+    def on_task_cancelled(self, task):  
+        """工作线程确认已停止"""  
+        if task is self.task:  
+            self.task = None  
+            self.cancel_button.config(state=tk.DISABLED)  
+            self.status_var.set("已取消")  
+    
+    def on_task_error(self, error):  
+        """后台处理出错"""  
+        self.task = None  
+        self.stop_recorder()  
+        self.cancel_button.config(state=tk.DISABLED)  
+        self.status_var.set(f"处理出错: {error}")  
     
     def copy_to_clipboard(self):  
         """复制结果到剪贴板"""  
-        output_text = self.output_text.get("1.0", tk.END).strip()  
+        # 复制完整结果，而不只是当前显示的行  
+        output_text = self.output_view.get_text().strip()  
         if output_text:  
-            pyperclip.copy(output_text)  
+            self.write_clipboard(output_text)  
             self.status_var.set("结果已复制到剪贴板")  
         else:  
             self.status_var.set("没有可复制的内容")  
     
+    def write_clipboard(self, text):  
+        """把文本复制到剪贴板；监视剪贴板时不会把它当作新数据再处理"""  
+        import pyperclip  # 用于复制到剪贴板  
+        pyperclip.copy(text)  
+        self.clipboard_watcher.ignore(text)  
+    
+    def toggle_clipboard_watch(self):  
+        """开始或停止监视剪贴板"""  
+        if self.watch_var.get():  
+            self.clipboard_watcher.start()  
+            self.status_var.set("正在监视剪贴板：复制含有单号的内容后自动处理")  
+        else:  
+            self.clipboard_watcher.stop()  
+            self.status_var.set("已停止监视剪贴板")  
+    
+    def on_clipboard_changed(self, text):  
+        """剪贴板中出现了新的单号数据，按所选格式处理"""  
+        labels = {label: fmt for fmt, label in formatting.FORMAT_LABELS.items()}  
+        self.show_formatted(labels.get(self.watch_format_var.get(), "organization"), text=text,  
+                            copy=self.watch_copy_var.get())  
+    
+    def copy_chunk(self):  
+        """复制当前段（高亮行或首个可见行所在的段）到剪贴板，可配合"下一段"逐段复制"""  
+        rows = self.output_view.rows  
+        if not len(rows):  
+            self.status_var.set("没有可复制的内容")  
+            return  
+        chunk = self.output_view.current_chunk()  
+        if chunk < 0:  
+            self.status_var.set("只有批量格式的结果可以按段复制")  
+            return  
+        self.write_clipboard(rows.chunk_text(chunk))  
+        key, _, start, stop = rows.chunks[chunk]  
+        self.status_var.set(f"已复制第 {chunk + 1}/{len(rows.chunks)} 段"  
+                            f"（{formatting.CLASS_LABELS[key]} {stop - start} 个）到剪贴板")  
+    
+    def export_result(self):  
+        """把完整结果逐行写入 txt/csv/tsv/xlsx 文件，不经过剪贴板"""  
+        import export  # 用到 zipfile 等模块，第一次导出时才导入  
+        
+        rows = self.output_view.rows  
+        if not len(rows):  
+            self.status_var.set("没有可导出的内容")  
+            return  
+        path = filedialog.asksaveasfilename(  
+            title="导出结果",  
+            defaultextension=".txt",  
+            filetypes=export.EXPORT_TYPES,  
+        )  
+        if not path:  
+            return  
+        
+        self.cancel_task(quiet=True)  
+        # 表格按行计算进度（表头加最长的一列），文本格式只显示阶段  
+        total = max(len(items) for _, items in rows.columns) + 1  
+        table = export.export_kind(path) != "txt"  
+        
+        def job(task):  
+            def progress(stage, pos):  
+                task.check()  
+                task.report(stage, pos / total if table else None)  
+            export.export_columns(path, rows.fmt, rows.columns, progress, rows.max_items, rows.max_bytes,  
+                                  rows.alignment)  
+        
+        self.start_export(job, lambda result: f"结果已导出到 {path}")  
+    
+    def export_chunks(self):  
+        """把批量格式的结果每段导出为一个文本文件"""  
+        import export  
+        
+        rows = self.output_view.rows  
+        if not getattr(rows, "chunks", None):  
+            self.status_var.set("只有批量格式的结果可以按段导出")  
+            return  
+        path = filedialog.asksaveasfilename(  
+            title="导出各段（文件名后自动加上类别和段号）",  
+            defaultextension=".txt",  
+            filetypes=[("文本文件", "*.txt")],  
+        )  
+        if not path:  
+            return  
+        
+        self.cancel_task(quiet=True)  
+        total = len(rows.chunks)  
+        
+        def job(task):  
+            def progress(stage, pos):  
+                task.check()  
+                task.report(stage, pos / total)  
+            return export.export_chunks(path, rows.fmt, rows.columns, rows.max_items, rows.max_bytes, progress)  
+        
+        self.start_export(job, lambda paths: f"已导出 {len(paths)} 段: {paths[0]} 至 {os.path.basename(paths[-1])}")  
+    
+    def start_export(self, job, done_message):  
+        """在后台执行导出，完成后在状态栏显示 done_message(结果)"""  
+        task = BackgroundTask(  
+            self.root,  
+            job,  
+            on_done=lambda result: self.on_export_done(done_message(result)),  
+            on_progress=self.show_progress,  
+            on_cancel=lambda: self.on_task_cancelled(task),  
+            on_error=self.on_task_error,  
+        )  
+        self.task = task  
+        self.cancel_button.config(state=tk.NORMAL)  
+        self.status_var.set("正在导出结果...")  
+        task.start()  
+    
+    def on_export_done(self, message):  
+        """导出完成"""  
+        self.task = None  
+        self.cancel_button.config(state=tk.DISABLED)  
+        self.status_var.set(message)  
+    
+    def open_job_list(self):  
+        """打开任务列表窗口"""  
+        if self.job_window is None:  
+            self.job_window = jobs.JobListWindow(self.root, self.job_queue, self.add_job_files, self.add_job_input,  
+                                                 self.show_job, self.export_jobs, self.write_clipboard, STAGE_LABELS)  
+        self.job_window.present()  
+    
+    def add_job_files(self, fmt):  
+        """选择若干文件，每个文件加入一个任务"""  
+        paths = filedialog.askopenfilenames(  
+            title="添加到任务列表",  
+            filetypes=[("文本、CSV或压缩文件", "*.txt *.csv *.tsv *.gz *.bz2 *.zip"), ("所有文件", "*.*")],  
+            parent=self.job_window.window if self.job_window else None,  
+        )  
+        for path in paths:  
+            self.queue_job(fmt, path=path)  
+    
+    def add_job_input(self, fmt):  
+        """把输入框的内容（或导入的文件）加入一个任务"""  
+        if self.input_file is not None:  
+            self.queue_job(fmt, path=self.input_file)  
+            return  
+        text = self.input_text.get("1.0", tk.END)  
+        if not text.strip():  
+            self.status_var.set("输入框为空，没有可加入任务列表的内容")  
+            return  
+        self.queue_job(fmt, text=text)  
+    
+    def queue_job(self, fmt, text=None, path=None):  
+        """  
+        按界面上当前的处理选项加入一个任务  
+        
+        参数:  
+            text: 粘贴的文本；path: 文件路径（二选一）  
+        
+        返回:  
+            jobs.Job，设置无效或文件无法读取时返回 None  
+        """  
+        settings = self.read_settings(fmt)  
+        if settings is None:  
+            return None  
+        cache = self.extraction_cache  
+        if path is not None:  
+            try:  
+                size = os.path.getsize(path)  
+            except OSError as e:  
+                self.status_var.set(f"无法读取文件: {e}")  
+                return None  
+            name = os.path.basename(path)  
+            extract = lambda progress: cache.extract_file(path, progress)  
+        else:  
+            size = len(text)  
+            # 以第一行非空内容作为名称，便于区分多段粘贴  
+            first_line = next(line.strip() for line in text.splitlines() if line.strip())  
+            name = f"粘贴: {first_line[:30]}"  
+            extract = self.text_extractor(text, settings["table"], settings["table_columns"])  
+        recorder = instrumentation.StageRecorder(enabled=False)  
+        return self.job_queue.add(name, fmt, lambda task: self.format_job(  
+            task, extract, size, settings["output_option"], fmt, recorder, None,  
+            settings["max_items"], settings["max_bytes"], settings["dedupe"], settings["history"]))  
+    
+    def show_job(self, job):  
+        """在结果区域显示任务的结果，之后可用复制、导出等按钮"""  
+        self.cancel_task(quiet=True)  
+        data, rows = job.result[:2]  
+        self.update_stats(data)  
+        self.output_view.set_rows(rows)  
+        self.status_var.set(f"{job.name}: {job.message()}")  
+    
+    def export_jobs(self, job_list):  
+        """把各任务的结果分别导出为文本文件（与结果区域相同的格式）"""  
+        import export  
+        
+        folder = filedialog.askdirectory(title="导出全部任务的结果到文件夹",  
+                                         parent=self.job_window.window if self.job_window else None)  
+        if not folder:  
+            return  
+        
+        self.cancel_task(quiet=True)  
+        # 任务名称相同时在文件名后加上任务编号  
+        stems = [job.file_stem() for job in job_list]  
+        paths = [os.path.join(folder, (stem if stems.count(stem) == 1 else f"{stem}_{job.id}") + ".txt")  
+                 for stem, job in zip(stems, job_list)]  
+        
+        def job(task):  
+            for i, (item, path) in enumerate(zip(job_list, paths)):  
+                task.check()  
+                task.report("export", i / len(job_list))  
+                rows = item.rows  
+                export.export_columns(path, rows.fmt, rows.columns, task.check, rows.max_items, rows.max_bytes,  
+                                      rows.alignment)  
+            return paths  
+        
+        self.start_export(job, lambda result: f"已导出 {len(result)} 个任务的结果到 {folder}")  
+    
+    def clear_history(self):  
+        """清除以前处理过的单号记录"""  
+        if not messagebox.askyesno("清除记录", "清除所有以前处理过的单号记录？此操作不能撤销。"):  
+            return  
+        try:  
+            with dedup.SeenIndex() as index:  
+                index.clear()  
+        except Exception as e:  
+            self.status_var.set(f"清除记录失败: {e}")  
+            return  
+        self.status_var.set("已清除以前处理过的单号记录")  
+    
     def clear_all(self):  
         """清空输入和输出文本区域"""  
+        self.cancel_task(quiet=True)  
+        self.input_file = None  
+        self.input_text.config(state=tk.NORMAL)  
         self.input_text.delete("1.0", tk.END)  
-        self.output_text.delete("1.0", tk.END)  
+        self.input_b_text.delete("1.0", tk.END)  
+        self.output_view.clear()  
         self.status_var.set("已清空")  
         self.stats_var.set("SLS单号: 0 | 订单编号: 0 | 未知单号: 0")  
 
+def report_startup_time(root, created):  
+    """输出从进程启动到窗口首次显示的各阶段耗时"""  
+    root.update_idletasks()  
+    shown = time.perf_counter()  
+    print(f"启动耗时: 导入模块 {(STARTUP_IMPORTED - STARTUP_BEGIN) * 1000:.0f} ms, "  
+          f"创建窗口 {(created - STARTUP_IMPORTED) * 1000:.0f} ms, "  
+          f"首次显示 {(shown - STARTUP_BEGIN) * 1000:.0f} ms", file=sys.stderr)  
+
 def main():  
-    root = tk.Tk()  
+    # 带命令行参数的情况（包括打包后并行提取的子进程）已在模块开头转到 cli  
+    try:  
+        # 安装了 tkinterdnd2 时支持拖放文件  
+        from tkinterdnd2 import TkinterDnD  
+        root = TkinterDnD.Tk()  
+    except ImportError:  
+        root = tk.Tk()  
     app = OrderProcessorApp(root)  
+    if os.environ.get(STARTUP_TIME_ENV):  
+        created = time.perf_counter()  
+        # 事件循环第一次空闲时窗口已经绘制完成  
+        root.after_idle(lambda: report_startup_time(root, created))  
     root.mainloop()  
 
 if __name__ == "__main__":  
-    main()
\ No newline at end of file
+    main()  
\ No newline at end of file
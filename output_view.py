@@ -0,0 +1,207 @@
+"""
+虚拟化结果区域
+
+结果按行编号保存（见 formatting.ResultRows），文本框中只放当前可见的几十行，
+滚动时按行号重新取行显示。几百万行的结果也能立即显示、流畅滚动，
+跳转到指定行和查找不需要把完整结果插入 Tk 文本框。
+批量格式的结果分段时可逐段跳转，当前段即高亮行（没有高亮时为首个可见行）所在的段。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualOutputView(ttk.Frame):
+    """只渲染可见行的只读结果区域，带跳转到行和查找"""
+
+    def __init__(self, master, height=15, **kwargs):
+        super().__init__(master, **kwargs)
+        self.rows = []
+        self.top = 0
+        self.highlight = None
+        self._height = height
+
+        # 工具栏：跳转、查找和行号信息
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(toolbar, text="跳到行:").pack(side=tk.LEFT)
+        self.jump_var = tk.StringVar()
+        jump_entry = ttk.Entry(toolbar, textvariable=self.jump_var, width=10)
+        jump_entry.pack(side=tk.LEFT, padx=5)
+        jump_entry.bind("<Return>", lambda event: self.jump())
+        ttk.Button(toolbar, text="跳转", command=self.jump).pack(side=tk.LEFT)
+
+        ttk.Label(toolbar, text="查找:").pack(side=tk.LEFT, padx=(15, 0))
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=24)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda event: self.search_next())
+        ttk.Button(toolbar, text="查找下一个", command=self.search_next).pack(side=tk.LEFT)
+
+        ttk.Button(toolbar, text="上一段", command=lambda: self.jump_chunk(-1)).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Button(toolbar, text="下一段", command=lambda: self.jump_chunk(1)).pack(side=tk.LEFT, padx=5)
+
+        self.info_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=self.info_var).pack(side=tk.RIGHT)
+
+        # 文本框只显示可见行，纵向滚动条按行号映射
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+
+        self.yscroll = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        xscroll = ttk.Scrollbar(body, orient=tk.HORIZONTAL)
+        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.text = tk.Text(body, height=height, wrap=tk.NONE, state=tk.DISABLED,
+                            xscrollcommand=xscroll.set)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        xscroll.config(command=self.text.xview)
+        self.text.tag_configure("highlight", background="#fff3a0")
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self._scroll_units(-3))
+        self.text.bind("<Button-5>", lambda event: self._scroll_units(3))
+        self.text.bind("<Up>", lambda event: self._scroll_units(-1))
+        self.text.bind("<Down>", lambda event: self._scroll_units(1))
+        self.text.bind("<Prior>", lambda event: self._scroll_units(-self.visible_count()))
+        self.text.bind("<Next>", lambda event: self._scroll_units(self.visible_count()))
+        self.text.bind("<Control-Home>", lambda event: self._scroll_units(-len(self.rows)))
+        self.text.bind("<Control-End>", lambda event: self._scroll_units(len(self.rows)))
+        # 文本框只读，点击后获得焦点以便响应按键
+        self.text.bind("<Button-1>", lambda event: self.text.focus_set())
+
+        self.render()
+
+    def set_rows(self, rows):
+        """显示新的结果，rows 为支持 len() 和按下标取行的序列"""
+        self.rows = rows
+        self.top = 0
+        self.highlight = None
+        self.render()
+
+    def clear(self):
+        self.set_rows([])
+
+    def get_text(self):
+        """返回完整结果文本（不只是可见部分）"""
+        if hasattr(self.rows, "text"):
+            return self.rows.text()
+        return "\n".join(self.rows)
+
+    def visible_count(self):
+        """文本框能显示的行数"""
+        height = self.text.winfo_height()
+        linespace = self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")
+        if height <= 1 or not linespace:
+            # 尚未显示出来时按创建时的高度估算
+            return self._height
+        return max(height // int(linespace), 1)
+
+    def scroll_to(self, row):
+        """把第 row 行（从0开始）滚动到可见区域顶部，超出范围时自动收敛"""
+        last_top = max(len(self.rows) - self.visible_count(), 0)
+        self.top = min(max(int(row), 0), last_top)
+        self.render()
+
+    def render(self):
+        """重新填充可见行并同步滚动条和行号信息"""
+        total = len(self.rows)
+        count = self.visible_count()
+        if total:
+            self.top = min(self.top, max(total - count, 0))
+        else:
+            self.top = 0
+        stop = min(self.top + count, total)
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(self.rows[i] for i in range(self.top, stop)))
+        if self.highlight is not None and self.top <= self.highlight < stop:
+            line = self.highlight - self.top + 1
+            self.text.tag_add("highlight", f"{line}.0", f"{line}.end")
+        self.text.config(state=tk.DISABLED)
+
+        if total:
+            self.yscroll.set(self.top / total, stop / total)
+            info = f"第 {self.top + 1}-{stop} 行，共 {total} 行"
+            chunk = self.current_chunk()
+            if chunk >= 0 and len(self.rows.chunks) > 1:
+                info = f"第 {chunk + 1}/{len(self.rows.chunks)} 段 | " + info
+            self.info_var.set(info)
+        else:
+            self.yscroll.set(0, 1)
+            self.info_var.set("")
+
+    def yview(self, *args):
+        """纵向滚动条回调，参数同 Text.yview"""
+        if not self.rows:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_count()
+            self._scroll_units(amount)
+
+    def current_row(self):
+        """当前行：高亮行，没有高亮时为首个可见行"""
+        return self.top if self.highlight is None else self.highlight
+
+    def current_chunk(self):
+        """当前行所在的段，结果没有分段时返回 -1"""
+        if not self.rows or not hasattr(self.rows, "chunk_index"):
+            return -1
+        return self.rows.chunk_index(self.current_row())
+
+    def jump_chunk(self, step):
+        """跳到前/后 step 段并高亮其第一行"""
+        chunk = self.current_chunk()
+        if chunk < 0:
+            self.bell()
+            return
+        chunk = min(max(chunk + step, 0), len(self.rows.chunks) - 1)
+        self.highlight = self.rows.chunk_first_row(chunk)
+        self.scroll_to(self.highlight)
+
+    def jump(self):
+        """跳到输入框中的行号（从1开始）"""
+        try:
+            row = int(self.jump_var.get().strip()) - 1
+        except ValueError:
+            self.bell()
+            return
+        if not self.rows:
+            return
+        self.highlight = min(max(row, 0), len(self.rows) - 1)
+        self.scroll_to(self.highlight)
+
+    def search_next(self):
+        """从当前高亮行之后查找下一个包含查找内容的行"""
+        query = self.search_var.get()
+        if not query or not self.rows:
+            return
+        start = self.top if self.highlight is None else self.highlight + 1
+        if hasattr(self.rows, "find"):
+            row = self.rows.find(query, start)
+        else:
+            total = len(self.rows)
+            row = next((i % total for i in range(start, start + total)
+                        if query in self.rows[i % total]), -1)
+        if row < 0:
+            self.info_var.set(f"未找到 \"{query}\"")
+            self.bell()
+            return
+        self.highlight = row
+        self.scroll_to(row - self.visible_count() // 2)
+
+    def _scroll_units(self, amount):
+        self.scroll_to(self.top + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows 每格 delta 为 120，macOS 为 1
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_units(-3 * step)
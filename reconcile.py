@@ -0,0 +1,57 @@
+"""
+两个单号列表的对比
+
+从列表A、B（例如已发货与已查询）中按相同规则提取单号后，用哈希表对比，
+线性时间得到仅A有、仅B有和两边都有的单号，代替在 Excel 中逐行 VLOOKUP。
+各类单号合在一起比较，同一个字符串在一边被识别为订单编号、在另一边
+（因为同一行后面没有字母）被识别为未知单号时也算作相同。
+
+结果的三个部分在 formatting.CLASS_LABELS 中有对应的名称，
+可以像各类单号一样交给 formatting / export 按列或分组输出。
+"""
+from itertools import chain
+
+import formatting
+from idlist import IdList
+
+# 对比结果的各部分，顺序即输出列的顺序
+PARTS = ("a_only", "b_only", "both")
+
+
+def reconcile(a_items, b_items):
+    """
+    对比两个单号序列
+
+    返回:
+        {"a_only": IdList, "b_only": IdList, "both": IdList}，各部分不含重复单号；
+        仅A有和两边都有按在A中第一次出现的顺序排列，仅B有按在B中第一次出现的顺序排列
+    """
+    # dict 既是哈希集合又保留第一次出现的顺序
+    a = dict.fromkeys(a_items)
+    b = dict.fromkeys(b_items)
+    return {
+        "a_only": IdList.pack([item for item in a if item not in b]),
+        "b_only": IdList.pack([item for item in b if item not in a]),
+        "both": IdList.pack([item for item in a if item in b]),
+    }
+
+
+def reconcile_data(a_data, b_data, output_option="auto"):
+    """
+    按输出选项过滤两边的提取结果后对比
+
+    参数:
+        a_data, b_data: extractor.extract_order_numbers 的返回值
+        output_option: 同 formatting.filter_data，例如 "sls_only" 时只对比SLS单号
+    """
+    return reconcile(_ids(a_data, output_option), _ids(b_data, output_option))
+
+
+def _ids(data, output_option):
+    filtered = formatting.filter_data(data, output_option)
+    return chain.from_iterable(filtered[key] for key in formatting.CLASSES)
+
+
+def describe_counts(result):
+    """状态栏中的数量说明，如 ["仅A有 3 个", "仅B有 0 个", "两边都有 120 个"]"""
+    return [f"{formatting.CLASS_LABELS[part]} {len(result[part])} 个" for part in PARTS]
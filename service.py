@@ -0,0 +1,462 @@
+"""
+本地服务模式
+
+不打开窗口，在本机启动一个HTTP服务，其他脚本通过 POST 请求调用与界面相同的
+提取、过滤和格式化逻辑，不必各自复制一份正则。例如:
+
+    python main.py --serve 8765
+
+    curl --data-binary @export.txt "http://127.0.0.1:8765/extract?format=batch_query"
+    curl -H "Content-Type: application/json" -d '{"path": "today.txt", "ids": true}' http://127.0.0.1:8765/extract
+
+请求体为JSON时支持以下字段（请求体为纯文本时，除 text/path 外的字段放在查询参数中）:
+    text 或 path   要处理的文本，或本机上的文件路径（服务监听的不是本机地址时不接受 path）
+    mode           输出选项 auto / sls_only / order_only（默认 auto）
+    format         输出格式 organization / batch_query / batch_data（默认 organization），
+                   为 null（查询参数为 none）时不生成格式化文本
+    max_ids, max_bytes  批量格式的分段上限
+    dedup          是否去除重复单号
+    ids            是否同时返回各类单号的列表
+
+返回的JSON依次包含 counts（提取到的各类单号数量）、count 和 desc（实际输出的数量和描述，
+同界面状态栏）、duplicates（dedup 时）、ids（可选）和 output（格式化文本），
+以分块传输编码边生成边发送，大结果不会先在内存中拼成一个字符串。
+
+同时到达的多个小请求（文本不超过 BATCH_CHARS）会在 BATCH_DELAY 内合并，
+由一次 extractor.extract_shards 调用提取，每个请求的文本作为一个分片，
+结果与分别提取完全一致；合并后达到并行阈值时自动多进程并行。
+大文本和文件路径请求单独提取，并共用一个 ExtractionCache。
+"""
+import asyncio
+import ipaddress
+import json
+import sys
+from urllib.parse import parse_qsl, urlsplit
+
+import dedup
+import extractor
+import formatting
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 不超过这个字符数的文本请求参与合并
+BATCH_CHARS = 256 * 1024
+# 合并等待的最长时间（秒）
+BATCH_DELAY = 0.005
+# 一批合并的文本达到这个字符数时立即提取，不再等待
+BATCH_LIMIT = 8 * 1024 * 1024
+
+# 请求体的大小上限（字节）
+MAX_BODY = 512 * 1024 * 1024
+
+# 结果在工作线程中每次生成约这么多字符；每发送这么多字符等待一次写缓冲区排空
+_DRAIN_CHARS = 1 << 20
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """请求有误，status 为返回的HTTP状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _Batcher:
+    """把同时到达的小文本合并成一次提取"""
+
+    def __init__(self):
+        self._pending = []
+        self._size = 0
+        self._timer = None
+
+    async def extract(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._size += len(text)
+        if self._size >= BATCH_LIMIT:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(BATCH_DELAY, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._size = self._pending, [], 0
+        if not batch:
+            return
+        job = asyncio.get_running_loop().run_in_executor(None, extract_batch, [text for text, _ in batch])
+
+        def deliver(job):
+            for i, (_, future) in enumerate(batch):
+                if future.cancelled():
+                    continue
+                if job.exception() is not None:
+                    future.set_exception(job.exception())
+                else:
+                    future.set_result(job.result()[i])
+
+        job.add_done_callback(deliver)
+
+
+def extract_batch(texts):
+    """
+    一次提取多段互不相关的文本，返回与 texts 对应的提取结果列表
+
+    各段作为分片交给 extractor.extract_shards，结果与分别调用 extract_order_numbers 一致。
+    """
+    bounds = []
+    start = 0
+    for text in texts:
+        bounds.append((start, start + len(text)))
+        start += len(text)
+    shards = extractor.extract_shards("".join(texts), bounds)
+    return [{key: shard[key] for key in formatting.CLASSES} for shard in shards]
+
+
+class Service:
+    """
+    提取服务
+
+    与界面共用 extractor / formatting / dedup 的全部规则，只负责解析请求和发送结果。
+    allow_path 为假时拒绝 path 请求（服务监听的不是本机地址时，不能让其他机器读取本机文件）。
+    """
+
+    def __init__(self, allow_path=True):
+        self.allow_path = allow_path
+        self.cache = extractor.ExtractionCache()
+        self.batcher = _Batcher()
+
+    async def handle(self, reader, writer):
+        """处理一个连接上的一个请求，发送完结果即关闭连接"""
+        try:
+            try:
+                request = await self._read_request(reader, writer)
+                data = await self._extract(request)
+                loop = asyncio.get_running_loop()
+                head, columns = await loop.run_in_executor(None, _prepare, request, data)
+            except RequestError as e:
+                await self._send_error(writer, e.status, str(e))
+                return
+            except OSError as e:
+                await self._send_error(writer, 400, f"读取文件时出错: {e}")
+                return
+            except Exception as e:
+                await self._send_error(writer, 500, f"处理出错: {e}")
+                return
+            await self._send_result(writer, request, head, columns)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        """解析请求行、请求头和请求体，返回请求参数字典"""
+        line = (await reader.readline()).decode("latin-1").split()
+        if len(line) != 3:
+            raise RequestError("无效的请求")
+        method, target, _ = line
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        if url.path != "/extract":
+            raise RequestError(f"未知的路径: {url.path}", 404)
+        if method != "POST":
+            raise RequestError("只支持 POST 请求", 405)
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await _read_chunked(reader)
+        else:
+            try:
+                length = int(headers.get("content-length", "0"))
+            except ValueError:
+                raise RequestError("无效的 Content-Length") from None
+            if length > MAX_BODY:
+                raise RequestError("请求体过大", 413)
+            body = await reader.readexactly(length)
+
+        request = dict(parse_qsl(url.query))
+        if headers.get("content-type", "").split(";")[0].strip() == "application/json":
+            try:
+                params = json.loads(body)
+            except ValueError as e:
+                raise RequestError(f"无效的JSON: {e}") from None
+            if not isinstance(params, dict):
+                raise RequestError("JSON请求体应为对象")
+            request.update(params)
+        else:
+            request["text"] = body.decode("utf-8", errors="replace")
+        return _normalize(request)
+
+    async def _extract(self, request):
+        loop = asyncio.get_running_loop()
+        if request["path"] is not None:
+            if not self.allow_path:
+                raise RequestError("服务监听的不是本机地址，不接受 path 请求", 403)
+            return await loop.run_in_executor(None, self.cache.extract_file, request["path"])
+        text = request["text"]
+        if len(text) <= BATCH_CHARS:
+            return await self.batcher.extract(text)
+        return await loop.run_in_executor(None, self.cache.extract, text)
+
+    async def _send_result(self, writer, request, head, columns):
+        """以JSON分块发送结果，各段在工作线程中生成，大结果的格式化不阻塞其他请求"""
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: application/json; charset=utf-8\r\n"
+                     b"Transfer-Encoding: chunked\r\n"
+                     b"Connection: close\r\n\r\n")
+        stream = _ChunkedWriter(writer)
+        loop = asyncio.get_running_loop()
+        pieces = _iter_body(request, head, columns)
+        while True:
+            text = await loop.run_in_executor(None, _take, pieces, _DRAIN_CHARS)
+            if not text:
+                break
+            await stream.write(text)
+        await stream.close()
+
+    @staticmethod
+    async def _send_error(writer, status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                     "Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     "Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+
+async def _read_chunked(reader):
+    """读取分块传输编码的请求体"""
+    parts = []
+    size = 0
+    while True:
+        try:
+            length = int((await reader.readline()).split(b";")[0], 16)
+        except ValueError:
+            raise RequestError("无效的分块长度") from None
+        if length == 0:
+            # 跳过可能存在的尾部字段
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(parts)
+        size += length
+        if size > MAX_BODY:
+            raise RequestError("请求体过大", 413)
+        parts.append(await reader.readexactly(length))
+        await reader.readline()
+
+
+def _prepare(request, data):
+    """
+    按与界面相同的规则过滤、去重（在工作线程中执行）
+
+    返回:
+        (head, columns)，head 为结果JSON开头的统计字段，columns 同 formatting.iter_format
+    """
+    filtered = formatting.filter_data(data, request["mode"])
+    head = {"counts": {key: len(data[key]) for key in formatting.CLASSES}}
+    if request["dedup"]:
+        before = sum(len(filtered[key]) for key in formatting.CLASSES)
+        filtered = dedup.dedupe_data(filtered)
+        head["duplicates"] = before - sum(len(filtered[key]) for key in formatting.CLASSES)
+    keys = [key for key in formatting.CLASSES if filtered[key]]
+    head["count"] = sum(len(filtered[key]) for key in keys)
+    head["desc"] = formatting.describe(request["format"] or "organization", keys)
+    return head, [(key, filtered[key]) for key in keys]
+
+
+class _ChunkedWriter:
+    """以分块传输编码发送文本，攒够 _DRAIN_CHARS 再等待写缓冲区排空"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._unsent = 0
+
+    async def write(self, text):
+        if not text:
+            return
+        data = text.encode("utf-8")
+        self.writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self._unsent += len(text)
+        if self._unsent >= _DRAIN_CHARS:
+            self._unsent = 0
+            await self.writer.drain()
+
+    async def close(self):
+        self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+
+def _iter_body(request, head, columns):
+    """结果JSON的各段文本"""
+    # 去掉结尾的 "}"，其余字段逐段接在后面
+    yield json.dumps(head, ensure_ascii=False)[:-1]
+    if request["ids"]:
+        yield ', "ids": {'
+        items = dict(columns)
+        for i, key in enumerate(formatting.CLASSES):
+            yield f'{", " if i else ""}"{key}": ['
+            yield from _iter_joined(items.get(key, ()), ", ", json.dumps)
+            yield "]"
+        yield "}"
+    if request["format"] is not None:
+        yield ', "output": "'
+        for piece in formatting.iter_format(request["format"], columns, request["max_ids"], request["max_bytes"]):
+            yield _json_string(piece)
+        yield '"'
+    yield "}"
+
+
+def _take(pieces, limit):
+    """从 pieces 中取出至少 limit 个字符（不足时取完）连接返回，取完后返回空字符串"""
+    taken = []
+    size = 0
+    for piece in pieces:
+        taken.append(piece)
+        size += len(piece)
+        if size >= limit:
+            break
+    return "".join(taken)
+
+
+def _iter_joined(items, sep, encode):
+    """逐块产出 sep.join(encode(item) for item in items)"""
+    block = []
+    first = True
+    for item in items:
+        block.append(encode(item))
+        if len(block) == 4096:
+            yield ("" if first else sep) + sep.join(block)
+            block = []
+            first = False
+    if block:
+        yield ("" if first else sep) + sep.join(block)
+
+
+def _json_string(text):
+    """text 编码为JSON字符串后去掉两侧引号，可以逐段拼接"""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def _normalize(request):
+    """检查请求参数并填入默认值"""
+    text = request.get("text")
+    path = request.get("path")
+    if (text is None) == (path is None):
+        raise RequestError("需要提供 text 或 path 中的一个")
+    if text is not None and not isinstance(text, str):
+        raise RequestError("text 应为字符串")
+    if path is not None and not isinstance(path, str):
+        raise RequestError("path 应为字符串")
+
+    mode = request.get("mode", "auto")
+    if mode not in formatting.OUTPUT_OPTIONS:
+        raise RequestError(f"未知的 mode: {mode}")
+    fmt = request.get("format", "organization")
+    if fmt == "none":
+        fmt = None
+    if fmt is not None and fmt not in formatting.FORMATS:
+        raise RequestError(f"未知的 format: {fmt}")
+
+    limits = {}
+    for name in ("max_ids", "max_bytes"):
+        value = request.get(name)
+        if value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise RequestError(f"{name} 应为正整数") from None
+            if value < 1:
+                raise RequestError(f"{name} 应为正整数")
+        limits[name] = value
+    if fmt == "organization" and (limits["max_ids"] or limits["max_bytes"]):
+        raise RequestError("max_ids/max_bytes 只适用于批量格式")
+
+    return {
+        "text": text,
+        "path": path,
+        "mode": mode,
+        "format": fmt,
+        "dedup": _flag(request.get("dedup")),
+        "ids": _flag(request.get("ids")),
+        **limits,
+    }
+
+
+def _flag(value):
+    """JSON中的布尔值，或查询参数中的 1/true/yes"""
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def parse_address(address):
+    """解析 [HOST:]PORT，返回 (host, port)"""
+    host, _, port = address.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ValueError(f"无效的端口: {address}") from None
+    return host or DEFAULT_HOST, port
+
+
+def is_loopback(host):
+    """host 是否只能从本机访问（localhost 或回环地址）"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+    """
+    启动服务并一直运行
+
+    参数:
+        ready: 可选回调 ready(server)，开始监听后调用（例如取得实际端口）
+    """
+    service = Service(allow_path=is_loopback(host))
+    server = await asyncio.start_server(service.handle, host, port)
+    if ready is not None:
+        ready(server)
+    async with server:
+        await server.serve_forever()
+
+
+def run(address):
+    """命令行入口：在 address 上启动服务，直到按 Ctrl+C，返回退出码"""
+    try:
+        host, port = parse_address(address)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    def ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"提取服务已启动: http://{host}:{port}/extract （按 Ctrl+C 停止）", file=sys.stderr)
+        if not is_loopback(host):
+            print("监听的不是本机地址，不接受 path 请求", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"无法启动服务: {e}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,227 @@
+"""
+表格粘贴的按列提取
+
+从 Excel / 在线表格复制的内容是制表符分隔的文本（TSV），单号通常在固定的几列中。
+按列提取时只判断这些列的单元格，备注等长文本列不再产生误识别的未知单号，也不必整段扫描。
+
+    is_table()        文本是否为表格（抽样的行中绝大多数含有制表符）
+    guess_columns()   自动识别单号列：抽样的单元格中多数恰好是一个单号的列
+    parse_columns()   解析操作员填写的列，如 "A,C"、"1 3"、"B-D"
+    extract_table()   按列提取，结果中同时记录每个单号所在的行
+    align()           过滤、去重后的结果与原表格行的对应关系，供格式整理逐行输出
+
+单元格恰好是一个单号时用 extractor.classify_id 直接判断类别，
+其他非空单元格单独交给 extractor.extract_order_numbers，结果与逐个单元格提取一致。
+"""
+import re
+from array import array
+from itertools import islice
+
+import extractor
+import formatting
+from idlist import IdList
+
+# 判断是否为表格、识别单号列时抽样的行数
+SAMPLE_ROWS = 1000
+
+# 抽样的非空行中含有制表符的比例达到该值才视为表格
+TABLE_MIN_SHARE = 0.9
+
+# 一列的非空单元格中恰好是一个单号的比例达到该值才视为单号列
+ID_COLUMN_MIN_SHARE = 0.5
+
+# 每处理这么多行回调一次进度
+_PROGRESS_ROWS = 4096
+
+
+def is_table(text):
+    """抽样的前 SAMPLE_ROWS 行中至少有两个非空行，且绝大多数含有制表符"""
+    lines = [line for line in _sample(text) if line.strip()]
+    if len(lines) < 2:
+        return False
+    return sum(1 for line in lines if "\t" in line) >= TABLE_MIN_SHARE * len(lines)
+
+
+def guess_columns(text):
+    """
+    自动识别单号列
+
+    返回:
+        单号列的下标列表（从0开始），按列的顺序排列；没有单号列时为空列表
+    """
+    rows = [line.split("\t") for line in _sample(text)]
+    width = max((len(cells) for cells in rows), default=0)
+    columns = []
+    for c in range(width):
+        filled = ids = 0
+        for cells in rows:
+            cell = cells[c].strip() if c < len(cells) else ""
+            if cell:
+                filled += 1
+                if extractor.classify_id(cell) is not None:
+                    ids += 1
+        if ids and ids >= ID_COLUMN_MIN_SHARE * filled:
+            columns.append(c)
+    return columns
+
+
+def parse_columns(spec):
+    """
+    解析填写的单号列：Excel 列名或从1开始的列号，用逗号或空格分隔，可以写范围
+
+    例如 "A,C"、"1 3"、"B-D"。未填写时返回 None（自动识别），填写有误时抛出 ValueError。
+    """
+    tokens = [token for token in re.split(r"[,，\s]+", spec.strip()) if token]
+    if not tokens:
+        return None
+    columns = []
+    for token in tokens:
+        first, sep, last = token.partition("-")
+        lo = _column_index(first, spec)
+        hi = _column_index(last, spec) if sep else lo
+        if hi < lo:
+            raise ValueError(f"单号列的范围无效: {token}")
+        for c in range(lo, hi + 1):
+            if c not in columns:
+                columns.append(c)
+    return sorted(columns)
+
+
+def column_name(index):
+    """下标转为 Excel 列名，0 -> A，26 -> AA"""
+    name = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        name = chr(ord("A") + rest) + name
+    return name
+
+
+def extract_table(text, columns=None, progress=None):
+    """
+    按列提取表格中的单号
+
+    参数:
+        columns: 单号列的下标列表，None 表示自动识别
+        progress: 可选的进度回调 progress("table", pos)，pos 为当前处理到的字符位置；
+            回调中抛出异常即可中止
+
+    返回:
+        不是表格或识别不到单号列时返回 None（应按普通文本提取）；否则返回
+        {"sls": IdList, "order": IdList, "unknown": IdList, "table": {...}}，各类单号按行的顺序排列，
+        "table" 为 {"columns": 单号列, "header": 首行是否为表头, "count": 行数,
+        "rows": {类别: 各单号所在的行号(array)}}
+    """
+    if not is_table(text):
+        return None
+    if columns is None:
+        columns = guess_columns(text)
+        if not columns:
+            return None
+    columns = sorted(columns)
+
+    lines = text.split("\n")
+    # 去掉末尾的空行（输入框的内容总以换行结尾）
+    while lines and not lines[-1].strip():
+        lines.pop()
+    header = _has_header(lines, columns)
+
+    found = {key: [] for key in formatting.CLASSES}
+    rows = {key: array("I") for key in formatting.CLASSES}
+    classify = extractor.classify_id
+    pos = 0
+    for r, line in enumerate(lines):
+        if progress is not None and r % _PROGRESS_ROWS == 0:
+            progress("table", pos)
+        pos += len(line) + 1
+        if r == 0 and header:
+            continue
+        cells = line.split("\t")
+        for c in columns:
+            if c >= len(cells):
+                break
+            cell = cells[c].strip()
+            if not cell:
+                continue
+            key = classify(cell)
+            if key is not None:
+                found[key].append(cell)
+                rows[key].append(r)
+                continue
+            # 单元格中有多个单号或夹杂其他文字
+            data = extractor.extract_order_numbers(cell)
+            for key in formatting.CLASSES:
+                for item in data[key]:
+                    found[key].append(item)
+                    rows[key].append(r)
+
+    result = {key: IdList.pack(found[key]) for key in formatting.CLASSES}
+    result["table"] = {"columns": columns, "header": header, "count": len(lines), "rows": rows}
+    return result
+
+
+def align(data, filtered):
+    """
+    过滤、去重或跳过以前处理过的单号后，剩余单号与原表格行的对应关系
+
+    参数:
+        data: extract_table 的返回值
+        filtered: 由 data 过滤得到的各类单号，每类都是原序列的子序列（保持原顺序）
+
+    返回:
+        formatting.format_rows 的 alignment 参数
+        {"count": 行数, "header": 首行是否为表头, "rows": {类别: 各单号所在的行号}}
+    """
+    table = data["table"]
+    rows = {}
+    for key in formatting.CLASSES:
+        items = filtered[key]
+        if len(items) == len(data[key]):
+            rows[key] = table["rows"][key]
+            continue
+        # 去掉的单号与保留的单号互不相同（或是保留单号后面的重复），按顺序逐个匹配即可找到原来的位置
+        kept = array("I")
+        source = zip(data[key], table["rows"][key])
+        for item in items:
+            for original, row in source:
+                if original == item:
+                    kept.append(row)
+                    break
+        rows[key] = kept
+    return {"count": table["count"], "header": table["header"], "rows": rows}
+
+
+def describe(data):
+    """状态栏中的说明，如 "按表格第A、C列提取，首行为表头"，按普通文本提取时返回 None"""
+    table = data.get("table")
+    if table is None:
+        return None
+    names = "、".join(column_name(c) for c in table["columns"])
+    return f"按表格第{names}列提取" + ("，首行为表头" if table["header"] else "")
+
+
+def _sample(text):
+    return islice(text.split("\n", SAMPLE_ROWS), SAMPLE_ROWS)
+
+
+def _has_header(lines, columns):
+    """首行的单号列中有文字但没有任何单号时，首行是表头"""
+    if len(lines) < 2:
+        return False
+    cells = lines[0].split("\t")
+    first = [cells[c].strip() for c in columns if c < len(cells) and cells[c].strip()]
+    if not first:
+        return False
+    return not any(extractor.extract_order_numbers(cell)[key] for cell in first for key in formatting.CLASSES)
+
+
+def _column_index(token, spec):
+    token = token.strip().upper()
+    if token.isdigit() and int(token) >= 1:
+        return int(token) - 1
+    if token.isalpha() and token.isascii():
+        index = 0
+        for ch in token:
+            index = index * 26 + ord(ch) - ord("A") + 1
+        return index - 1
+    raise ValueError(f"无法识别的单号列: {spec}（应为列名如 A、C 或列号如 1、3）")
@@ -0,0 +1,31 @@
+"""
+命令行模式：写到标准输出的结果
+"""
+import io
+
+import pytest
+
+import cli
+
+TEXT = "MY1234567890123 240101ABCD1234 z\nSG1234567890123\n"
+
+
+@pytest.mark.parametrize("mode, fmt, expected", [
+    ("auto", "organization", "MY1234567890123\t240101ABCD1234\nSG1234567890123\t\n"),
+    ("sls_only", "batch_query", "MY1234567890123,SG1234567890123\n"),
+    ("order_only", "batch_data", "'240101ABCD1234'\n"),
+])
+def test_output_ends_with_newline(tmp_path, mode, fmt, expected):
+    path = tmp_path / "input.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    out = io.StringIO()
+    cli.process([str(path)], mode, fmt, out)
+    assert out.getvalue() == expected
+
+
+def test_no_output_writes_nothing(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("nothing here\n", encoding="utf-8")
+    out = io.StringIO()
+    assert cli.process([str(path)], "sls_only", "organization", out) == {"sls": 0, "order": 0, "unknown": 0}
+    assert out.getvalue() == ""
@@ -0,0 +1,113 @@
+"""
+去重和以前处理过的单号索引：索引放在临时目录的 SQLite 文件中
+"""
+import pytest
+
+import dedup
+
+
+def _data(sls=(), order=(), unknown=()):
+    return {"sls": list(sls), "order": list(order), "unknown": list(unknown)}
+
+
+def _lists(data):
+    return {key: list(data[key]) for key in ("sls", "order", "unknown")}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "seen.sqlite3")
+
+
+def test_dedupe_keeps_first_occurrence():
+    assert dedup.dedupe(["b", "a", "b", "c", "a"]) == ["b", "a", "c"]
+
+    # 分块处理时用 seen 跨块去重
+    seen = set()
+    assert dedup.dedupe(["a", "b", "a"], seen) == ["a", "b"]
+    assert dedup.dedupe(["b", "c", "c"], seen) == ["c"]
+    assert seen == {"a", "b", "c"}
+
+
+def test_dedupe_data_does_not_modify_input():
+    data = dict(_data(["S1", "S2", "S1"], ["O1", "O1"], ["U1"]), has_sls=True)
+    result = dedup.dedupe_data(data)
+    assert _lists(result) == _lists(_data(["S1", "S2"], ["O1"], ["U1"]))
+    assert result["has_sls"] is True
+    assert data["sls"] == ["S1", "S2", "S1"]
+
+    seen = {}
+    dedup.dedupe_data(data, seen)
+    assert _lists(dedup.dedupe_data(_data(["S2", "S3"], ["O1"]), seen)) == _lists(_data(["S3"]))
+
+
+def test_same_session_is_not_reported(db_path):
+    with dedup.SeenIndex(db_path, session="one") as index:
+        data = _data(["S1", "S2"], ["O1"])
+        for _ in range(2):
+            # 同一会话中反复处理同一批数据不算以前处理过
+            result, repeats = index.check(data, skip=True)
+            assert repeats == {"sls": 0, "order": 0, "unknown": 0}
+            assert _lists(result) == _lists(data)
+        assert len(index) == 3
+
+
+def test_other_session_marks_or_skips(db_path, monkeypatch):
+    monkeypatch.setattr(dedup, "_BATCH_SIZE", 3)
+    first = [f"MY{i:013d}" for i in range(10)]
+    with dedup.SeenIndex(db_path, session="one") as index:
+        index.check(_data(first, ["O1"]))
+
+    # 同一个索引文件、另一个会话：以前处理过的单号按出现次数计
+    data = _data(first[5:] + ["MY9999999999999"] + first[5:7], ["O1", "O2"], ["U1"])
+    with dedup.SeenIndex(db_path, session="two") as index:
+        result, repeats = index.check(data)
+        assert repeats == {"sls": 7, "order": 1, "unknown": 0}
+        assert _lists(result) == _lists(data)
+
+    with dedup.SeenIndex(db_path, session="three") as index:
+        result, repeats = index.check(data, skip=True)
+        # 第二个会话记入的新单号这次也是以前处理过的
+        assert repeats == {"sls": 8, "order": 2, "unknown": 1}
+        assert _lists(result) == _lists(_data())
+
+
+def test_index_persists_after_reopening(db_path):
+    with dedup.SeenIndex(db_path, session="one") as index:
+        index.check(_data(["S1"], ["O1"], ["U1"]))
+    with dedup.SeenIndex(db_path, session="one") as index:
+        assert len(index) == 3
+        # 重新打开后记录的仍是第一次处理的会话
+        _, repeats = index.check(_data(["S1"]))
+        assert repeats["sls"] == 0
+    with dedup.SeenIndex(db_path, session="two") as index:
+        _, repeats = index.check(_data(["S1", "S2"]))
+        assert repeats["sls"] == 1
+        index.clear()
+        assert len(index) == 0
+    with dedup.SeenIndex(db_path, session="three") as index:
+        assert len(index) == 0
+
+
+def test_cancelled_check_records_nothing(db_path, monkeypatch):
+    monkeypatch.setattr(dedup, "_BATCH_SIZE", 2)
+    calls = []
+
+    def check():
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("cancelled")
+
+    with dedup.SeenIndex(db_path, session="one") as index:
+        with pytest.raises(RuntimeError):
+            index.check(_data(["S1", "S2", "S3", "S4", "S5"]), check=check)
+        assert len(index) == 0
+
+
+def test_default_path_from_environment(monkeypatch, tmp_path):
+    path = str(tmp_path / "custom" / "seen.sqlite3")
+    monkeypatch.setenv(dedup.SEEN_DB_ENV, path)
+    with dedup.SeenIndex(session="one") as index:
+        assert index.path == path
+        index.check(_data(["S1"]))
+    assert (tmp_path / "custom" / "seen.sqlite3").exists()
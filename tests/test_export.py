@@ -0,0 +1,133 @@
+"""
+导出结果到文件：.xlsx 用 zipfile 读回工作表XML，文本和表格文件与结果区域一致
+"""
+import csv
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+
+import export
+import formatting
+import tabular
+
+NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+SLS = [f"MY{i:013d}" for i in range(25)]
+ORDERS = [f"24{i:04d}ABCD{i:05d}" for i in range(10)]
+UNKNOWN = ["A&B<12345678>", "未知单号12345678"]
+COLUMNS = [("sls", SLS), ("order", ORDERS), ("unknown", UNKNOWN)]
+
+
+def _expected_rows(columns):
+    header = [formatting.CLASS_LABELS[key] for key, _ in columns]
+    length = max(len(items) for _, items in columns)
+    return [header] + [[items[i] if i < len(items) else "" for _, items in columns] for i in range(length)]
+
+
+def _read_xlsx(path):
+    """各工作表的单元格 [[行的各列文本], ...]，按单元格位置还原空单元格"""
+    sheets = []
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        for part in ("[Content_Types].xml", "_rels/.rels", "xl/workbook.xml", "xl/_rels/workbook.xml.rels"):
+            assert part in names
+            ElementTree.fromstring(zf.read(part))
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+        count = len(workbook.findall("m:sheets/m:sheet", NS))
+        for i in range(1, count + 1):
+            root = ElementTree.fromstring(zf.read(f"xl/worksheets/sheet{i}.xml"))
+            rows = []
+            for number, row in enumerate(root.findall("m:sheetData/m:row", NS), 1):
+                assert row.get("r") == str(number)
+                values = ["", "", ""]
+                for cell in row.findall("m:c", NS):
+                    ref = cell.get("r")
+                    assert ref[1:] == str(number) and cell.get("t") == "inlineStr"
+                    values["ABC".index(ref[0])] = cell.find("m:is/m:t", NS).text
+                rows.append(values)
+            sheets.append(rows)
+    return sheets
+
+
+def test_xlsx_round_trip(tmp_path):
+    path = str(tmp_path / "result.xlsx")
+    export.export_columns(path, "organization", COLUMNS)
+    assert _read_xlsx(path) == [_expected_rows(COLUMNS)]
+
+
+def test_xlsx_continues_on_next_sheet(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 10)
+    path = str(tmp_path / "result.xlsx")
+    export.export_columns(path, "organization", COLUMNS)
+    sheets = _read_xlsx(path)
+    assert [len(rows) for rows in sheets] == [10, 10, 6]
+    assert [row for rows in sheets for row in rows] == _expected_rows(COLUMNS)
+
+
+@pytest.mark.parametrize("ext, delimiter", [("csv", ","), ("tsv", "\t")])
+def test_table_files(tmp_path, ext, delimiter):
+    path = str(tmp_path / f"result.{ext}")
+    export.export_columns(path, "batch_query", COLUMNS)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = [row + [""] * (3 - len(row)) for row in csv.reader(f, delimiter=delimiter)]
+    assert rows == _expected_rows(COLUMNS)
+
+
+@pytest.mark.parametrize("fmt", formatting.FORMATS)
+def test_text_matches_result_area(tmp_path, fmt):
+    path = str(tmp_path / "result.txt")
+    export.export_columns(path, fmt, COLUMNS, max_items=7)
+    with open(path, encoding="utf-8", newline="") as f:
+        assert f.read() == formatting.ResultRows(fmt, COLUMNS, max_items=7).text()
+
+
+def test_text_keeps_table_alignment(tmp_path):
+    text = (
+        "运单号\t订单号\t备注\n"
+        "MY1234567890123\t240101ABCD12345\tx\n"
+        "\t240102ABCD67890\t\n"
+        "SG1234567890123 BR1234567890123\t\ty\n"
+        "MY1234567890123\t240103EFGH11111\tz\n"
+    )
+    data = tabular.extract_table(text)
+    # 去重后第二个 MY1234567890123 去掉，它所在的行在 A 列留空
+    filtered = {"sls": ["MY1234567890123", "SG1234567890123", "BR1234567890123"],
+                "order": list(data["order"]), "unknown": []}
+    alignment = tabular.align(data, filtered)
+    columns = [("sls", filtered["sls"]), ("order", filtered["order"])]
+    path = str(tmp_path / "result.txt")
+    export.export_columns(path, "organization", columns, alignment=alignment)
+    with open(path, encoding="utf-8", newline="") as f:
+        assert f.read().split("\n") == [
+            "SLS单号\t订单编号",
+            "MY1234567890123\t240101ABCD12345",
+            "\t240102ABCD67890",
+            "SG1234567890123 BR1234567890123\t",
+            "\t240103EFGH11111",
+        ]
+    # 导出表格文件时不按原表格对齐
+    export.export_columns(str(tmp_path / "result.csv"), "organization", columns, alignment=alignment)
+    with open(tmp_path / "result.csv", encoding="utf-8-sig", newline="") as f:
+        assert len(list(csv.reader(f))) == 1 + len(filtered["sls"])
+
+
+def test_export_chunks(tmp_path):
+    path = str(tmp_path / "ids.txt")
+    written = export.export_chunks(path, "batch_data", COLUMNS[:2], max_items=10)
+    assert [p.rsplit("ids_", 1)[1] for p in written] == [
+        "sls_0001.txt", "sls_0002.txt", "sls_0003.txt", "order_0001.txt"]
+    with open(written[2], encoding="utf-8") as f:
+        assert f.read() == ",".join(f"'{item}'" for item in SLS[20:])
+
+
+def test_failed_export_removes_file(tmp_path):
+    path = tmp_path / "result.xlsx"
+
+    def cancel(stage, pos):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        export.export_columns(str(path), "organization", [("sls", SLS * 1000)], progress=cancel)
+    assert not path.exists()
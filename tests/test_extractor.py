@@ -0,0 +1,301 @@
+"""
+提取引擎与原始实现的一致性
+
+baseline_extract 保留了早期界面中"逐个 str.replace 置空 + 循环 re.search"的实现，
+作为对照：随机生成和模拟导出的文本分别经串行、extract_parallel、extract_file
+和压缩文件各条路径提取，结果（包括顺序）都应与它完全一致。
+"""
+import bz2
+import gzip
+import random
+import re
+import zipfile
+
+import pytest
+
+import benchmark
+import extractor
+import id_types
+import instrumentation
+
+BASELINE_SLS = r'(?:MX|CL|CO)[A-Za-z0-9]{16}|(?:BR|MY|PH|SG|TH|TW|VN)[A-Za-z0-9]{13}'
+BASELINE_ORDER = r'\d{6}(?=.*[A-Za-z])[A-Za-z0-9]{8,9}'
+BASELINE_UNKNOWN = r'[A-Za-z0-9]{8,}'
+
+
+def baseline_extract(text, sls_pattern=BASELINE_SLS, order_pattern=BASELINE_ORDER,
+                     unknown_pattern=BASELINE_UNKNOWN):
+    """原始实现（去掉了界面相关的部分），正则可以替换为自定义单号类型的原始形式"""
+    sls_matches = re.findall(sls_pattern, text)
+    filtered_text = text
+    for sls in sls_matches:
+        filtered_text = filtered_text.replace(sls, ' ' * len(sls))
+
+    order_matches = re.findall(order_pattern, filtered_text)
+    for order in order_matches:
+        filtered_text = filtered_text.replace(order, ' ' * len(order))
+
+    unknown_matches = []
+    while True:
+        match = re.search(unknown_pattern, filtered_text)
+        if not match:
+            break
+        item = match.group(0)
+        is_pure_digits = item.isdigit()
+        has_uppercase = any(char.isupper() for char in item)
+        has_digit = any(char.isdigit() for char in item)
+        has_lowercase = any(char.islower() for char in item)
+        if is_pure_digits or (has_uppercase and has_digit and not has_lowercase):
+            unknown_matches.append(item)
+        start, end = match.span()
+        filtered_text = filtered_text[:start] + ' ' * (end - start) + filtered_text[end:]
+
+    return {"sls": sls_matches, "order": order_matches, "unknown": unknown_matches}
+
+
+def _chars(rng, alphabet, n):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def fuzz_text(rng, pieces, fullwidth=True):
+    """
+    随机文本：接近各类单号长度的字符串、重复出现的字符串、互相重叠的片段，
+    以各种分隔符（含换行）连接，覆盖置空和"同一行后面有字母"的各种边界情况
+    """
+    parts = []
+    seen = []
+    for _ in range(pieces):
+        r = rng.random()
+        if r < 0.15:
+            s = rng.choice(["MX", "CL", "CO"]) + _chars(rng, "ABC0123", rng.randint(14, 18))
+        elif r < 0.3:
+            s = rng.choice(["BR", "MY", "PH", "SG", "TH", "TW", "VN"]) + _chars(rng, "BRMX0123", rng.randint(11, 16))
+        elif r < 0.5:
+            s = _chars(rng, "0123456789", rng.randint(5, 8)) + _chars(rng, "AB12ab", rng.randint(6, 10))
+        elif r < 0.6:
+            s = _chars(rng, "0123456789", rng.randint(6, 25))
+        elif r < 0.7 and seen:
+            s = rng.choice(seen)
+        elif r < 0.75 and seen:
+            # 与之前的字符串部分重叠
+            s = rng.choice(seen)[rng.randint(0, 4):] + _chars(rng, "AB01", rng.randint(0, 6))
+        elif r < 0.82:
+            s = _chars(rng, "abcXYZ019", rng.randint(1, 12))
+        elif r < 0.85 and fullwidth:
+            s = "１２３４５６ABCDEFGH9"
+        else:
+            s = _chars(rng, "BRMXCO0123456789A", rng.randint(10, 40))
+        seen.append(s)
+        parts.append(s)
+        parts.append(rng.choice([" ", "\n", "\t", "", ",", "", "x", "\r\n", "中"]))
+    return "".join(parts)
+
+
+def _as_lists(data):
+    return {key: list(data[key]) for key in ("sls", "order", "unknown")}
+
+
+def realistic_text(size, seed):
+    """模拟的订单导出，再把其中一部分行重复一遍（同一单号在多处出现）"""
+    text = benchmark.generate_corpus(size, seed)
+    lines = text.splitlines(keepends=True)
+    rng = random.Random(seed)
+    return text + "".join(rng.sample(lines, len(lines) // 5))
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    """把分片阈值调小，几KB的文本也会切成许多分片"""
+    monkeypatch.setattr(extractor, "PARALLEL_THRESHOLD", 0)
+    monkeypatch.setattr(extractor, "_MIN_SHARD_SIZE", 64)
+    monkeypatch.setattr(extractor, "FILE_SHARD_SIZE", 64)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_serial_matches_baseline_on_fuzzed_text(seed):
+    rng = random.Random(seed)
+    for _ in range(1000):
+        text = fuzz_text(rng, rng.randint(0, 40))
+        assert _as_lists(extractor.extract_order_numbers(text)) == baseline_extract(text), repr(text)
+
+
+def test_serial_matches_baseline_on_realistic_text():
+    text = realistic_text(64 * 1024, 1)
+    assert _as_lists(extractor.extract_order_numbers(text)) == baseline_extract(text)
+
+
+def test_ids_repeated_and_overlapping_across_lines():
+    cases = [
+        # SLS单号在别处重复出现，第二处也被置空
+        "MY1234567890123\nxxMY1234567890123yy\n",
+        # SLS单号里包含订单编号形状的片段
+        "BR123456ABCDEFG\n123456ABCDEFG\n",
+        # 订单编号只在后面有字母的那一行被识别，另一行的同一字符串随之被置空
+        "123456ABCD1234 z\n123456ABCD1234\n123456ABCD1234\n",
+        # 订单编号前瞻不跨行
+        "123456789012345\nabc\n",
+        # 重叠的SLS形状字符串，置空顺序影响结果
+        "MXMX1234567890123456789\nMX1234567890123456\n",
+        "12345678ABCDEFGH 12345678abcdefgh x\n1234567ABCDEFGH\n",
+    ]
+    for text in cases:
+        assert _as_lists(extractor.extract_order_numbers(text)) == baseline_extract(text), repr(text)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_matches_baseline(small_shards, workers):
+    rng = random.Random(workers)
+    texts = [fuzz_text(rng, rng.randint(50, 400)) for _ in range(40 if workers == 1 else 8)]
+    texts.append(realistic_text(32 * 1024, 2))
+    for text in texts:
+        got = extractor.extract_parallel(text, max_workers=workers)
+        assert _as_lists(got) == baseline_extract(text), repr(text)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sharded_extraction_reports_step_timings(small_shards, workers):
+    text = realistic_text(32 * 1024, 4)
+    recorder = instrumentation.StageRecorder(memory=False)
+    recorder.start()
+    extractor.extract_parallel(text, recorder.wrap_progress(), max_workers=workers)
+    recorder.stop()
+    stage = recorder.stages["parallel" if workers > 1 else "shards"]
+    assert set(stage["parts"]) == {"sls", "order", "unknown"}
+    assert all(seconds > 0 for seconds in stage["parts"].values())
+    # 各步的耗时不计入总耗时
+    assert recorder.total_seconds == stage["seconds"]
+
+    # 合并输入时已提取的分片，汇报各分片当时的耗时
+    bounds = extractor._shard_bounds(text, 4)
+    shards = extractor.extract_shards(text, bounds, max_workers=1)
+    recorder = instrumentation.StageRecorder(memory=False)
+    progress = recorder.wrap_progress()
+    progress("live", 0)
+    assert extractor.merge_shards(shards, progress) is not None
+    recorder.stop()
+    expected = sum(shard["seconds"]["order"] for shard in shards)
+    assert recorder.stages["live"]["parts"]["order"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_file_matches_baseline(small_shards, tmp_path, workers):
+    # 按字节扫描时订单编号开头只认ASCII数字，不生成全角数字
+    rng = random.Random(10 + workers)
+    path = tmp_path / "export.txt"
+    texts = [fuzz_text(rng, rng.randint(50, 400), fullwidth=False) for _ in range(30 if workers == 1 else 6)]
+    texts.append(realistic_text(32 * 1024, 3))
+    for text in texts:
+        path.write_bytes(text.encode("utf-8"))
+        got = extractor.extract_file(str(path), max_workers=workers)
+        assert _as_lists(got) == baseline_extract(text), repr(text)
+
+
+@pytest.mark.parametrize("encoding", ["utf-16", "utf-8-sig"])
+def test_file_in_other_encodings(tmp_path, encoding):
+    text = realistic_text(16 * 1024, 4)
+    path = tmp_path / "export.txt"
+    path.write_bytes(text.encode(encoding))
+    assert _as_lists(extractor.extract_file(str(path))) == baseline_extract(text)
+
+
+def _write_archive(path, kind, members):
+    if kind == "gz":
+        with gzip.open(path, "wb") as f:
+            f.write(members[0])
+    elif kind == "bz2":
+        with bz2.open(path, "wb") as f:
+            f.write(members[0])
+    else:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("exports/", "")
+            for i, data in enumerate(members):
+                zf.writestr(f"exports/part{i}.txt", data)
+
+
+@pytest.mark.parametrize("kind", ["gz", "bz2", "zip"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_archive_matches_baseline(small_shards, tmp_path, kind, workers):
+    rng = random.Random(20 + workers)
+    path = tmp_path / f"export.{kind}"
+    for _ in range(12 if workers == 1 else 3):
+        count = rng.randint(2, 4) if kind == "zip" else 1
+        texts = [fuzz_text(rng, rng.randint(0, 300), fullwidth=False) for _ in range(count)]
+        _write_archive(path, kind, [text.encode("utf-8") for text in texts])
+        # 结果与各成员依次连接（每个成员以换行结尾）后整段提取一致
+        joined = "".join(text if not text or text.endswith("\n") else text + "\n" for text in texts)
+        got = extractor.extract_file(str(path), max_workers=workers)
+        assert _as_lists(got) == baseline_extract(joined), repr(texts)
+
+
+def test_archive_members_in_different_encodings(tmp_path):
+    texts = [realistic_text(8 * 1024, seed) for seed in range(3)]
+    path = tmp_path / "export.zip"
+    _write_archive(path, "zip", [texts[0].encode("utf-8"), texts[1].encode("utf-16"),
+                                 texts[2].encode("utf-8-sig")])
+    assert _as_lists(extractor.extract_file(str(path))) == baseline_extract("".join(texts))
+
+
+CUSTOM_CONFIGS = [
+    {
+        "sls": [
+            {"prefixes": ["MX", "CL", "CO"], "length": 18},
+            {"prefixes": ["ID"], "length": 16, "charset": "A-Z0-9"},
+            {"prefixes": ["B", "BRX"], "length": 12},
+        ],
+        "unknown": {"min_length": 10},
+    },
+    {
+        "sls": [{"prefixes": ["SPX", "9"], "length": 14, "charset": "0-9"}],
+        "order": {"digits": 4, "min_length": 10, "max_length": 12, "charset": "A-Z0-9",
+                  "letter_on_line": False},
+    },
+    {"sls": [], "order": {"digits": 8, "min_length": 12, "max_length": 16}},
+]
+
+
+@pytest.mark.parametrize("config", CUSTOM_CONFIGS)
+def test_custom_id_types_match_baseline(monkeypatch, config):
+    types = id_types.from_config(config)
+    monkeypatch.setattr(extractor, "_STR_PATTERNS", extractor._Patterns(str, types))
+    monkeypatch.setattr(extractor, "_BYTES_PATTERNS", extractor._Patterns(bytes, types))
+    patterns = (types.sls_pattern(), types.order.pattern(), types.unknown_pattern())
+    rng = random.Random(len(str(config)))
+    for _ in range(600):
+        text = fuzz_text(rng, rng.randint(0, 40))
+        text += rng.choice(["", " ID" + _chars(rng, "AZ09", 14), " SPX" + _chars(rng, "0123", 11),
+                            " B" + _chars(rng, "RX01", 11), " 9" + _chars(rng, "0123456789", 13)])
+        assert _as_lists(extractor.extract_order_numbers(text)) == baseline_extract(text, *patterns), repr(text)
+
+
+def test_custom_id_types_sharded_in_process(monkeypatch, small_shards):
+    # 进程池的子进程按默认配置导入 extractor，这里只检查本进程中的分片合并
+    types = id_types.from_config(CUSTOM_CONFIGS[0])
+    monkeypatch.setattr(extractor, "_STR_PATTERNS", extractor._Patterns(str, types))
+    monkeypatch.setattr(extractor, "_BYTES_PATTERNS", extractor._Patterns(bytes, types))
+    patterns = (types.sls_pattern(), types.order.pattern(), types.unknown_pattern())
+    rng = random.Random(5)
+    for _ in range(30):
+        text = fuzz_text(rng, rng.randint(50, 300))
+        got = extractor.extract_parallel(text, max_workers=1)
+        assert _as_lists(got) == baseline_extract(text, *patterns), repr(text)
+
+
+def _no_pool(workers):
+    raise AssertionError("small inputs should not start the process pool")
+
+
+def test_small_file_is_scanned_in_process(monkeypatch, tmp_path):
+    monkeypatch.setattr(extractor, "_get_pool", _no_pool)
+    text = realistic_text(16 * 1024, 6)
+    path = tmp_path / "export.txt"
+    path.write_bytes(text.encode("utf-8"))
+    assert _as_lists(extractor.extract_file(str(path), max_workers=4)) == baseline_extract(text)
+
+
+@pytest.mark.parametrize("kind, count", [("gz", 1), ("zip", 1), ("zip", 3)])
+def test_small_archive_is_extracted_in_process(monkeypatch, tmp_path, kind, count):
+    monkeypatch.setattr(extractor, "_get_pool", _no_pool)
+    texts = [realistic_text(8 * 1024, seed) for seed in range(count)]
+    path = tmp_path / f"export.{kind}"
+    _write_archive(path, kind, [text.encode("utf-8") for text in texts])
+    assert _as_lists(extractor.extract_file(str(path), max_workers=4)) == baseline_extract("".join(texts))
@@ -0,0 +1,100 @@
+"""
+批量格式的分段：按单号数量和字节数分段，ResultRows 的分段与完整文本一致
+"""
+import time
+
+import pytest
+
+import formatting
+from idlist import IdList
+
+# 长度不一的单号，含全角字符（UTF-8 中每个占3字节）
+ITEMS = [f"MY{i:0{13 + i % 3}d}" if i % 7 else f"２４{i:08d}ＡＢ" for i in range(50000)]
+
+
+def _chunk_bytes(chunk, quote):
+    return len(",".join(quote + item + quote for item in chunk).encode("utf-8"))
+
+
+@pytest.mark.parametrize("max_items", [1, 7, 1000, 49999, 50000, 50001])
+def test_max_items(max_items):
+    chunks = list(formatting.iter_chunks(ITEMS, max_items=max_items))
+    assert len(chunks) == -(-len(ITEMS) // max_items)
+    assert all(len(chunk) == max_items for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= max_items
+    assert [item for chunk in chunks for item in chunk] == ITEMS
+
+
+@pytest.mark.parametrize("quote", ["", "'"])
+@pytest.mark.parametrize("max_bytes", [40, 1000, 65536])
+def test_max_bytes_counts_quotes_and_commas(quote, max_bytes):
+    chunks = list(formatting.iter_chunks(ITEMS, quote, max_bytes=max_bytes))
+    assert [item for chunk in chunks for item in chunk] == ITEMS
+    for i, chunk in enumerate(chunks):
+        assert _chunk_bytes(chunk, quote) <= max_bytes
+        # 每段都已尽量装满：再加下一段的第一个单号就会超过上限
+        if i + 1 < len(chunks):
+            assert _chunk_bytes(chunk + chunks[i + 1][:1], quote) > max_bytes
+
+
+def test_max_bytes_exact_boundary():
+    items = ["A1234", "B1234", "C1234"]
+    # 'A1234','B1234' 正好 15 字节
+    assert list(formatting.iter_chunks(items, "'", max_bytes=15)) == [items[:2], items[2:]]
+    assert list(formatting.iter_chunks(items, "'", max_bytes=14)) == [[item] for item in items]
+    # 单个单号就超过上限时单独成段
+    assert list(formatting.iter_chunks(items, "'", max_bytes=3)) == [[item] for item in items]
+
+
+def test_both_limits():
+    chunks = list(formatting.iter_chunks(ITEMS, max_items=10, max_bytes=100))
+    assert all(len(chunk) <= 10 and _chunk_bytes(chunk, "") <= 100 for chunk in chunks)
+    assert [item for chunk in chunks for item in chunk] == ITEMS
+
+
+@pytest.mark.parametrize("fmt", ["batch_query", "batch_data"])
+@pytest.mark.parametrize("limits", [(None, None), (1000, None), (None, 4096), (333, 2000)])
+def test_result_rows_chunks_match_iter_format(fmt, limits):
+    max_items, max_bytes = limits
+    quote = formatting.batch_quote(fmt)
+    orders = [f"24{i:04d}ABCD{i:04d}" for i in range(3000)]
+    columns = [("sls", IdList.pack(ITEMS)), ("order", orders)]
+    rows = formatting.ResultRows(fmt, columns, max_items, max_bytes)
+
+    expected = [list(formatting.iter_chunks(items, quote, max_items, max_bytes)) if any(limits) else [list(items)]
+                for _, items in columns]
+    flat = [chunk for chunks in expected for chunk in chunks]
+    assert len(rows.chunks) == len(flat)
+    for index, chunk in enumerate(flat):
+        assert rows.chunk_text(index) == ",".join(quote + item + quote for item in chunk)
+
+    text = rows.text()
+    assert text == "".join(formatting.iter_format(fmt, columns, max_items, max_bytes))
+    assert "\n".join(rows.rows(0, len(rows))).replace(",\n", ",") == text
+
+    # 每段第一行到下一段第一行之前都属于该段（段间空行和类别标题归入前一段）
+    for index in range(len(rows.chunks)):
+        first = rows.chunk_first_row(index)
+        assert rows.chunk_index(first) == index
+        last = rows.chunk_first_row(index + 1) - 1 if index + 1 < len(rows.chunks) else len(rows) - 1
+        assert rows.chunk_index(last) == index
+    assert rows.chunk_index(0) == 0
+
+
+def test_organization_has_no_chunks():
+    rows = formatting.ResultRows("organization", [("sls", ITEMS[:10])], max_items=3)
+    assert rows.chunks == []
+    assert rows.chunk_index(0) == -1
+    assert rows.text() == "\n".join(ITEMS[:10])
+
+
+def test_many_small_chunks_build_quickly():
+    # 每段一个单号时段数与单号数相同，建立行索引不能随段数平方增长
+    items = [f"MY{i:013d}" for i in range(200000)]
+    began = time.perf_counter()
+    rows = formatting.ResultRows("batch_query", [("sls", items)], max_items=1)
+    assert time.perf_counter() - began < 20
+    assert len(rows.chunks) == len(items)
+    assert len(rows) == 2 * len(items) - 1
+    assert rows[len(rows) - 1] == items[-1]
+    assert rows.chunk_text(123456) == items[123456]
@@ -0,0 +1,166 @@
+"""
+输入区域的增量提取：模拟文本框的编辑，按段合并的结果应与整段提取一致
+"""
+import random
+
+import pytest
+
+import benchmark
+import extractor
+import live
+
+
+class Buffer:
+    """模拟 Tk 文本框的内容：每行都含行尾换行符，行号从1开始"""
+
+    def __init__(self):
+        self.lines = ["\n"]
+        self.live = live.LiveExtraction()
+
+    @property
+    def text(self):
+        return "".join(self.lines)
+
+    def replace(self, first, last, new_lines):
+        """把第 first 至 last 行换成 new_lines（至少一行），同 watch_text 转发的改动"""
+        assert new_lines
+        self.lines[first - 1:last] = new_lines
+        self.live.edit(first, last, len(new_lines))
+
+    def extract(self):
+        """像界面去抖后那样提取待提取的段"""
+        jobs = self.live.prepare(lambda first, last: "".join(self.lines[first - 1:last]))
+        for segment, shard in live.extract_pending(jobs):
+            assert self.live.apply(segment, shard)
+
+    def check(self):
+        shards = self.live.shards()
+        assert shards is not None
+        assert self.live.lines == len(self.lines)
+        expected = extractor.extract_order_numbers(self.text)
+        conflicted = bool(extractor._conflicts(shards, "sls") or extractor._conflicts(shards, "order"))
+        assert self.live.conflicted == conflicted
+        assert self.live.counts == {key: sum(len(shard[key]) for shard in shards) for key in live.KEYS}
+        merged = extractor.merge_shards(shards)
+        if conflicted:
+            assert merged is None
+        else:
+            assert {key: list(merged[key]) for key in live.KEYS} == {key: list(expected[key]) for key in live.KEYS}
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    """把每段的字符数调小，几KB的文本也会分成许多段"""
+    monkeypatch.setattr(live, "SEGMENT_CHARS", 256)
+
+
+def _corpus_lines(size, seed):
+    return [line.rstrip("\n") + "\n" for line in benchmark.generate_corpus(size, seed).splitlines()]
+
+
+def test_paste_then_append(small_segments):
+    buffer = Buffer()
+    corpus = _corpus_lines(16 * 1024, 1)
+    buffer.replace(1, 1, corpus + ["\n"])
+    buffer.extract()
+    assert len(buffer.live.segments) > 10
+    buffer.check()
+
+    # 在末尾追加时只重新提取最后一段和追加的部分
+    before = list(buffer.live.segments)
+    more = _corpus_lines(2 * 1024, 2)
+    last = len(buffer.lines)
+    buffer.replace(last, last, more + ["\n"])
+    unchanged = sum(1 for segment in buffer.live.segments if any(segment is old for old in before))
+    assert unchanged == len(before) - 1
+    buffer.extract()
+    buffer.check()
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_edits_match_full_extraction(small_segments, seed):
+    rng = random.Random(seed)
+    corpus = _corpus_lines(8 * 1024, seed)
+    buffer = Buffer()
+    buffer.replace(1, 1, corpus + ["\n"])
+    buffer.extract()
+    buffer.check()
+
+    for _ in range(60):
+        count = len(buffer.lines)
+        first = rng.randint(1, count)
+        action = rng.choice(("edit", "insert", "delete"))
+        if action == "edit":
+            # 改写一行（可能拆成几行）
+            last = first
+            new = [rng.choice(corpus) for _ in range(rng.randint(1, 3))]
+        elif action == "insert":
+            # 在第 first 行前插入若干行
+            last = first
+            new = [rng.choice(corpus) for _ in range(rng.randint(1, 40))] + [buffer.lines[first - 1]]
+        else:
+            # 删除若干整行，第 last 行保留
+            last = min(first + rng.randint(0, 30), count)
+            new = [buffer.lines[last - 1]]
+        buffer.replace(first, last, new)
+        # 有时连续几次编辑之后才提取
+        if rng.random() < 0.6:
+            buffer.extract()
+            buffer.check()
+    buffer.extract()
+    buffer.check()
+
+
+def test_cross_segment_conflict(small_segments):
+    filler = _corpus_lines(4 * 1024, 5)
+    buffer = Buffer()
+    buffer.replace(1, 1, filler + filler + ["\n"])
+    buffer.extract()
+    buffer.check()
+    assert not buffer.live.conflicted
+
+    # 同一串数字在一段中是订单编号（同一行后面有字母），在另一段中不是：
+    # 整段提取时后者也被置空，按段合并的结果不同
+    far = len(buffer.lines) - 2
+    buffer.replace(2, 2, ["12345678901234\n", buffer.lines[1]])
+    buffer.extract()
+    buffer.check()
+    assert not buffer.live.conflicted
+    buffer.replace(far, far, ["12345678901234 z\n", buffer.lines[far - 1]])
+    buffer.extract()
+    buffer.check()
+    assert buffer.live.conflicted
+    assert extractor.merge_shards(buffer.live.shards()) is None
+
+    # 删除其中一处后冲突消失
+    buffer.replace(2, 3, [buffer.lines[2]])
+    buffer.extract()
+    buffer.check()
+    assert not buffer.live.conflicted
+
+
+def test_edit_during_extraction_discards_stale_result(small_segments):
+    buffer = Buffer()
+    buffer.replace(1, 1, _corpus_lines(4 * 1024, 6) + ["\n"])
+    jobs = buffer.live.prepare(lambda first, last: "".join(buffer.lines[first - 1:last]))
+    results = live.extract_pending(jobs)
+
+    # 提取期间改动了第一段，它的结果作废，其余段照常填入
+    buffer.replace(1, 1, ["MY1234567890123\n"])
+    applied = [buffer.live.apply(segment, shard) for segment, shard in results]
+    assert applied[0] is False
+    assert all(applied[1:])
+    assert buffer.live.pending
+    buffer.extract()
+    buffer.check()
+
+
+def test_reset_reextracts_everything(small_segments):
+    buffer = Buffer()
+    buffer.replace(1, 1, _corpus_lines(4 * 1024, 7) + ["\n"])
+    buffer.extract()
+    buffer.live.reset(len(buffer.lines))
+    assert buffer.live.pending
+    assert buffer.live.counts == dict.fromkeys(live.KEYS, 0)
+    buffer.extract()
+    buffer.check()
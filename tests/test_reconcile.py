@@ -0,0 +1,72 @@
+"""
+两个列表的对比：三个部分各自保持输入中第一次出现的顺序
+"""
+import random
+
+import extractor
+import reconcile
+
+
+def _lists(result):
+    return {part: list(result[part]) for part in reconcile.PARTS}
+
+
+def _first_seen(items):
+    seen = set()
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+
+def test_partitions_keep_input_order():
+    a = ["A3", "X1", "A1", "X2", "A3", "A2", "X1"]
+    b = ["B2", "X2", "B1", "X1", "B2", "X3"]
+    assert _lists(reconcile.reconcile(a, b)) == {
+        "a_only": ["A3", "A1", "A2"],
+        "b_only": ["B2", "B1", "X3"],
+        "both": ["X1", "X2"],
+    }
+
+
+def test_large_random_lists():
+    rng = random.Random(1)
+    pool = [f"MY{i:013d}" for i in range(20000)]
+    a = [rng.choice(pool) for _ in range(30000)]
+    b = [rng.choice(pool) for _ in range(30000)]
+    result = _lists(reconcile.reconcile(a, b))
+
+    a_set, b_set = set(a), set(b)
+    assert result["a_only"] == _first_seen(item for item in a if item not in b_set)
+    assert result["b_only"] == _first_seen(item for item in b if item not in a_set)
+    assert result["both"] == _first_seen(item for item in a if item in b_set)
+
+
+def test_empty_sides():
+    assert _lists(reconcile.reconcile([], ["B1", "B1"])) == {"a_only": [], "b_only": ["B1"], "both": []}
+    assert _lists(reconcile.reconcile(["A1"], [])) == {"a_only": ["A1"], "b_only": [], "both": []}
+
+
+def test_reconcile_data_across_classes_and_output_option():
+    # 同一字符串在A中是订单编号（同一行后面有字母），在B中是未知单号，也算两边都有
+    a_text = "MY1234567890123\n12345678901234 z\nSG1111111111111\n"
+    b_text = "12345678901234\nMY1234567890123\nTH2222222222222\n"
+    a_data = extractor.extract_order_numbers(a_text)
+    b_data = extractor.extract_order_numbers(b_text)
+    assert list(a_data["order"]) == ["12345678901234"]
+    assert list(b_data["unknown"]) == ["12345678901234"]
+
+    assert _lists(reconcile.reconcile_data(a_data, b_data)) == {
+        "a_only": ["SG1111111111111"],
+        "b_only": ["TH2222222222222"],
+        "both": ["MY1234567890123", "12345678901234"],
+    }
+    assert _lists(reconcile.reconcile_data(a_data, b_data, "order_only")) == {
+        "a_only": ["12345678901234"],
+        "b_only": [],
+        "both": [],
+    }
+    assert reconcile.describe_counts(reconcile.reconcile_data(a_data, b_data)) == [
+        "仅A有 1 个", "仅B有 1 个", "两边都有 2 个"]
@@ -0,0 +1,199 @@
+"""
+本地服务模式：在 127.0.0.1 的临时端口上启动服务，用本地客户端发送请求
+"""
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+import extractor
+import formatting
+import service
+
+TEXT = "MY1234567890123 240101ABCD1234 z\nBR1234567890123 12345678\nMY1234567890123\n"
+
+
+@pytest.fixture
+def start_server():
+    """start_server(allow_path=True) 在后台线程中启动服务，返回端口"""
+    started = []
+
+    def start(allow_path=True):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        servers = []
+
+        async def run():
+            server = await asyncio.start_server(service.Service(allow_path).handle, "127.0.0.1", 0)
+            servers.append(server)
+            ready.set()
+
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        asyncio.run_coroutine_threadsafe(run(), loop)
+        assert ready.wait(10)
+        started.append((loop, thread, servers[0]))
+        return servers[0].sockets[0].getsockname()[1]
+
+    yield start
+    for loop, thread, server in started:
+        loop.call_soon_threadsafe(server.close)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+
+
+def request(port, body=b"", method="POST", path="/extract", headers=None):
+    """发送一个请求，返回 (状态码, 解析后的JSON)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read().decode("utf-8"))
+    finally:
+        conn.close()
+
+
+def post_json(port, params, path="/extract"):
+    return request(port, json.dumps(params).encode("utf-8"), path=path,
+                   headers={"Content-Type": "application/json"})
+
+
+def _expected_ids(text):
+    data = extractor.extract_order_numbers(text)
+    return {key: list(data[key]) for key in formatting.CLASSES}
+
+
+def test_text_request(start_server):
+    port = start_server()
+    status, result = post_json(port, {"text": TEXT, "ids": True, "format": "batch_query"})
+    assert status == 200
+    expected = _expected_ids(TEXT)
+    assert result["ids"] == expected
+    assert result["counts"] == {key: len(items) for key, items in expected.items()}
+    columns = [(key, items) for key, items in expected.items() if items]
+    assert result["output"] == "".join(formatting.iter_format("batch_query", columns))
+
+
+def test_plain_text_body_with_query_parameters(start_server):
+    port = start_server()
+    status, result = request(port, TEXT.encode("utf-8"), path="/extract?mode=sls_only&format=none&dedup=1")
+    assert status == 200
+    assert result["count"] == 2
+    assert result["duplicates"] == 1
+    assert "output" not in result
+
+
+def test_large_result_is_sent_in_pieces(start_server, monkeypatch):
+    monkeypatch.setattr(service, "_DRAIN_CHARS", 1000)
+    port = start_server()
+    text = "".join(f"MY{i:013d}\n" for i in range(20000))
+    status, result = post_json(port, {"text": text, "ids": True, "format": "batch_data", "max_ids": 500})
+    assert status == 200
+    assert result["ids"]["sls"] == _expected_ids(text)["sls"]
+    assert result["output"] == "".join(formatting.iter_format("batch_data", [("sls", result["ids"]["sls"])], 500))
+
+
+def test_concurrent_small_requests_are_batched(start_server, monkeypatch):
+    batches = []
+    original = service.extract_batch
+
+    def record(texts):
+        batches.append(len(texts))
+        return original(texts)
+
+    monkeypatch.setattr(service, "extract_batch", record)
+    monkeypatch.setattr(service, "BATCH_DELAY", 0.5)
+    port = start_server()
+
+    texts = [f"{TEXT}SG{i:013d} 24{i:04d}XYZ12345 q\n" for i in range(8)]
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def send(i):
+        barrier.wait()
+        results[i] = post_json(port, {"text": texts[i], "ids": True})
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    for text, (status, result) in zip(texts, results):
+        assert status == 200
+        assert result["ids"] == _expected_ids(text)
+    assert sum(batches) == len(texts)
+    assert max(batches) > 1
+
+
+def test_path_request(start_server, tmp_path):
+    port = start_server()
+    path = tmp_path / "export.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    status, result = post_json(port, {"path": str(path), "ids": True, "format": None})
+    assert status == 200
+    assert result["ids"] == _expected_ids(TEXT)
+
+
+def test_path_rejected_without_allow_path(start_server, tmp_path):
+    port = start_server(allow_path=False)
+    path = tmp_path / "export.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    status, result = post_json(port, {"path": str(path)})
+    assert status == 403
+    assert "error" in result
+    # 文本请求不受影响
+    assert post_json(port, {"text": TEXT})[0] == 200
+
+
+@pytest.mark.parametrize("host, expected", [
+    ("127.0.0.1", True), ("localhost", True), ("::1", True),
+    ("0.0.0.0", False), ("192.168.1.10", False), ("example.com", False),
+])
+def test_is_loopback(host, expected):
+    assert service.is_loopback(host) is expected
+
+
+@pytest.mark.parametrize("kwargs, status", [
+    ({"path": "/other", "body": b"x"}, 404),
+    ({"method": "GET"}, 405),
+    ({"body": b"{not json", "headers": {"Content-Type": "application/json"}}, 400),
+    ({"body": b"[1, 2]", "headers": {"Content-Type": "application/json"}}, 400),
+    ({"body": b'{"text": "x", "path": "y"}', "headers": {"Content-Type": "application/json"}}, 400),
+    ({"body": b'{"text": "x", "mode": "bad"}', "headers": {"Content-Type": "application/json"}}, 400),
+    ({"body": b'{"text": "x", "max_ids": 0, "format": "batch_query"}',
+      "headers": {"Content-Type": "application/json"}}, 400),
+    ({"body": b'{"text": "x", "max_ids": 10}', "headers": {"Content-Type": "application/json"}}, 400),
+])
+def test_error_statuses(start_server, kwargs, status):
+    port = start_server()
+    got, result = request(port, **kwargs)
+    assert got == status
+    assert "error" in result
+
+
+def test_body_too_large(start_server, monkeypatch):
+    monkeypatch.setattr(service, "MAX_BODY", 10)
+    port = start_server()
+    status, result = request(port, b"MY1234567890123 and more")
+    assert status == 413
+
+
+def test_missing_file(start_server, tmp_path):
+    port = start_server()
+    status, result = post_json(port, {"path": str(tmp_path / "missing.txt")})
+    assert status == 400
+    assert "error" in result
+
+
+def test_failure_while_preparing_returns_500(start_server, monkeypatch):
+    def fail(request, data):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "_prepare", fail)
+    port = start_server()
+    status, result = post_json(port, {"text": TEXT})
+    assert status == 500
+    assert "boom" in result["error"]
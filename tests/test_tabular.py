@@ -0,0 +1,158 @@
+"""
+表格粘贴的按列提取：单号列识别、表头判断和逐个单元格的提取
+"""
+import pytest
+
+import extractor
+import formatting
+import tabular
+
+TSV = (
+    "运单号\t订单号\t备注\t金额\n"
+    "MY1234567890123\t240101ABCD12345\tcall before 9AM, code ABCDEFGH12\t12.50\n"
+    "\t240102ABCD67890\t\t3.00\n"
+    "SG1234567890123 BR1234567890123\t240103EFGH11111\t二次派送\t8.00\n"
+    "TH1234567890123\tN/A\tXYZ12345678 too\t1.00\n"
+)
+
+
+def _lists(data):
+    return {key: list(data[key]) for key in formatting.CLASSES}
+
+
+def _cell_by_cell(text, columns, header):
+    """逐个单元格单独提取的结果，按行、列的顺序排列"""
+    expected = {key: [] for key in formatting.CLASSES}
+    rows = {key: [] for key in formatting.CLASSES}
+    lines = text.rstrip("\n").split("\n")
+    for r, line in enumerate(lines):
+        if r == 0 and header:
+            continue
+        cells = line.split("\t")
+        for c in columns:
+            if c < len(cells):
+                data = extractor.extract_order_numbers(cells[c].strip())
+                for key in formatting.CLASSES:
+                    expected[key].extend(data[key])
+                    rows[key].extend([r] * len(data[key]))
+    return expected, rows
+
+
+def test_is_table():
+    assert tabular.is_table(TSV)
+    assert not tabular.is_table("MY1234567890123\nSG1234567890123\n")
+    assert not tabular.is_table("MY1234567890123\tx\n")
+    # 逗号分隔的文本不按表格处理，按普通文本提取
+    assert not tabular.is_table(TSV.replace("\t", ","))
+    assert tabular.extract_table(TSV.replace("\t", ",")) is None
+
+
+def test_guess_columns():
+    # 运单号列和订单号列中多数单元格恰好是一个单号；备注列偶尔夹杂单号，金额列没有单号
+    assert tabular.guess_columns(TSV) == [0, 1]
+
+
+@pytest.mark.parametrize("spec, columns", [
+    ("A,C", [0, 2]), ("1 3", [0, 2]), ("B-D", [1, 2, 3]), ("c，a a", [0, 2]), ("AA", [26]), ("", None),
+])
+def test_parse_columns(spec, columns):
+    assert tabular.parse_columns(spec) == columns
+
+
+@pytest.mark.parametrize("spec", ["0", "D-B", "A1", "列"])
+def test_parse_columns_rejects(spec):
+    with pytest.raises(ValueError):
+        tabular.parse_columns(spec)
+
+
+def test_column_name():
+    assert [tabular.column_name(i) for i in (0, 25, 26, 27, 701, 702)] == ["A", "Z", "AA", "AB", "ZZ", "AAA"]
+
+
+@pytest.mark.parametrize("columns", [None, [0, 1], [2], [0, 1, 2, 3]])
+def test_extract_table_matches_cell_by_cell(columns):
+    data = tabular.extract_table(TSV, columns)
+    used = [0, 1] if columns is None else columns
+    table = data["table"]
+    assert table["columns"] == used
+    assert table["header"] is True
+    assert table["count"] == 5
+
+    expected, rows = _cell_by_cell(TSV, used, header=True)
+    assert _lists(data) == expected
+    assert {key: list(table["rows"][key]) for key in formatting.CLASSES} == rows
+
+
+def test_extract_table_auto_columns():
+    data = tabular.extract_table(TSV)
+    assert _lists(data) == {
+        "sls": ["MY1234567890123", "SG1234567890123", "BR1234567890123", "TH1234567890123"],
+        "order": ["240101ABCD12345", "240102ABCD67890", "240103EFGH11111"],
+        "unknown": [],
+    }
+    # 备注列中的文字不会产生未知单号
+    assert extractor.extract_order_numbers(TSV)["unknown"]
+    assert tabular.describe(data) == "按表格第A、B列提取，首行为表头"
+
+
+def test_table_without_header_and_without_id_columns():
+    body = TSV.split("\n", 1)[1]
+    data = tabular.extract_table(body)
+    assert data["table"]["header"] is False
+    assert list(data["sls"])[0] == "MY1234567890123"
+    assert list(data["table"]["rows"]["sls"]) == [0, 2, 2, 3]
+
+    assert tabular.extract_table("金额\t备注\n1.00\tx\n2.00\ty\n") is None
+
+
+def test_align_after_filtering():
+    data = tabular.extract_table(TSV)
+    filtered = {"sls": ["SG1234567890123", "TH1234567890123"], "order": list(data["order"]), "unknown": []}
+    alignment = tabular.align(data, filtered)
+    assert alignment["count"] == 5 and alignment["header"] is True
+    assert list(alignment["rows"]["sls"]) == [3, 4]
+    assert list(alignment["rows"]["order"]) == [1, 2, 3]
+
+    columns = [("sls", filtered["sls"]), ("order", filtered["order"])]
+    text = "".join(formatting.iter_format("organization", columns, alignment=alignment))
+    assert text.split("\n") == [
+        "SLS单号\t订单编号",
+        "\t240101ABCD12345",
+        "\t240102ABCD67890",
+        "SG1234567890123\t240103EFGH11111",
+        "TH1234567890123\t",
+    ]
+
+
+def test_progress_and_cancel():
+    text = "".join(f"MY{i:013d}\t24{i:04d}ABCD{i:05d}\tx\n" for i in range(10000))
+    calls = []
+    tabular.extract_table(text, progress=lambda stage, pos: calls.append((stage, pos)))
+    assert calls[0] == ("table", 0)
+    assert len(calls) > 1 and all(stage == "table" for stage, _ in calls)
+
+    def cancel(stage, pos):
+        if pos:
+            raise extractor.Cancelled
+
+    with pytest.raises(extractor.Cancelled):
+        tabular.extract_table(text, progress=cancel)
+
+
+def test_not_a_table_is_cached(monkeypatch):
+    calls = []
+    original = tabular.is_table
+
+    def counting(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(tabular, "is_table", counting)
+    cache = extractor.ExtractionCache()
+    text = "MY1234567890123\nSG1234567890123\n"
+    table = lambda t, p: tabular.extract_table(t, None, p)
+    for _ in range(3):
+        # 不是表格时缓存 None，不再重新判断
+        assert cache.extract(text, extract=table, tag=("table", None)) is None
+    assert len(calls) == 1
+    assert list(cache.extract(text)["sls"]) == ["MY1234567890123", "SG1234567890123"]
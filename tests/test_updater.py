@@ -0,0 +1,151 @@
+"""
+检查更新：用本地的模拟服务器代替 GitHub API，检查缓存、有效期和 ETag/304
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+import updater
+
+OWNER, REPO = "owner", "repo"
+RELEASE_PATH = f"/repos/{OWNER}/{REPO}/releases/latest"
+
+
+def _release(tag):
+    return {
+        "tag_name": f"v{tag}",
+        "body": f"changes in {tag}",
+        "assets": [{"browser_download_url": f"https://example.com/app-{tag}.zip"}],
+    }
+
+
+class FakeGitHub:
+    """模拟的 releases/latest 接口，记录收到的请求头"""
+
+    def __init__(self):
+        self.release = _release("2.2.0")
+        self.etag = '"v1"'
+        self.status = 200
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests.append(dict(self.headers))
+                if self.path != RELEASE_PATH:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if fake.status != 200:
+                    self.send_response(fake.status)
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == fake.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps(fake.release).encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", fake.etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def github():
+    fake = FakeGitHub()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "update_cache.json")
+
+
+def fetch(github, cache_path, **kwargs):
+    return updater.fetch_latest_release(OWNER, REPO, cache_path=cache_path, base_url=github.base_url, **kwargs)
+
+
+def test_fetch_saves_cache_and_reuses_it_within_ttl(github, cache_path):
+    assert fetch(github, cache_path) == github.release
+    assert len(github.requests) == 1
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert cache["etag"] == github.etag
+    assert cache["release"] == github.release
+
+    # 有效期内不访问网络
+    assert fetch(github, cache_path) == github.release
+    assert len(github.requests) == 1
+
+
+def test_expired_cache_revalidates_with_etag(github, cache_path):
+    fetch(github, cache_path)
+    with open(cache_path, encoding="utf-8") as f:
+        fetched_at = json.load(f)["fetched_at"]
+
+    # 过期后带 If-None-Match 确认，未变化时服务器返回 304，沿用缓存并刷新时间
+    assert fetch(github, cache_path, ttl=0) == github.release
+    assert len(github.requests) == 2
+    assert github.requests[-1].get("If-None-Match") == github.etag
+    with open(cache_path, encoding="utf-8") as f:
+        assert json.load(f)["fetched_at"] >= fetched_at
+
+
+def test_force_fetches_new_release(github, cache_path):
+    fetch(github, cache_path)
+    github.release = _release("2.3.0")
+    github.etag = '"v2"'
+    assert fetch(github, cache_path) == _release("2.2.0")
+    assert fetch(github, cache_path, force=True) == github.release
+    with open(cache_path, encoding="utf-8") as f:
+        assert json.load(f)["etag"] == '"v2"'
+
+
+def test_errors_fall_back_to_cache(github, cache_path):
+    fetch(github, cache_path)
+    github.status = 500
+    assert fetch(github, cache_path, ttl=0) == _release("2.2.0")
+
+    # 服务器不可用
+    base_url = github.base_url
+    github.close()
+    assert updater.fetch_latest_release(OWNER, REPO, cache_path=cache_path, base_url=base_url,
+                                        ttl=0, timeout=2) == _release("2.2.0")
+
+
+def test_no_cache_and_server_error_returns_none(github, cache_path):
+    github.status = 500
+    assert fetch(github, cache_path) is None
+
+
+def test_cache_for_another_url_is_ignored(github, cache_path):
+    fetch(github, cache_path)
+    assert updater.load_cache(cache_path, "https://example.com/other") is None
+
+
+def test_check_for_updates(github, cache_path):
+    result = updater.check_for_updates("2.1.0", OWNER, REPO, cache_path=cache_path, base_url=github.base_url)
+    assert result == (True, "2.2.0", "https://example.com/app-2.2.0.zip", "changes in 2.2.0")
+
+    result = updater.check_for_updates("2.2.0", OWNER, REPO, cache_path=cache_path, base_url=github.base_url)
+    assert result == (False, "2.2.0", "", "changes in 2.2.0")
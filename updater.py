@@ -1,10 +1,110 @@
-import requests  
-import json  
-import webbrowser  
+# requests、json、webbrowser 只在检查更新或打开下载页面时才导入，加快启动  
+import os  
+import time  
 import tkinter as tk  
 from tkinter import messagebox  
+from worker import BackgroundTask  
 
-def check_for_updates(current_version, owner, repo):  
+GITHUB_API_URL = "https://api.github.com"  
+
+# 网络请求超时（秒），网络不通时尽快放弃，不影响使用  
+UPDATE_TIMEOUT = 5  
+
+# 版本信息缓存有效期（秒），有效期内启动不再访问网络  
+CACHE_TTL = 6 * 60 * 60  
+
+def default_cache_path():  
+    """版本信息缓存文件的默认位置"""  
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")  
+    return os.path.join(base, "order-processor", "update_cache.json")  
+
+def load_cache(cache_path, api_url):  
+    """读取缓存，文件不存在、损坏或不是同一个地址的缓存时返回 None"""  
+    import json  
+    
+    try:  
+        with open(cache_path, encoding="utf-8") as f:  
+            cache = json.load(f)  
+    except (OSError, ValueError):  
+        return None  
+    if not isinstance(cache, dict) or cache.get("url") != api_url or "release" not in cache:  
+        return None  
+    return cache  
+
+def save_cache(cache_path, cache):  
+    """先写临时文件再替换，避免中途退出留下不完整的缓存"""  
+    import json  
+    
+    try:  
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)  
+        tmp_path = cache_path + ".tmp"  
+        with open(tmp_path, "w", encoding="utf-8") as f:  
+            json.dump(cache, f, ensure_ascii=False)  
+        os.replace(tmp_path, cache_path)  
+    except OSError as e:  
+        print(f"保存更新缓存失败: {e}")  
+
+def fetch_latest_release(owner, repo, cache_path=None, ttl=CACHE_TTL, timeout=UPDATE_TIMEOUT,  
+                         base_url=GITHUB_API_URL, force=False):  
+    """  
+    获取最新版本信息，优先使用磁盘缓存  
+    
+    参数:  
+        cache_path: 缓存文件路径，默认见 default_cache_path()  
+        ttl: 缓存有效期（秒），有效期内直接返回缓存，不访问网络  
+        timeout: 网络请求超时（秒）  
+        base_url: API地址，测试时可指向本地的模拟服务器  
+        force: 忽略有效期，总是向服务器确认（仍带 If-None-Match，未变化时服务器只返回 304）  
+    
+    返回:  
+        release 数据（dict），获取失败且没有缓存时返回 None  
+    """  
+    import json  
+    import requests  
+    
+    if cache_path is None:  
+        cache_path = default_cache_path()  
+    api_url = f"{base_url}/repos/{owner}/{repo}/releases/latest"  
+    cache = load_cache(cache_path, api_url)  
+    
+    if cache and not force and time.time() - cache.get("fetched_at", 0) < ttl:  
+        return cache["release"]  
+    
+    headers = {"Accept": "application/vnd.github+json"}  
+    if cache and cache.get("etag"):  
+        headers["If-None-Match"] = cache["etag"]  
+    
+    try:  
+        response = requests.get(api_url, headers=headers, timeout=timeout)  
+    except requests.RequestException as e:  
+        print(f"检查更新时出错: {e}")  
+        return cache["release"] if cache else None  
+    
+    if response.status_code == 304 and cache:  
+        # 版本信息未变化，只刷新缓存时间  
+        cache["fetched_at"] = time.time()  
+        save_cache(cache_path, cache)  
+        return cache["release"]  
+    
+    if response.status_code != 200:  
+        print(f"API请求失败，状态码: {response.status_code}")  
+        return cache["release"] if cache else None  
+    
+    try:  
+        release_data = json.loads(response.text)  
+    except ValueError as e:  
+        print(f"版本信息解析失败: {e}")  
+        return cache["release"] if cache else None  
+    
+    save_cache(cache_path, {  
+        "url": api_url,  
+        "etag": response.headers.get("ETag"),  
+        "fetched_at": time.time(),  
+        "release": release_data,  
+    })  
+    return release_data  
+
+def check_for_updates(current_version, owner, repo, **kwargs):  
     """  
     检查GitHub上是否有新版本可用  
     
@@ -12,20 +112,17 @@ def check_for_updates(current_version, owner, repo):
         current_version: 当前版本号 (如 "1.0.0")  
         owner: GitHub用户名/组织名  
         repo: 仓库名称  
+        kwargs: 传给 fetch_latest_release（cache_path、ttl、timeout、base_url、force）  
     
     返回:  
         (has_update, latest_version, download_url, changelog)  
     """  
     try:  
-        # 访问GitHub API获取最新版本  
-        api_url = f"https://api.github.com/repos/{owner}/{repo}/releases/latest"  
-        response = requests.get(api_url)  
-        
-        if response.status_code != 200:  
-            print(f"API请求失败，状态码: {response.status_code}")  
+        # 获取最新版本（优先使用缓存，请求带超时）  
+        release_data = fetch_latest_release(owner, repo, **kwargs)  
+        if release_data is None:  
             return False, current_version, "", ""  
         
-        release_data = json.loads(response.text)  
         latest_version = release_data['tag_name'].lstrip('v')  # 移除版本号前的'v'  
         
         # 简单地比较版本号（这种方法对标准的语义化版本号有效）  
@@ -57,6 +154,25 @@ def check_for_updates(current_version, owner, repo):
         print(f"检查更新时出错: {e}")  
         return False, current_version, "", ""  
 
+def check_for_updates_async(root, current_version, owner, repo, callback, **kwargs):  
+    """  
+    在后台线程中检查更新，不阻塞界面  
+    
+    参数:  
+        callback: 在界面线程中以 callback(has_update, latest_version, download_url, changelog) 调用  
+        kwargs: 同 check_for_updates  
+    
+    返回:  
+        BackgroundTask，可调用 cancel() 放弃结果  
+    """  
+    task = BackgroundTask(  
+        root,  
+        lambda task: check_for_updates(current_version, owner, repo, **kwargs),  
+        on_done=lambda result: callback(*result),  
+    )  
+    task.start()  
+    return task  
+
 def show_update_dialog(root, current_version, latest_version, download_url, changelog):  
     """显示更新对话框"""  
     dialog = tk.Toplevel(root)  
@@ -88,6 +204,8 @@ def show_update_dialog(root, current_version, latest_version, download_url, chan
 
 def open_download_page(url, dialog=None):  
     """打开下载页面"""  
+    import webbrowser  
+    
     webbrowser.open(url)  
     if dialog:  
         dialog.destroy()
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+后台任务
+
+在工作线程中执行提取、格式化等耗时操作，进度和结果放入队列，
+由界面线程通过 root.after 定时取回，Tk 控件始终只在界面线程中访问。
+"""
+import queue
+import threading
+
+from extractor import Cancelled
+
+# 界面线程轮询队列的间隔（毫秒）
+POLL_INTERVAL = 100
+
+
+class BackgroundTask:
+    """
+    后台任务
+
+    func 在工作线程中以 func(task) 的方式调用，可通过 task.report(...) 汇报进度，
+    并应定期调用 task.check()（或把它作为回调传给提取函数）以便及时响应取消。
+    以下回调均在界面线程中执行:
+        on_done(result)    任务完成
+        on_progress(*args) 收到进度
+        on_cancel()        任务被取消
+        on_error(exc)      任务出错
+    """
+
+    def __init__(self, root, func, on_done, on_progress=None, on_cancel=None, on_error=None):
+        self.root = root
+        self.func = func
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.on_error = on_error
+        self.finished = False
+        self._cancel_event = threading.Event()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """启动工作线程并开始轮询"""
+        self._thread.start()
+        self.root.after(POLL_INTERVAL, self._poll)
+
+    def cancel(self):
+        """请求取消，工作线程会在下一次 check() 时停止"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check(self, *args):
+        """已请求取消时抛出 Cancelled（接受任意参数，便于直接用作进度回调）"""
+        if self._cancel_event.is_set():
+            raise Cancelled()
+
+    def report(self, *args):
+        """从工作线程汇报进度"""
+        self._queue.put(("progress", args))
+
+    def _run(self):
+        try:
+            result = self.func(self)
+        except Cancelled:
+            self._queue.put(("cancelled", None))
+        except Exception as e:
+            self._queue.put(("error", e))
+        else:
+            self._queue.put(("done", result))
+
+    def _poll(self):
+        """在界面线程中取回工作线程的消息"""
+        progress = None
+        while True:
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                # 同一轮里只显示最新的进度
+                progress = payload
+                continue
+
+            self.finished = True
+            if kind == "done" and not self.cancelled:
+                self.on_done(payload)
+            elif kind == "error" and not self.cancelled:
+                if self.on_error:
+                    self.on_error(payload)
+            elif self.on_cancel:
+                self.on_cancel()
+            return
+
+        if progress is not None and self.on_progress and not self.cancelled:
+            self.on_progress(*progress)
+        self.root.after(POLL_INTERVAL, self._poll)